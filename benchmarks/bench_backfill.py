@@ -0,0 +1,98 @@
+"""Backfill throughput against a stub CoinGecko API and the in-memory table
+
+    python benchmarks/bench_backfill.py --days 3 --gaps 6 --coins 10
+
+Knocks `--gaps` holes into a synthetic history, runs the backfill tasks
+against a local stub (which answers every `--throttle-every`-th request
+with HTTP 429 to exercise retries), checks that no gaps remain and prints
+rows/s as JSON.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import timedelta
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(os.path.dirname(BENCH_DIR), 'src'))
+
+import synthetic
+from fakes import FakeTable, StubHTTPServer
+
+
+def market_chart_handler(throttle_every):
+    counter = {'n': 0}
+
+    def handler(path):
+        counter['n'] += 1
+        if throttle_every and counter['n'] % throttle_every == 0:
+            return 429, 'application/json', b'{"status": "throttled"}'
+        coin = urlparse(path).path.split('/')[-3]
+        params = parse_qs(urlparse(path).query)
+        start, end = int(params['from'][0]), int(params['to'][0])
+        seconds = np.arange(start - start % 300, end + 1, 300)
+        base = synthetic.START_PRICES.get(coin, 1.0)
+        prices = base * (1 + 0.01 * np.sin(seconds / 3600))
+        body = {'prices': [[int(s) * 1000, float(p)] for s, p in zip(seconds, prices)]}
+        return 200, 'application/json', json.dumps(body).encode()
+
+    return handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--days', type=int, default=3)
+    parser.add_argument('--coins', type=int, default=10)
+    parser.add_argument('--gaps', type=int, default=6)
+    parser.add_argument('--gap-hours', type=float, default=4)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--throttle-every', type=int, default=7)
+    args = parser.parse_args()
+
+    df = synthetic.price_frame(args.days, args.coins)
+    ticks_per_gap = int(args.gap_hours * 20)
+    starts = np.linspace(ticks_per_gap, len(df) - 2 * ticks_per_gap, args.gaps).astype(int)
+    keep = np.ones(len(df), dtype=bool)
+    for s in starts:
+        keep[s:s + ticks_per_gap] = False
+
+    table = FakeTable()
+    table.load(synthetic.dynamodb_items(df[keep]))
+    start = synthetic.START
+    end = start + timedelta(days=args.days)
+
+    with StubHTTPServer(market_chart_handler(args.throttle_every)) as api:
+        os.environ['COINGECKO_API_URL'] = api.url + '/api/v3'
+        import backfill
+        backfill.RETRY_BACKOFF = 0.05
+
+        t0 = time.perf_counter()
+        gaps = backfill.detect_gaps.fn(table, start, end)
+        t_detect = time.perf_counter() - t0
+        rows = backfill.fetch_gap_rows.fn(gaps, synthetic.coin_names(args.coins),
+                                          workers=args.workers, rate_per_minute=60_000)
+        t_fetch = time.perf_counter() - t0 - t_detect
+        written = backfill.save_rows.fn(rows, table)
+        elapsed = time.perf_counter() - t0
+
+        remaining = backfill.find_gaps(backfill.stored_timestamps(table, start, end), start, end)
+
+    print(json.dumps({
+        'gaps': len(gaps),
+        'gaps_remaining': len(remaining),
+        'api_requests': len(api.requests),
+        'rows_written': written,
+        'detect_seconds': round(t_detect, 3),
+        'fetch_seconds': round(t_fetch, 3),
+        'total_seconds': round(elapsed, 3),
+        'rows_per_second': round(written / elapsed, 1),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
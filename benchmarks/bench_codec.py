@@ -0,0 +1,130 @@
+"""Compressed block format vs one item per tick
+
+    python benchmarks/bench_codec.py --days 7 --coins 10
+
+Checks that every block round-trips exactly, that the dashboard's block
+reader returns the same frame as the item reader, and reports bytes and
+read units per queried day plus encode/decode throughput as JSON.
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from collections import defaultdict
+from decimal import Decimal
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(REPO_DIR, 'src'))
+
+import synthetic
+import tscodec
+from fakes import FakeTable
+
+
+def item_size(item):
+    """Approximate DynamoDB item size in bytes (names + values)"""
+    size = 0
+    for name, value in item.items():
+        size += len(name.encode())
+        if isinstance(value, (bytes, bytearray)):
+            size += len(value)
+        elif isinstance(value, str):
+            size += len(value.encode())
+        else:
+            digits = len(str(value).replace('-', '').replace('.', '').lstrip('0')) or 1
+            size += min(21, math.ceil(digits / 2) + 1)
+    return size
+
+
+def read_units(items):
+    """Eventually consistent read units for querying these items"""
+    return math.ceil(sum(item_size(i) for i in items) / 4096) / 2
+
+
+def build_blocks(rows, block_seconds):
+    grouped = defaultdict(list)
+    for row in rows:
+        grouped[tscodec.block_start(row['timestamp'], block_seconds)].append(row)
+    return [tscodec.encode_block(group, start, ttl=1775865600) for start, group in sorted(grouped.items())]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--coins', type=int, default=10)
+    args = parser.parse_args()
+
+    df = synthetic.price_frame(args.days, args.coins)
+    raw_items = synthetic.dynamodb_items(df)
+    rows = [{k: (float(v) if isinstance(v, Decimal) else v) for k, v in item.items() if k not in ('PK', 'ttl')}
+            for item in raw_items]
+
+    report = {
+        'days': args.days,
+        'coins': args.coins,
+        'ticks': len(rows),
+        'items': {
+            'items_per_day': round(len(raw_items) / args.days, 1),
+            'bytes_per_day': round(sum(map(item_size, raw_items)) / args.days),
+            'read_units_per_day': read_units(raw_items) / args.days,
+        },
+    }
+
+    for label, seconds in (('hour_blocks', 3600), ('day_blocks', 86400)):
+        t0 = time.perf_counter()
+        blocks = build_blocks(rows, seconds)
+        encode_s = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        decoded = [tscodec.decode_block(b) for b in blocks]
+        decode_s = time.perf_counter() - t0
+
+        i = 0
+        for timestamps, series in decoded:
+            for j, micros in enumerate(timestamps):
+                row = rows[i + j]
+                assert tscodec.from_micros(micros) == row['timestamp'], 'timestamp mismatch'
+                assert all(series[c][j] == row[c] for c in series), 'price mismatch'
+            i += len(timestamps)
+        assert i == len(rows), 'row count mismatch'
+
+        values = len(rows) * (args.coins + 1)
+        report[label] = {
+            'items_per_day': round(len(blocks) / args.days, 1),
+            'bytes_per_day': round(sum(map(item_size, blocks)) / args.days),
+            'read_units_per_day': read_units(blocks) / args.days,
+            'bits_per_value': round(sum(item_size(b) for b in blocks) * 8 / values, 2),
+            'encode_values_per_s': round(values / encode_s),
+            'decode_values_per_s': round(values / decode_s),
+        }
+
+    # Dashboard read path: block reader must match the item reader
+    from storage import DynamoDBBackend
+
+    # Raw items stay in the table; every block except the still-open last one is packed
+    table = FakeTable()
+    table.load(raw_items)
+    open_block = tscodec.block_start(rows[-1]['timestamp'], 3600)
+    table.load(build_blocks([r for r in rows if r['timestamp'] < open_block], 3600))
+    start, end = rows[0]['timestamp'], rows[-1]['timestamp']
+
+    t0 = time.perf_counter()
+    df_blocks = DynamoDBBackend(table=table, storage_format='blocks', block_seconds=3600).query(start, end)
+    report['dashboard_block_read_ms'] = round((time.perf_counter() - t0) * 1000, 1)
+
+    expected = df[['timestamp'] + sorted(c for c in df.columns if c != 'timestamp')]
+    got = df_blocks[expected.columns].reset_index(drop=True)
+    assert (got['timestamp'] == expected['timestamp']).all(), 'dashboard timestamps differ'
+    assert (got.drop(columns='timestamp').to_numpy() == expected.drop(columns='timestamp').to_numpy()).all(), \
+        'dashboard prices differ'
+    report['round_trip'] = 'ok'
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
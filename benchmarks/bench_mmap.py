@@ -0,0 +1,149 @@
+"""Per-worker memory of the shared memory-mapped store vs per-process copies
+
+    python benchmarks/bench_mmap.py --days 180 --coins 100 --workers 4
+
+Builds a store from synthetic ticks, then starts `--workers` processes that
+each load the full history and query random windows, either through an
+MmapBackend or from their own pandas copy (what every Dash worker holds
+today). Reports each worker's proportional set size (PSS, which splits
+shared pages between the processes mapping them), query latency, and
+whether a tick appended by the writer after the workers started is
+visible to them without a reload.
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(os.path.dirname(BENCH_DIR), 'src'))
+
+import numpy as np
+import pandas as pd
+
+import synthetic
+from mmapstore import MmapBackend, MmapWriter
+
+
+def pss_mb():
+    """Proportional set size of this process (Linux), in MB"""
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            if line.startswith('Pss:'):
+                return int(line.split()[1]) / 1024
+    return float('nan')
+
+
+def random_windows(start, end, n, seed):
+    rng = np.random.default_rng(seed)
+    span = (end - start).value
+    width = min(86400 * 10**9, span // 4)  # one-day views
+    lo = rng.integers(0, span - width, n)
+    return [(start + pd.Timedelta(int(l), 'ns'), start + pd.Timedelta(int(l) + width, 'ns')) for l in lo]
+
+
+def worker(mode, path, pickled, windows, ready, go, results):
+    try:
+        measure(mode, path, pickled, windows, ready, go, results)
+    except Exception as e:
+        ready.put(e)
+        raise
+
+
+def measure(mode, path, pickled, windows, ready, go, results):
+    if mode == 'mmap':
+        store = MmapBackend(path)
+        full = store.query(windows[0][0] - pd.Timedelta(days=3650), windows[0][1] + pd.Timedelta(days=3650))
+        rows_at_start = store.rows()
+    else:
+        full = pd.read_pickle(pickled)
+        full['timestamp'] = pd.to_datetime(full['timestamp'], utc=True).dt.as_unit('ns')
+        rows_at_start = len(full)
+
+    latencies = []
+    for lo, hi in windows:
+        s = time.perf_counter()
+        if mode == 'mmap':
+            frame = store.query(lo, hi)
+        else:
+            ts = full['timestamp']
+            frame = full.iloc[ts.searchsorted(lo):ts.searchsorted(hi, side='right')]
+        latencies.append((time.perf_counter() - s) * 1000)
+        assert len(frame)
+
+    ready.put(rows_at_start)
+    go.wait()  # the parent appends one tick, then lets the workers look again
+    rows_after = store.rows() if mode == 'mmap' else len(full)
+    results.put({'pss_mb': pss_mb(), 'query_ms': statistics.median(latencies),
+                 'sees_new_tick': rows_after > rows_at_start, 'rows': len(full)})
+
+
+def run(mode, path, pickled, df, workers, seed):
+    start = pd.Timestamp(df['timestamp'].iloc[0])
+    end = pd.Timestamp(df['timestamp'].iloc[-1])
+    ctx = mp.get_context('spawn')
+    ready, results, go = ctx.Queue(), ctx.Queue(), ctx.Event()
+    procs = [ctx.Process(target=worker, args=(mode, path, pickled, random_windows(start, end, 50, seed + i),
+                                              ready, go, results))
+             for i in range(workers)]
+    for p in procs:
+        p.start()
+    for _ in procs:
+        started = ready.get(timeout=600)
+        if isinstance(started, Exception):
+            for p in procs:
+                p.terminate()
+            raise started
+
+    tick = df.tail(1).copy()
+    tick['timestamp'] = [(end + pd.Timedelta(minutes=3)).isoformat()]
+    MmapWriter(path).append(tick)
+    go.set()
+
+    out = [results.get(timeout=600) for _ in procs]
+    for p in procs:
+        p.join()
+    return {
+        'pss_mb_per_worker': round(statistics.mean(r['pss_mb'] for r in out), 1),
+        'pss_mb_total': round(sum(r['pss_mb'] for r in out), 1),
+        'query_ms_median': round(statistics.median(r['query_ms'] for r in out), 3),
+        'workers_see_new_tick': all(r['sees_new_tick'] for r in out),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--days', type=float, default=180)
+    parser.add_argument('--coins', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    df = synthetic.price_frame(args.days, args.coins)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'prices.mmap')
+        s = time.perf_counter()
+        MmapWriter(path).append(df)
+        build_s = time.perf_counter() - s
+        pickled = os.path.join(tmp, 'prices.pkl')
+        df.to_pickle(pickled)
+
+        report = {
+            'rows': len(df),
+            'coins': args.coins,
+            'workers': args.workers,
+            'store_mb': round(sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path)) / 2**20, 1),
+            'build_s': round(build_s, 2),
+            'mmap': run('mmap', path, pickled, df, args.workers, args.seed),
+            'pandas_copy': run('copy', path, pickled, df, args.workers, args.seed),
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
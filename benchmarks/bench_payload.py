@@ -0,0 +1,95 @@
+"""Bytes on the wire per chart interaction, before and after minimization
+
+    python benchmarks/bench_payload.py --days 1 7 30 --coins 10 --selected 5
+
+For each view length, builds the price store JSON and the chart figure the
+way the callbacks do, then reports the size of each payload as Dash used
+to send it (raw JSON), after minimize_figure, and after gzip / brotli
+(brotli only when installed) of both. The store is sent once per query;
+the figure on every query, plot-mode switch and news search. The viewport
+patch covers a zoom into one day of the view.
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+from datetime import timedelta
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(REPO_DIR, 'dashboard'))
+sys.path.insert(0, os.path.join(REPO_DIR, 'src'))
+
+import plotly.io as pio
+
+import synthetic
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def sizes(text):
+    data = text.encode()
+    out = {'raw': len(data), 'gzip': len(gzip.compress(data, compresslevel=6))}
+    if brotli is not None:
+        out['brotli'] = len(brotli.compress(data, quality=5))
+    return out
+
+
+def measure(days, n_coins, n_selected, mode):
+    from callbacks import update_chart
+    from payload import minimize_figure, encode_x, encode_y
+    from resolution import MultiResolutionIndex
+
+    df = synthetic.price_frame(days, n_coins)
+    selected = synthetic.coin_names(n_coins)[:n_selected]
+    store_json = df[['timestamp'] + selected].to_json(date_format='iso', orient='split')
+
+    fig = update_chart(store_json, None, selected, mode)
+    before = pio.to_json(fig)
+    s = time.perf_counter()
+    minimized = minimize_figure(fig)
+    minimize_ms = (time.perf_counter() - s) * 1000
+    after = pio.to_json(minimized)
+    live = pio.to_json(minimize_figure(fig, typed=False))
+
+    # Viewport patch for a one-day zoom, as lists vs typed arrays
+    index = MultiResolutionIndex(df[['timestamp'] + selected])
+    window = (synthetic.START.isoformat(), (synthetic.START + timedelta(days=1)).isoformat())
+    frame, _ = index.view(selected, *window)
+    patch_before = json.dumps([{'x': frame['timestamp'].astype(str).tolist(), 'y': frame[c].tolist()}
+                               for c in selected if c in frame.columns])
+    patch_after = json.dumps([{'x': encode_x(frame['timestamp']), 'y': encode_y(frame[c])}
+                              for c in selected if c in frame.columns])
+
+    return {
+        'store': sizes(store_json),
+        'figure_before': sizes(before),
+        'figure_after': sizes(after),
+        'figure_live': sizes(live),
+        'viewport_patch_before': sizes(patch_before),
+        'viewport_patch_after': sizes(patch_after),
+        'minimize_ms': round(minimize_ms, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--days', type=int, nargs='+', default=[1, 7, 30])
+    parser.add_argument('--coins', type=int, default=10)
+    parser.add_argument('--selected', type=int, default=5)
+    parser.add_argument('--mode', default='overlaid', choices=['overlaid', 'multi_y', 'separated'])
+    args = parser.parse_args()
+
+    report = {'coins': args.coins, 'selected': args.selected, 'mode': args.mode, 'brotli': brotli is not None,
+              'views': {f'{days}d': measure(days, args.coins, args.selected, args.mode) for days in args.days}}
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Buffered writer throughput against a throttling DynamoDB stand-in
+
+    python benchmarks/bench_writer.py --coins 300 --seconds 30
+
+Simulates a fetch loop producing one item per second (all coins in one
+item, as the scraper writes them), at `--speedup` times real time, while
+the stand-in adds per-call latency, unprocessed items and throttling.
+Reports how long put() blocked the loop, flush latency percentiles and
+whether every item landed.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(os.path.dirname(BENCH_DIR), 'src'))
+
+import synthetic
+from fakes import FakeDynamoResource
+from writer import BufferedWriter
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--coins', type=int, default=300)
+    parser.add_argument('--seconds', type=int, default=600, help='Simulated seconds of per-second ticks')
+    parser.add_argument('--speedup', type=float, default=100, help='Simulated seconds per wall-clock second')
+    parser.add_argument('--latency-ms', type=float, default=30)
+    parser.add_argument('--unprocessed', type=float, default=0.05)
+    parser.add_argument('--throttle', type=float, default=0.05)
+    args = parser.parse_args()
+
+    df = synthetic.price_frame(args.seconds / 86400, args.coins, tick_seconds=1)
+    items = synthetic.dynamodb_items(df)
+
+    dynamodb = FakeDynamoResource(latency=args.latency_ms / 1000, unprocessed_rate=args.unprocessed,
+                                  throttle_rate=args.throttle)
+    writer = BufferedWriter(dynamodb, 'crypto-prices', flush_interval=0.2)
+
+    blocked = []
+    t0 = time.perf_counter()
+    for i, item in enumerate(items):
+        target = t0 + i / args.speedup
+        time.sleep(max(0, target - time.perf_counter()))
+        s = time.perf_counter()
+        writer.put(item)
+        blocked.append(time.perf_counter() - s)
+    produce_s = time.perf_counter() - t0
+
+    s = time.perf_counter()
+    writer.flush()
+    drain_s = time.perf_counter() - s
+    writer.close()
+
+    blocked.sort()
+    stored = len(dynamodb.Table('crypto-prices')._items)
+    report = {
+        'items': len(items),
+        'coins': args.coins,
+        'stored': stored,
+        'all_written': stored == len(items),
+        'items_per_second': round(len(items) / (produce_s + drain_s), 1),
+        'put_blocked_ms_p99': round(blocked[int(0.99 * (len(blocked) - 1))] * 1000, 3),
+        'put_blocked_ms_max': round(blocked[-1] * 1000, 3),
+        'final_drain_ms': round(drain_s * 1000, 1),
+        'batch_calls': dynamodb.calls,
+        'writer': writer.metrics(),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
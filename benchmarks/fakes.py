@@ -0,0 +1,251 @@
+"""In-process stand-ins for DynamoDB and the GDELT DOC API used by the benchmarks"""
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeTable:
+    """Minimal in-memory stand-in for a boto3 DynamoDB ``Table``
+
+    Supports the calls the project makes: ``query`` with key conditions built
+    from ``boto3.dynamodb.conditions.Key``, ``put_item``, ``get_item``,
+    ``delete_item`` and ``batch_writer``. Items are kept sorted by sort key per
+    partition so range queries behave like the real table. ``page_size``
+    emulates DynamoDB pagination (``LastEvaluatedKey``) by item count.
+    """
+
+    def __init__(self, name='crypto-prices', partition_key='PK', sort_key='timestamp', page_size=None):
+        self.name = name
+        self.partition_key = partition_key
+        self.sort_key = sort_key
+        self.page_size = page_size
+        self._items = {}
+        self._keys = {}
+        self._lock = threading.Lock()
+        self.calls = {'query': 0, 'put_item': 0, 'get_item': 0, 'delete_item': 0}
+
+    def load(self, items):
+        """Bulk-load items without counting them as writes"""
+        for item in items:
+            self._put(item)
+
+    def _put(self, item):
+        pk, sk = item[self.partition_key], item[self.sort_key]
+        with self._lock:
+            keys = self._keys.setdefault(pk, [])
+            if (pk, sk) not in self._items:
+                bisect.insort(keys, sk)
+            self._items[(pk, sk)] = dict(item)
+
+    def put_item(self, Item, **kwargs):
+        self.calls['put_item'] += 1
+        self._put(Item)
+        return {}
+
+    def get_item(self, Key, **kwargs):
+        self.calls['get_item'] += 1
+        item = self._items.get((Key[self.partition_key], Key[self.sort_key]))
+        return {'Item': dict(item)} if item is not None else {}
+
+    def delete_item(self, Key, **kwargs):
+        self.calls['delete_item'] += 1
+        pk, sk = Key[self.partition_key], Key[self.sort_key]
+        with self._lock:
+            if self._items.pop((pk, sk), None) is not None:
+                self._keys[pk].remove(sk)
+        return {}
+
+    def batch_writer(self, overwrite_by_pkeys=None):
+        return _FakeBatchWriter(self)
+
+    def query(self, KeyConditionExpression, ScanIndexForward=True, Limit=None,
+              ExclusiveStartKey=None, ProjectionExpression=None,
+              ExpressionAttributeNames=None, **kwargs):
+        self.calls['query'] += 1
+        pk, low, high = _key_bounds(KeyConditionExpression, self.partition_key, self.sort_key)
+        keys = self._keys.get(pk, [])
+        lo = 0 if low is None else bisect.bisect_left(keys, low)
+        hi = len(keys) if high is None else bisect.bisect_right(keys, high)
+        selected = keys[lo:hi] if ScanIndexForward else keys[lo:hi][::-1]
+
+        if ExclusiveStartKey is not None:
+            start = ExclusiveStartKey[self.sort_key]
+            if ScanIndexForward:
+                selected = selected[bisect.bisect_right(selected, start):]
+            else:
+                selected = [k for k in selected if k < start]
+
+        limit = min(x for x in (Limit, self.page_size, len(selected)) if x is not None)
+        page = selected[:limit]
+
+        attributes = None
+        if ProjectionExpression:
+            names = ExpressionAttributeNames or {}
+            attributes = [names.get(a.strip(), a.strip()) for a in ProjectionExpression.split(',')]
+
+        items = []
+        for sk in page:
+            item = self._items[(pk, sk)]
+            if attributes is not None:
+                item = {a: item[a] for a in attributes if a in item}
+            items.append(dict(item))
+
+        response = {'Items': items, 'Count': len(items), 'ScannedCount': len(items)}
+        if len(page) < len(selected):
+            response['LastEvaluatedKey'] = {self.partition_key: pk, self.sort_key: page[-1]}
+        return response
+
+
+class _FakeBatchWriter:
+    def __init__(self, table):
+        self.table = table
+        self.buffer = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
+        return False
+
+    def put_item(self, Item):
+        self.buffer.append(Item)
+        if len(self.buffer) >= 25:
+            self.flush()
+
+    def delete_item(self, Key):
+        self.table.delete_item(Key=Key)
+
+    def flush(self):
+        for item in self.buffer:
+            self.table.put_item(Item=item)
+        self.buffer = []
+
+
+class FakeDynamoResource:
+    """Stand-in for the boto3 DynamoDB service resource
+
+    ``batch_write_item`` sleeps `latency` seconds per call, leaves a random
+    `unprocessed_rate` share of the puts unprocessed and raises a throttling
+    ``ClientError`` for a `throttle_rate` share of calls, like a table at
+    its provisioned limit.
+    """
+
+    def __init__(self, latency=0.0, unprocessed_rate=0.0, throttle_rate=0.0, seed=0):
+        import random
+        self.tables = {}
+        self.latency = latency
+        self.unprocessed_rate = unprocessed_rate
+        self.throttle_rate = throttle_rate
+        self.random = random.Random(seed)
+        self.calls = 0
+
+    def Table(self, name):
+        if name not in self.tables:
+            self.tables[name] = FakeTable(name)
+        return self.tables[name]
+
+    def batch_write_item(self, RequestItems):
+        import time
+        from botocore.exceptions import ClientError
+
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if sum(len(r) for r in RequestItems.values()) > 25:
+            raise ClientError({'Error': {'Code': 'ValidationException',
+                                         'Message': 'Too many items requested'}}, 'BatchWriteItem')
+        if self.random.random() < self.throttle_rate:
+            raise ClientError({'Error': {'Code': 'ProvisionedThroughputExceededException',
+                                         'Message': 'Throughput exceeded'}}, 'BatchWriteItem')
+
+        unprocessed = {}
+        for name, requests in RequestItems.items():
+            table = self.Table(name)
+            keys = [(r['PutRequest']['Item'][table.partition_key], r['PutRequest']['Item'][table.sort_key])
+                    for r in requests]
+            if len(set(keys)) != len(keys):
+                raise ClientError({'Error': {'Code': 'ValidationException',
+                                             'Message': 'Provided list of item keys contains duplicates'}},
+                                  'BatchWriteItem')
+            for request in requests:
+                if self.random.random() < self.unprocessed_rate:
+                    unprocessed.setdefault(name, []).append(request)
+                else:
+                    table.put_item(Item=request['PutRequest']['Item'])
+        return {'UnprocessedItems': unprocessed}
+
+
+def _key_bounds(condition, partition_key, sort_key):
+    """Extract (partition value, low, high) from a boto3 key condition"""
+    bounds = {'pk': None, 'low': None, 'high': None}
+
+    def walk(cond):
+        expr = cond.get_expression()
+        op = expr['operator']
+        values = expr['values']
+        if op == 'AND':
+            walk(values[0])
+            walk(values[1])
+            return
+        name = values[0].name
+        if name == partition_key and op == '=':
+            bounds['pk'] = values[1]
+        elif name == sort_key and op == 'BETWEEN':
+            bounds['low'], bounds['high'] = values[1], values[2]
+        elif name == sort_key and op in ('>', '>='):
+            bounds['low'] = values[1]
+        elif name == sort_key and op in ('<', '<='):
+            bounds['high'] = values[1]
+        elif name == sort_key and op == '=':
+            bounds['low'] = bounds['high'] = values[1]
+        elif name == sort_key and op == 'begins_with':
+            bounds['low'], bounds['high'] = values[1], values[1] + '\uffff'
+        else:
+            raise ValueError(f'Unsupported key condition: {name} {op}')
+
+    walk(condition)
+    return bounds['pk'], bounds['low'], bounds['high']
+
+
+class StubHTTPServer:
+    """Serve a fixed response body from a background thread
+
+    ``handler`` receives the request path (including query string) and
+    returns ``(status, content_type, body_bytes)``.
+    """
+
+    def __init__(self, handler, host='127.0.0.1', port=0):
+        stub = self
+        self.handler = handler
+        self.requests = []
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.requests.append(self.path)
+                status, content_type, body = stub.handler(self.path)
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), _Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+        return False
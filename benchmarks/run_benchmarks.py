@@ -0,0 +1,297 @@
+"""Benchmark the dashboard data path: query -> store -> figure
+
+Runs every case in a fresh interpreter so peak RSS is per case, against an
+in-memory DynamoDB stand-in and a local GDELT stub. Results are written as
+JSON so two commits can be compared:
+
+    python benchmarks/run_benchmarks.py --output base.json
+    python benchmarks/run_benchmarks.py --output head.json --compare base.json
+"""
+import argparse
+import json
+import os
+import re
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, UTC
+from urllib.parse import urlparse, parse_qs
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from synthetic import START
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+DASHBOARD_DIR = os.path.join(REPO_DIR, 'dashboard')
+
+
+FULL_MATRIX = {'days': [1, 7, 30, 180], 'coins': [10, 100]}
+QUICK_MATRIX = {'days': [1, 7], 'coins': [10]}
+PLOT_MODES = ['overlaid', 'multi_y', 'separated']
+
+# 1x1 transparent PNG used when the person images are not on disk, so the
+# overlay code paths still run
+PLACEHOLDER_IMAGE = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mNk'
+    'YAAAAAYAAjCB0C8AAAAASUVORK5CYII='
+)
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB"""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+def timed(fn, repeat):
+    """Run fn `repeat` times, return (last result, median milliseconds)"""
+    samples = []
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return result, round(statistics.median(samples), 3)
+
+
+def run_case(case):
+    """Execute one benchmark case in the current process and return its metrics"""
+    sys.path.insert(0, BENCH_DIR)
+    sys.path.insert(0, DASHBOARD_DIR)
+    sys.path.insert(0, os.path.join(REPO_DIR, 'src'))
+    os.chdir(DASHBOARD_DIR)
+
+    import synthetic
+    from fakes import FakeTable, StubHTTPServer
+
+    days, n_coins, n_articles = case['days'], case['coins'], case['articles']
+    repeat = case['repeat']
+    end = START + timedelta(days=days)
+
+    df_prices = synthetic.price_frame(days, n_coins, start=START)
+    df_fx = synthetic.fx_frame(df_prices)
+    if case['backend'] == 'sqlite':
+        from storage import SQLiteBackend
+        store = SQLiteBackend(os.path.join(tempfile.mkdtemp(), 'prices.db'))
+        store.write(df_prices.to_dict('records'))
+        store.write_fx(df_fx.to_dict('records'))
+    else:
+        from storage import DynamoDBBackend
+        table = FakeTable()
+        table.load(synthetic.dynamodb_items(df_prices))
+        table.load(synthetic.dynamodb_items(df_fx, partition='FX_RATES'))
+        store = DynamoDBBackend(table=table)
+    del df_prices
+
+    def gdelt_handler(path):
+        query = parse_qs(urlparse(path).query).get('query', [''])[0]
+        match = re.search(r'near\d+:"(\w+)', query)
+        person = match.group(1) if match else 'Trump'
+        body = synthetic.gdelt_csv(n_articles, START, end, person=person,
+                                   seed=synthetic.PEOPLE.index(person) if person in synthetic.PEOPLE else 0)
+        return 200, 'text/csv', body.encode()
+
+    with StubHTTPServer(gdelt_handler) as gdelt:
+        os.environ['GDELT_API_URL'] = gdelt.url + '/api/v2/doc/doc'
+
+        import plotly.io as pio
+        import callbacks
+        import dashboard
+
+        dashboard.store = store
+        for key, source in callbacks.IMAGE_PATHS.items():
+            if source is None:
+                callbacks.IMAGE_PATHS[key] = PLACEHOLDER_IMAGE
+
+        baseline_rss = peak_rss_mb()
+        metrics = {}
+
+        start_date = START.date().isoformat()
+        end_date = end.date().isoformat()
+        selected = synthetic.coin_names(n_coins)[:case['selected']]
+
+        df, metrics['get_data_ms'] = timed(
+            lambda: dashboard.get_data(store, f'{start_date}T00:00:00', f'{end_date}T23:59:59'), repeat)
+        crypto_store, metrics['query_database_ms'] = timed(
+            lambda: (dashboard.PRICE_CACHE.clear(), dashboard.query_database(start_date, end_date, selected)[0])[1], repeat)
+        _, metrics['query_database_cached_ms'] = timed(
+            lambda: dashboard.query_database(start_date, end_date, selected)[0], repeat)
+
+        # Eight users opening the same window at once: count backend reads
+        store_reads = []
+        query = store.query
+        store.query = lambda *a: (store_reads.append(a), query(*a))[1]
+        dashboard.PRICE_CACHE.clear()
+        threads = [threading.Thread(target=dashboard.query_database, args=(start_date, end_date, selected)) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        store.query = query
+        metrics['concurrent_store_reads'] = len(store_reads)
+
+        # Switching the display currency converts the cached range: no price query
+        crypto_store, cursor = dashboard.query_database(start_date, end_date, selected)
+        store_reads.clear()
+        store.query = lambda *a: (store_reads.append(a), query(*a))[1]
+        _, metrics['currency_switch_ms'] = timed(
+            lambda: (dashboard.CONVERTED_PRICES.clear(),
+                     dashboard.chart_callback(crypto_store, None, 'overlaid', [], 'usd', selected, cursor))[1], repeat)
+        store.query = query
+        metrics['currency_switch_store_reads'] = len(store_reads)
+
+        news_store, metrics['search_news_ms'] = timed(
+            lambda: (dashboard.NEWS_FLIGHT.cache.clear(), dashboard.NEWS_INDEX.clear(), dashboard.search_news(1, synthetic.PEOPLE[:case['people']], None, ['bitcoin'], None,
+                                          synthetic.DOMAINS, None, start_date, end_date)[0])[2],
+            repeat)
+
+        # Narrowing the last search (one person, two sources, first day) is answered locally
+        requests_before = len(gdelt.requests)
+        _, metrics['search_news_narrowed_ms'] = timed(
+            lambda: dashboard.search_news(1, synthetic.PEOPLE[:1], None, ['bitcoin'], None,
+                                          synthetic.DOMAINS[:2], None, start_date, start_date)[0], repeat)
+        metrics['narrowed_gdelt_requests'] = len(gdelt.requests) - requests_before
+
+        import sentiment
+        _, metrics['sentiment_chart_ms'] = timed(
+            lambda: (sentiment.SENTIMENT_CACHE.clear(), sentiment.update_sentiment_chart(news_store)), repeat)
+
+        figures = {}
+        for mode in PLOT_MODES:
+            fig, elapsed = timed(
+                lambda: callbacks.update_chart(crypto_store, None, selected, mode), repeat)
+            figures[mode] = {'update_chart_ms': elapsed, 'figure_bytes': len(pio.to_json(fig))}
+            if news_store:
+                fig, elapsed = timed(
+                    lambda: callbacks.update_chart(crypto_store, news_store, selected, mode), repeat)
+                figures[mode]['with_news_ms'] = elapsed
+                figures[mode]['with_news_bytes'] = len(pio.to_json(fig))
+
+    return {
+        'case': case,
+        'rows': len(df),
+        'crypto_store_bytes': len(crypto_store or ''),
+        'news_store_bytes': len(news_store or ''),
+        'gdelt_requests': len(gdelt.requests),
+        'latency': metrics,
+        'figures': figures,
+        'baseline_rss_mb': round(baseline_rss, 1),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       cwd=REPO_DIR, text=True).strip()
+    except Exception:
+        return None
+
+
+def run_matrix(matrix, args):
+    results = []
+    for days in matrix['days']:
+        for coins in matrix['coins']:
+            case = {
+                'days': days,
+                'coins': coins,
+                'selected': min(args.selected, coins),
+                'articles': args.articles,
+                'people': args.people,
+                'repeat': args.repeat,
+                'backend': args.backend,
+            }
+            print(f'Running {days}d x {coins} coins...', file=sys.stderr)
+            proc = subprocess.run([sys.executable, os.path.abspath(__file__), '--case', json.dumps(case)],
+                                  capture_output=True, text=True)
+            if proc.returncode != 0:
+                print(proc.stderr, file=sys.stderr)
+                results.append({'case': case, 'error': proc.stderr.strip().splitlines()[-1:]})
+                continue
+            results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+    return results
+
+
+def case_key(result):
+    case = result['case']
+    return (case['days'], case['coins'])
+
+
+def flatten(result):
+    """Flatten a result into {metric_name: value} for comparison"""
+    flat = {f'latency.{k}': v for k, v in result.get('latency', {}).items()}
+    for mode, values in result.get('figures', {}).items():
+        flat.update({f'{mode}.{k}': v for k, v in values.items()})
+    for key in ('peak_rss_mb', 'crypto_store_bytes'):
+        if key in result:
+            flat[key] = result[key]
+    return flat
+
+
+def compare(base, head):
+    """Print head/base ratios for every metric present in both reports"""
+    base_results = {case_key(r): flatten(r) for r in base['results']}
+    print(f"{'case':<14}{'metric':<38}{'base':>14}{'head':>14}{'ratio':>9}")
+    for result in head['results']:
+        key = case_key(result)
+        if key not in base_results:
+            continue
+        old = base_results[key]
+        for metric, value in flatten(result).items():
+            if metric not in old or not old[metric]:
+                continue
+            label = f'{key[0]}d x {key[1]}'
+            print(f'{label:<14}{metric:<38}{old[metric]:>14}{value:>14}{value / old[metric]:>9.2f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', help='Write the JSON report to this file (default: stdout)')
+    parser.add_argument('--compare', help='Previous JSON report to compare against')
+    parser.add_argument('--quick', action='store_true', help='Only run the small cases')
+    parser.add_argument('--days', type=int, nargs='+', help='Override the history lengths (days)')
+    parser.add_argument('--coins', type=int, nargs='+', help='Override the tracked coin counts')
+    parser.add_argument('--selected', type=int, default=5, help='Coins selected in the chart')
+    parser.add_argument('--articles', type=int, default=100, help='Articles returned per person')
+    parser.add_argument('--people', type=int, default=2, help='People searched in the news panel')
+    parser.add_argument('--repeat', type=int, default=3, help='Repetitions per measurement (median)')
+    parser.add_argument('--backend', default='dynamodb', choices=['dynamodb', 'sqlite'],
+                        help='Storage backend behind get_data (in-memory DynamoDB stand-in or SQLite file)')
+    parser.add_argument('--case', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        print(json.dumps(run_case(json.loads(args.case))))
+        return
+
+    matrix = dict(QUICK_MATRIX if args.quick else FULL_MATRIX)
+    if args.days:
+        matrix['days'] = args.days
+    if args.coins:
+        matrix['coins'] = args.coins
+
+    report = {
+        'revision': git_revision(),
+        'python': sys.version.split()[0],
+        'created': datetime.now(UTC).isoformat(),
+        'results': run_matrix(matrix, args),
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+
+if __name__ == '__main__':
+    main()
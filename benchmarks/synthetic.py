@@ -0,0 +1,92 @@
+"""Synthetic price histories and GDELT CSV payloads for the benchmarks"""
+from datetime import datetime, timedelta, UTC
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+
+TICK_SECONDS = 180  # scraper cron runs every 3 minutes
+START = datetime(2025, 10, 13, tzinfo=UTC)
+
+BASE_COINS = [
+    'bitcoin', 'ethereum', 'tether', 'binancecoin', 'solana',
+    'ripple', 'cardano', 'dogecoin', 'tron', 'usd-coin',
+]
+
+START_PRICES = {
+    'bitcoin': 95000.0, 'ethereum': 3500.0, 'tether': 0.92, 'binancecoin': 950.0,
+    'solana': 160.0, 'ripple': 2.1, 'cardano': 0.55, 'dogecoin': 0.17,
+    'tron': 0.27, 'usd-coin': 0.92,
+}
+
+PEOPLE = ['Trump', 'Musk', 'Putin', 'Lagarde']
+DOMAINS = ['wsj.com', 'ft.com', 'nytimes.com', 'bloomberg.com', 'coindesk.com']
+HEADLINE_WORDS = [
+    'bitcoin', 'rally', 'crash', 'regulation', 'market', 'surge', 'ban',
+    'crypto', 'tariff', 'rates', 'inflation', 'ETF', 'approval', 'selloff',
+]
+
+
+def coin_names(n_coins):
+    """Return the real coin ids padded with synthetic ones up to n_coins"""
+    extra = [f'coin-{i:03d}' for i in range(len(BASE_COINS) + 1, n_coins + 1)]
+    return (BASE_COINS + extra)[:n_coins]
+
+
+def price_frame(days, n_coins, start=START, seed=0, tick_seconds=TICK_SECONDS):
+    """Geometric random-walk prices at the scraper's 3-minute cadence
+
+    Timestamps carry a few seconds of jitter, like the cron-driven
+    ``datetime.now(UTC).isoformat()`` values written by the scraper.
+    """
+    rng = np.random.default_rng(seed)
+    n_ticks = int(days * 24 * 3600 / tick_seconds)
+    coins = coin_names(n_coins)
+
+    offsets = np.arange(n_ticks) * tick_seconds + rng.uniform(0, tick_seconds / 9, n_ticks)
+    timestamps = (pd.Timestamp(start) + pd.to_timedelta(offsets, unit='s')).round('us')
+
+    start_prices = np.array([START_PRICES.get(c, rng.uniform(0.01, 500)) for c in coins])
+    shocks = rng.normal(0, 0.0015, size=(n_ticks, n_coins))
+    prices = start_prices * np.exp(np.cumsum(shocks, axis=0))
+
+    df = pd.DataFrame(np.round(prices, 6), columns=coins)
+    df.insert(0, 'timestamp', [t.isoformat() for t in timestamps])
+    return df
+
+
+def fx_frame(df, every=20, seed=0):
+    """FX rows (usd, gbp per eur) at every `every`-th price tick, as the scraper writes them"""
+    rng = np.random.default_rng(seed)
+    ts = df['timestamp'].iloc[::every].reset_index(drop=True)
+    drift = np.cumsum(rng.normal(0, 0.0005, (len(ts), 2)), axis=0)
+    return pd.DataFrame({'timestamp': ts, 'usd': 1.08 * np.exp(drift[:, 0]), 'gbp': 0.85 * np.exp(drift[:, 1])})
+
+
+def dynamodb_items(df, partition='CRYPTO_PRICES'):
+    """Convert a price frame into items shaped like ``save_tick`` writes"""
+    ttl = int(datetime(2026, 4, 11, tzinfo=UTC).timestamp())
+    coins = [c for c in df.columns if c != 'timestamp']
+    values = df[coins].astype(str).to_numpy()
+    items = []
+    for ts, row in zip(df['timestamp'], values):
+        item = {'PK': partition, 'timestamp': ts, 'ttl': Decimal(ttl)}
+        item.update(zip(coins, map(Decimal, row)))
+        items.append(item)
+    return items
+
+
+def gdelt_csv(n_articles, start, end, person='Trump', seed=0):
+    """Build a GDELT ``artlist`` CSV body with n_articles rows between start and end"""
+    rng = np.random.default_rng(seed)
+    span = (end - start).total_seconds()
+    seconds = np.sort(rng.uniform(0, span, n_articles))[::-1]
+    lines = ['URL,MobileURL,Date,Title']
+    for i, s in enumerate(seconds):
+        date = start + timedelta(seconds=float(s))
+        domain = DOMAINS[i % len(DOMAINS)]
+        words = rng.choice(HEADLINE_WORDS, size=5)
+        title = f'{person} ' + ' '.join(words)
+        url = f'https://www.{domain}/{date:%Y/%m/%d}/article-{seed}-{i}'
+        lines.append(f'{url},,{date:%Y-%m-%d %H:%M:%S},{title}')
+    return '\n'.join(lines) + '\n'
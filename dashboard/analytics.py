@@ -0,0 +1,164 @@
+import threading
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
+from config import ANALYTICS_WINDOW, MAX_CORRELATION_COINS
+from resample import align_prices
+
+TICKS_PER_YEAR = 365 * 24 * 20  # 3-minute ticks
+
+
+def price_matrix(df, selected_cryptos):
+    """Float price matrix for the selected coins on the regular tick grid
+
+    Gaps are NaN rows, so returns and rolling windows never span an outage.
+    """
+    coins = [c for c in selected_cryptos if c in df.columns]
+    prices = df[coins].astype(float)
+    prices.index = pd.DatetimeIndex(pd.to_datetime(df['timestamp'], utc=True), name='timestamp')
+    return align_prices(prices)
+
+
+def log_returns(prices):
+    """Log returns between consecutive ticks (first row is NaN)"""
+    return np.log(prices).diff()
+
+
+def normalized(prices, base=None):
+    """Rebase every series to 100 at its first valid price"""
+    if base is None:
+        base = prices.bfill().iloc[0]
+    return prices / base * 100
+
+
+def rolling_volatility(returns, window=ANALYTICS_WINDOW):
+    """Annualized rolling volatility of log returns, in percent"""
+    return returns.rolling(window, min_periods=window).std() * np.sqrt(TICKS_PER_YEAR) * 100
+
+
+def _rolling_sum(values, window):
+    """Sum over the trailing `window` rows along axis 0 (NaN until full)"""
+    csum = np.cumsum(values, axis=0)
+    out = np.full(values.shape, np.nan)
+    if len(values) >= window:
+        out[window - 1] = csum[window - 1]
+        out[window:] = csum[window:] - csum[:-window]
+    return out
+
+
+def correlation_pairs(n_coins):
+    """Coin index pairs (i < j) in the column order of rolling_correlation"""
+    return [(i, j) for i in range(n_coins) for j in range(i + 1, n_coins)]
+
+
+def correlation_matrix(row, n_coins):
+    """Full symmetric matrix from one tick of rolling_correlation"""
+    matrix = np.eye(n_coins)
+    for value, (i, j) in zip(row, correlation_pairs(n_coins)):
+        matrix[i, j] = matrix[j, i] = value
+    return matrix
+
+
+def rolling_correlation(returns, window=ANALYTICS_WINDOW, chunk=64):
+    """Rolling correlation of every coin pair, shape (n_ticks, n_pairs), pairs as in correlation_pairs
+
+    Computed from cumulative sums of returns and their pairwise products, so
+    the cost is one pass over the data regardless of the window length.
+    Pairs are processed `chunk` at a time, so beyond the result only
+    O(n_ticks * chunk) is held. Windows containing a missing return are NaN.
+    """
+    x = returns.to_numpy(dtype=float)
+    valid = np.isfinite(x).all(axis=1)
+    x = np.where(valid[:, None], x, 0.0)
+
+    count = _rolling_sum(valid.astype(float), window)
+    sx = _rolling_sum(x, window)
+    var = _rolling_sum(x * x, window) - sx * sx / window
+
+    pairs = np.array(correlation_pairs(x.shape[1]), dtype=int).reshape(-1, 2)
+    corr = np.empty((len(x), len(pairs)))
+    for start in range(0, len(pairs), chunk):
+        i, j = pairs[start:start + chunk].T
+        cov = _rolling_sum(x[:, i] * x[:, j], window) - sx[:, i] * sx[:, j] / window
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr[:, start:start + chunk] = cov / np.sqrt(var[:, i] * var[:, j])
+    corr[count < window] = np.nan
+    return np.clip(corr, -1, 1)
+
+
+def compute_analytics(prices, window=ANALYTICS_WINDOW, base=None):
+    """Compute all derived series for a price matrix"""
+    returns = log_returns(prices)
+    return {
+        'prices': prices,
+        'normalized': normalized(prices, base),
+        'returns': returns,
+        'volatility': rolling_volatility(returns, window),
+        # None above MAX_CORRELATION_COINS: one series per pair would not fit in memory
+        'correlation': rolling_correlation(returns, window) if prices.shape[1] <= MAX_CORRELATION_COINS else None,
+    }
+
+
+class AnalyticsCache:
+    """Keep derived series per (display currency, coin selection) and extend them incrementally
+
+    When the new price matrix starts with the cached one (same first and
+    last cached timestamps), only the trailing window plus the new ticks
+    are recomputed and appended; otherwise everything is rebuilt.
+    """
+
+    def __init__(self, window=ANALYTICS_WINDOW, maxsize=8):
+        self.window = window
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        # Chart callbacks run concurrently on the Flask worker threads
+        self._lock = threading.Lock()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get(self, prices, currency=None):
+        key = (currency, tuple(prices.columns))
+        with self._lock:
+            cached = self._entries.get(key)
+
+        if cached is None or not self._extends(cached['prices'], prices):
+            result = compute_analytics(prices, self.window)
+        elif len(prices) == len(cached['prices']):
+            result = cached
+        else:
+            result = self._extend(cached, prices)
+
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return result
+
+    @staticmethod
+    def _extends(old, new):
+        n_old = len(old)
+        return (n_old > 0 and len(new) >= n_old
+                and new.index[0] == old.index[0]
+                and new.index[n_old - 1] == old.index[-1])
+
+    def _extend(self, cached, prices):
+        n_old = len(cached['prices'])
+        start = max(0, n_old - self.window - 1)
+        base = cached['prices'].bfill().iloc[0]
+        tail = compute_analytics(prices.iloc[start:], self.window, base=base)
+        skip = n_old - start
+
+        result = {'prices': prices}
+        for name in ('normalized', 'returns', 'volatility'):
+            result[name] = pd.concat([cached[name], tail[name].iloc[skip:]])
+        if cached['correlation'] is not None:
+            result['correlation'] = np.concatenate([cached['correlation'], tail['correlation'][skip:]])
+        else:
+            result['correlation'] = None
+        return result
+
+
+ANALYTICS_CACHE = AnalyticsCache()
@@ -0,0 +1,200 @@
+import hashlib
+import io
+from datetime import datetime, timedelta, UTC
+
+import pandas as pd
+from flask import Response, request, jsonify
+from health import prometheus_text
+
+NDJSON_CHUNK = 1000
+
+
+def _parse_time(value, default):
+    if not value:
+        return default
+    try:
+        ts = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f'Invalid time: {value!r} (expected an ISO date or timestamp)')
+    return ts if ts.tzinfo else ts.replace(tzinfo=UTC)
+
+
+def _range_args():
+    """(start, end) ISO strings from the query string; ValueError on a malformed one"""
+    end = _parse_time(request.args.get('end'), datetime.now(UTC))
+    start = _parse_time(request.args.get('start'), end - timedelta(days=1))
+    # Dates without a time cover the whole end day
+    if request.args.get('end') and len(request.args['end']) == 10:
+        end = end + timedelta(days=1) - timedelta(microseconds=1)
+    return start.isoformat(), end.isoformat()
+
+
+def _coins():
+    coins = request.args.get('coins')
+    if not coins:
+        return None
+    return [c.strip() for c in coins.split(',') if c.strip()]
+
+
+def _select_columns(df):
+    wanted = _coins()
+    if wanted is None or 'timestamp' not in df.columns:
+        return df
+    return df[['timestamp'] + [c for c in wanted if c in df.columns]]
+
+
+def _wants(fmt):
+    requested = request.args.get('format')
+    if requested:
+        return requested == fmt
+    accept = request.headers.get('Accept', '')
+    return {'ndjson': 'application/x-ndjson', 'arrow': 'application/vnd.apache.arrow.stream'}[fmt] in accept
+
+
+def _etag(*parts):
+    return hashlib.sha1('|'.join(map(str, parts)).encode()).hexdigest()[:20]
+
+
+def _data_etag(kind, df):
+    """ETag of a response: the request plus the rows it returns
+
+    Row count and first/last timestamp change whenever ticks are added to
+    the range, including a backfill into a past gap.
+    """
+    stamps = df['timestamp'] if 'timestamp' in df.columns and len(df) else None
+    return _etag(kind, *(request.args.get(k) for k in ('start', 'end', 'coins', 'bucket', 'format')),
+                 len(df), *(('', '') if stamps is None else (stamps.iloc[0], stamps.iloc[-1])))
+
+
+def _not_modified(etag):
+    return etag is not None and request.if_none_match.contains_weak(etag)
+
+
+def _respond(df, etag=None):
+    """Serialize a frame as NDJSON (streamed), Arrow IPC or a JSON document"""
+    headers = {}
+    if etag is not None:
+        headers['ETag'] = f'"{etag}"'
+        # Clients revalidate every time: a backfill can still change a past range
+        headers['Cache-Control'] = 'public, no-cache'
+
+    if _wants('arrow'):
+        try:
+            import pyarrow as pa
+        except ImportError:
+            return jsonify({'error': 'Arrow output requires pyarrow'}), 406
+        sink = io.BytesIO()
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return Response(sink.getvalue(), mimetype='application/vnd.apache.arrow.stream', headers=headers)
+
+    if _wants('ndjson'):
+        def generate():
+            for i in range(0, len(df), NDJSON_CHUNK):
+                # Each chunk already ends in a newline; another would put blank lines in the stream
+                yield df.iloc[i:i + NDJSON_CHUNK].to_json(orient='records', lines=True, date_format='iso')
+        return Response(generate(), mimetype='application/x-ndjson', headers=headers)
+
+    body = df.to_json(orient='split', index=False, date_format='iso')
+    return Response(body, mimetype='application/json', headers=headers)
+
+
+def ohlc(df, bucket):
+    """Long-format OHLC bars (timestamp, coin, open, high, low, close, ticks) per bucket"""
+    prices = df.drop(columns=['timestamp']).astype(float)
+    prices.index = pd.DatetimeIndex(pd.to_datetime(df['timestamp'], utc=True))
+    frames = []
+    for coin in prices.columns:
+        resampler = prices[coin].resample(bucket)
+        bars = resampler.ohlc()
+        bars['ticks'] = resampler.count()
+        bars = bars[bars['ticks'] > 0]
+        bars.insert(0, 'coin', coin)
+        frames.append(bars)
+    if not frames:
+        return pd.DataFrame(columns=['timestamp', 'coin', 'open', 'high', 'low', 'close', 'ticks'])
+    out = pd.concat(frames).reset_index(names='timestamp')
+    out['timestamp'] = out['timestamp'].map(lambda t: t.isoformat())
+    return out.sort_values(['timestamp', 'coin'], kind='stable').reset_index(drop=True)
+
+
+def _list_arg(name):
+    value = request.args.get(name)
+    return [v.strip() for v in value.split(',') if v.strip()] if value else None
+
+
+def register_api(server, load_prices, load_latest, news_index=None, health=None):
+    """Add the /api/* routes to the Flask server behind the Dash app
+
+    load_prices(time1, time2, coins) must return the same (cached) frame the
+    dashboard uses, reading only the requested coins' columns;
+    load_latest(coins) returns the most recent ticks through that same
+    cache. With a news_index,
+    /api/news filters the articles already fetched, without calling GDELT.
+    With a health monitor, /api/health returns its summary as JSON and
+    /metrics in the Prometheus text format.
+    """
+
+    @server.route('/api/prices')
+    def api_prices():
+        try:
+            start, end = _range_args()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        df = _select_columns(load_prices(start, end, _coins()))
+        etag = _data_etag('prices', df)
+        if _not_modified(etag):
+            return Response(status=304, headers={'ETag': f'"{etag}"'})
+        return _respond(df, etag)
+
+    @server.route('/api/ohlc')
+    def api_ohlc():
+        try:
+            start, end = _range_args()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        bucket = request.args.get('bucket', '1h')
+        try:
+            pd.Timedelta(bucket)
+        except ValueError:
+            return jsonify({'error': f'Invalid bucket: {bucket}'}), 400
+        df = _select_columns(load_prices(start, end, _coins()))
+        etag = _data_etag('ohlc', df)
+        if _not_modified(etag):
+            return Response(status=304, headers={'ETag': f'"{etag}"'})
+        return _respond(ohlc(df, bucket), etag)
+
+    @server.route('/api/latest')
+    def api_latest():
+        df = _select_columns(load_latest(_coins()))
+        if df.empty:
+            return jsonify({'error': 'No recent prices'}), 404
+        row = df.iloc[-1]
+        # A coin missing from the last tick is null: NaN is not valid JSON
+        return jsonify({k: (pd.Timestamp(v).isoformat() if k == 'timestamp' else None if pd.isna(v) else float(v))
+                        for k, v in row.items()})
+
+    if news_index is not None:
+        @server.route('/api/news')
+        def api_news():
+            keywords = _list_arg('keywords')
+            if keywords is not None and not request.args.get('person'):
+                return jsonify({'error': 'keywords requires person'}), 400
+            df = news_index.lookup(request.args.get('person'), keywords, _list_arg('sources'),
+                                   request.args.get('start'), request.args.get('end'), _list_arg('q'))
+            return _respond(df)
+
+    if health is not None:
+        @server.route('/api/health')
+        def api_health():
+            health.refresh()
+            summary = health.summary()
+            return jsonify(summary), 200 if summary['fresh'] else 503
+
+        @server.route('/metrics')
+        def metrics():
+            health.refresh()
+            return Response(prometheus_text(health.summary()), mimetype='text/plain; version=0.0.4')
+
+    return server
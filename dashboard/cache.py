@@ -0,0 +1,160 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, UTC
+
+import pandas as pd
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries may carry an expiry time"""
+
+    def __init__(self, maxsize=16):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires is not None and expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def keys(self):
+        """Snapshot of the keys that have not expired"""
+        now = time.monotonic()
+        with self._lock:
+            return [k for k, (_, expires) in self._entries.items() if expires is None or expires >= now]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def put(self, key, value, ttl=None):
+        with self._lock:
+            self._entries[key] = (value, None if ttl is None else time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+
+class _Call:
+    def __init__(self, key):
+        self.key = key
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    """Collapse concurrent identical loads into one backend call
+
+    The first caller for a key runs the load; callers arriving while it is
+    in flight wait for and share its result (or its exception). Successful
+    results are kept in `cache` for `ttl` seconds, so the backend sees at most
+    one call per key per ttl. With `covers(outer, inner)` and `narrow(value,
+    key)`, a request is also served from any in-flight or cached key that
+    contains it, e.g. a shorter time window inside a loaded one.
+    """
+
+    def __init__(self, cache, covers=None, narrow=None):
+        self.cache = cache
+        self.covers = covers
+        self.narrow = narrow
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.stats = {'loads': 0, 'shared': 0, 'cached': 0}
+
+    def _find(self, key):
+        """(value, None) for a cached hit, (None, call) to wait on, or (None, None)"""
+        value = self.cache.get(key)
+        if value is not None:
+            return value, None
+        if key in self._calls:
+            return None, self._calls[key]
+        if self.covers is None:
+            return None, None
+        for other, call in self._calls.items():
+            if self.covers(other, key):
+                return None, call
+        for other in self.cache.keys():
+            if self.covers(other, key):
+                value = self.cache.get(other)
+                if value is not None:
+                    return self.narrow(value, key), None
+        return None, None
+
+    def do(self, key, load, ttl=None, cacheable=None):
+        with self._lock:
+            value, call = self._find(key)
+            if value is not None:
+                self.stats['cached'] += 1
+                return value
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call(key)
+                self.stats['loads'] += 1
+            else:
+                self.stats['shared'] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value if call.key == key else self.narrow(call.value, key)
+
+        try:
+            call.value = load()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                if call.error is None and (cacheable is None or cacheable(call.value)):
+                    self.cache.put(key, call.value, ttl=ttl)
+                del self._calls[key]
+            call.done.set()
+        return call.value
+
+
+def range_covers(outer, inner):
+    """True when the (time1, time2, coins) window `outer` contains `inner` (coins None = all)"""
+    if not (outer[0] <= inner[0] and inner[1] <= outer[1]):
+        return False
+    return outer[2] is None or (inner[2] is not None and set(inner[2]) <= set(outer[2]))
+
+
+def narrow_frame(df, window):
+    """Rows and columns of a price frame inside a (time1, time2, coins) window
+
+    Rows are compared like the storage query compares timestamps: as
+    strings, or as instants for backends that return datetimes.
+    """
+    if 'timestamp' not in df.columns:
+        return df
+    stamps = df['timestamp']
+    if pd.api.types.is_datetime64_any_dtype(stamps):
+        lo, hi = (pd.Timestamp(t) for t in window[:2])
+        lo, hi = (t.tz_localize('UTC') if t.tz is None else t for t in (lo, hi))
+    else:
+        stamps, (lo, hi) = stamps.astype(str), window[:2]
+    df = df[(stamps >= lo) & (stamps <= hi)].reset_index(drop=True)
+    if window[2] is not None:
+        df = df[['timestamp'] + [c for c in window[2] if c in df.columns]]
+    return df
+
+
+def is_past(time2):
+    """True when a range ends before the current UTC day, i.e. can no longer change"""
+    end = datetime.fromisoformat(str(time2))
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=UTC)
+    today = datetime.now(UTC).replace(hour=0, minute=0, second=0, microsecond=0)
+    return end < today
@@ -2,7 +2,16 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import pandas as pd
 import math
-from config import CRYPTO_COLORS
+import numpy as np
+from config import (CRYPTO_COLORS, CRYPTO_LABELS, ANALYTICS_WINDOW, MAX_CORRELATION_COINS, SEPARATED_MAX_COLS,
+                    SEPARATED_ROW_HEIGHT, SEPARATED_MIN_ROW_HEIGHT)
+from analytics import ANALYTICS_CACHE, correlation_matrix, price_matrix
+from resolution import MultiResolutionIndex, plot_frame
+from stats import StatsIndex
+from events import news_times
+from currencies import BASE_CURRENCY, symbol, to_currency
+from sentiment import article_sentiment, sentiment_colors, marker_sizes, sentiment_label
+from live import PRICE_MODES
 from utils import load_dataframe_from_store, create_empty_figure, img_to_base64
 
 
@@ -15,150 +24,200 @@ IMAGE_PATHS = {
 }
 
 
-def update_chart(stored_crypto_data, stored_news_data, selected_cryptos, plot_mode):
-    """Main chart update callback logic"""
+def update_chart(stored_crypto_data, stored_news_data, selected_cryptos, plot_mode, index=None,
+                 currency=BASE_CURRENCY, fx=None):
+    """Main chart update callback logic
+
+    `index` is the dataset's cached MultiResolutionIndex in `currency`, when
+    available. Stored prices are in the base currency and are converted
+    with the `fx` rows; without rates for `currency` the chart stays in the base.
+    """
     if not stored_crypto_data or not selected_cryptos:
         return create_empty_figure()
     
     df = load_dataframe_from_store(stored_crypto_data)
+    if df is None or df.empty:
+        return create_empty_figure()
+    df, currency = to_currency(df, fx, currency)
     
     # Load news data if available
     df_news = None
     if stored_news_data:
         df_news = load_dataframe_from_store(stored_news_data)
     
+    # Price modes ship a bounded number of points; zooming refines the view
+    stats = None
+    if plot_mode in PRICE_MODES:
+        if index is None:
+            index = MultiResolutionIndex(df)
+        df = plot_frame(df, selected_cryptos, plot_mode, index=index)
+        stats = index.stats
+    
     if plot_mode == 'overlaid':
-        return create_overlaid_chart(df, selected_cryptos, df_news)
+        return create_overlaid_chart(df, selected_cryptos, df_news, stats, currency)
     elif plot_mode == 'multi_y':
-        return create_multi_y_chart(df, selected_cryptos, df_news)
+        return create_multi_y_chart(df, selected_cryptos, df_news, stats, currency)
+    elif plot_mode in ANALYTICS_MODES:
+        return create_analytics_chart(df, selected_cryptos, plot_mode, currency)
     else:  # separated
-        return create_separated_charts(df, selected_cryptos)
+        return create_separated_charts(df, selected_cryptos, df_news, stats, currency)
     
 
-def add_news_overlays_single_y(fig, df, df_news, selected_cryptos):
-    """Add news event images and markers for single Y-axis charts"""
-    if df_news is None or df_news.empty:
-        return
-    
-    # Calculate y position for images (above the chart)
-    y_min = float(df[selected_cryptos].min().min())
-    y_max = float(df[selected_cryptos].max().max())
-    y_range = y_max - y_min
-    image_y = y_max + y_range * 0.15
-    
-    # Ensure timestamp column exists in news data
-    if 'seendate' in df_news.columns:
-        df_news['Date'] = pd.to_datetime(df_news['seendate'], format='%Y%m%dT%H%M%SZ')
-    elif 'Date' not in df_news.columns:
+def news_points(df, df_news):
+    """Per-article overlay data for the overlaid and multi-axis charts, or None
+
+    A dict of the article x values (ISO strings), the position in `df` of
+    the closest tick, titles, sentiment scores, marker colors and sizes,
+    and the person's image; articles without an image are left out.
+    """
+    if 'seendate' not in df_news.columns and 'Date' not in df_news.columns:
+        return None
+    x_ns = pd.DatetimeIndex(pd.to_datetime(df['timestamp'], utc=True)).as_unit('ns').asi8
+    if len(x_ns) == 0:
+        return None
+    times = news_times(df_news)
+    images = np.asarray([IMAGE_PATHS.get(str(person).lower(), IMAGE_PATHS.get('trump'))
+                         for person in df_news['person']], dtype=object)
+    shown = np.asarray([image is not None for image in images], dtype=bool)
+    if not shown.any():
+        return None
+
+    order = np.argsort(x_ns, kind='stable')
+    event_ns = times.as_unit('ns').asi8[shown]
+    rows = order[nearest_positions(x_ns[order], event_ns)] if len(x_ns) > 1 else np.zeros(len(event_ns), dtype=int)
+    titles = df_news.get('title', df_news.get('Title', pd.Series('News Event', index=df_news.index)))
+    scores = article_sentiment(df_news).to_numpy()[shown]
+    return {
+        'x': np.asarray(times[shown].tz_convert(None).strftime('%Y-%m-%dT%H:%M:%S'), dtype=object),
+        'rows': rows,
+        'titles': np.asarray(titles.astype(str))[shown],
+        'scores': scores,
+        'colors': np.asarray(sentiment_colors(scores), dtype=object),
+        'sizes': marker_sizes(scores),
+        'images': images[shown],
+        'width': (x_ns.max() - x_ns.min()) / 1e6 * 0.015,  # 1.5% of the time range, in ms
+    }
+
+
+def add_news_images(fig, points, image_y, sizey, yanchor):
+    """One layout image per article, set in a single layout update"""
+    images = [dict(source=image, x=x, y=image_y, xref="x", yref="y", sizex=points['width'], sizey=sizey,
+                   xanchor="center", yanchor=yanchor, layer="above")
+              for image, x in zip(points['images'], points['x'])]
+    fig.update_layout(images=list(fig.layout.images) + images)
+
+
+def news_prices(df, points, crypto):
+    """The coin's price at the tick closest to each article"""
+    return df[crypto].to_numpy(dtype=float)[points['rows']]
+
+
+def add_news_markers(fig, points, crypto, prices, currency, **trace_kwargs):
+    """All articles' markers on one coin's line as a single trace"""
+    has_price = ~np.isnan(prices)
+    prefix = symbol(currency)
+    fig.add_trace(go.Scatter(
+        x=points['x'][has_price],
+        y=prices[has_price],
+        mode='markers',
+        # Fill and size show the headline's sentiment, the outline the coin
+        marker=dict(
+            size=points['sizes'][has_price],
+            color=points['colors'][has_price],
+            line=dict(color=CRYPTO_COLORS.get(crypto), width=2)
+        ),
+        showlegend=False,
+        hovertext=[f"{CRYPTO_LABELS.get(crypto)}: {prefix}{price:,.2f}<br>{title}"
+                   f"<br>Sentiment: {score:+.2f} ({sentiment_label(score)})"
+                   for price, title, score in zip(prices[has_price], points['titles'][has_price],
+                                                  points['scores'][has_price])],
+        hoverinfo='text',
+        **trace_kwargs
+    ))
+
+
+def add_news_lines(fig, points, top, prices_by_coin, **trace_kwargs):
+    """Dashed segments from each image down to the prices, batched into one trace (split by None)"""
+    segment_x, segment_y = [], []
+    for prices in prices_by_coin:
+        xs = np.repeat(points['x'], 3)
+        xs[2::3] = None
+        ys = np.empty(len(xs), dtype=object)
+        ys[0::3], ys[1::3], ys[2::3] = top, prices, None
+        keep = np.repeat(~np.isnan(prices), 3)
+        segment_x.append(xs[keep])
+        segment_y.append(ys[keep])
+    if not segment_x or not sum(len(xs) for xs in segment_x):
         return
-    
-    # Make crypto timestamps timezone-aware
-    df_crypto = df.copy()
-    df_crypto['timestamp'] = pd.to_datetime(df_crypto['timestamp'])
-    if df_crypto['timestamp'].dt.tz is None:
-        df_crypto['timestamp'] = df_crypto['timestamp'].dt.tz_localize('UTC')
-    
-    # Calculate image width (as fraction of time range)
-    time_range = (df_crypto['timestamp'].max() - df_crypto['timestamp'].min()).total_seconds() * 1000
-    image_width = time_range * 0.015  # 1.5% of time range
-    
-    # Add each news image as overlay
-    for i, row in df_news.iterrows():
-        date = pd.to_datetime(row['Date'])
-        
-        # Make date timezone-aware
-        if date.tz is None:
-            date = date.tz_localize('UTC')
-        
-        # Get the person's image
-        person_key = row['person'].lower()
-        image_source = IMAGE_PATHS.get(person_key, IMAGE_PATHS.get('trump'))
-        
-        if image_source is None:
-            continue
-        
-        # Add image
-        fig.add_layout_image(
-            dict(
-                source=image_source,
-                x=date,
-                y=image_y,
-                xref="x",
-                yref="y",
-                sizex=image_width,
-                sizey=y_range * 0.08,
-                xanchor="center",
-                yanchor="middle",
-                layer="above"
-            )
-        )
-        
-        # Find closest timestamp in crypto data
-        closest_idx = (df_crypto['timestamp'] - date).abs().idxmin()
-        
-        # Add lines and markers for each selected crypto
-        for crypto in selected_cryptos:
-            if crypto not in df.columns:
-                continue
-                
-            crypto_price = df.loc[closest_idx, crypto]
-            
-            # Add dashed line from image to price
-            fig.add_trace(go.Scatter(
-                x=[date, date],
-                y=[image_y - y_range * 0.04, crypto_price],
-                mode='lines',
-                line=dict(color='rgba(255,255,255,0.5)', width=1, dash='dash'),
-                showlegend=False,
-                hoverinfo='skip'
-            ))
-            
-            # Add point at intersection
-            fig.add_trace(go.Scatter(
-                x=[date],
-                y=[crypto_price],
-                mode='markers',
-                marker=dict(
-                    size=10,
-                    color=CRYPTO_COLORS.get(crypto, '#FFFFFF'),
-                    line=dict(color='white', width=2)
-                ),
-                showlegend=False,
-                hovertext=f"{crypto.capitalize()}: ${crypto_price:.2f}<br>{row.get('title', row.get('Title', 'News Event'))}",
-                hoverinfo='text'
-            ))
-    
-    # Add invisible scatter for hover on images
-    news_dates = pd.to_datetime(df_news['Date'])
-    if news_dates.dt.tz is None:
-        news_dates = news_dates.dt.tz_localize('UTC')
-    
     fig.add_trace(go.Scatter(
-        x=news_dates,
+        x=np.concatenate(segment_x),
+        y=np.concatenate(segment_y),
+        mode='lines',
+        line=dict(color='rgba(255,255,255,0.5)', width=1, dash='dash'),
+        showlegend=False,
+        hoverinfo='skip',
+        **trace_kwargs
+    ))
+
+
+def add_news_hover(fig, df_news, image_y, **trace_kwargs):
+    """Invisible markers under the images, for their hover text"""
+    fig.add_trace(go.Scatter(
+        x=news_times(df_news),
         y=[image_y] * len(df_news),
         mode='markers',
         marker=dict(size=60, opacity=0),
         hovertext=df_news.get('title', df_news.get('Title', 'News Event')),
         hoverinfo='text',
         name='News Events',
-        showlegend=False
+        showlegend=False,
+        **trace_kwargs
     ))
 
 
-def add_news_overlays_multi_y(fig, df, df_news, selected_cryptos):
-    """Add news event images and markers for multi Y-axis charts"""
+def add_news_overlays_single_y(fig, df, df_news, selected_cryptos, stats=None, currency=BASE_CURRENCY):
+    """Add news event images and markers for single Y-axis charts
+
+    Markers are one trace per coin and the dashed lines one trace in all,
+    so the figure grows with the coins, not with coins times articles.
+    """
+    if df_news is None or df_news.empty:
+        return
+    
+    # Calculate y position for images (above the chart)
+    if stats is None:
+        stats = StatsIndex.from_frame(df, selected_cryptos)
+    extent = stats.extent(selected_cryptos)
+    if extent is None:
+        return
+    y_min, y_max = extent
+    y_range = y_max - y_min
+    image_y = y_max + y_range * 0.15
+    
+    points = news_points(df, df_news)
+    if points is None:
+        return
+    add_news_images(fig, points, image_y, y_range * 0.08, "middle")
+    
+    prices = {crypto: news_prices(df, points, crypto) for crypto in selected_cryptos if crypto in df.columns}
+    add_news_lines(fig, points, image_y - y_range * 0.04, prices.values())
+    for crypto, coin_prices in prices.items():
+        add_news_markers(fig, points, crypto, coin_prices, currency)
+    add_news_hover(fig, df_news, image_y)
+
+
+def add_news_overlays_multi_y(fig, df, df_news, selected_cryptos, stats=None, currency=BASE_CURRENCY):
+    """Add news event images and markers for multi Y-axis charts (one marker trace per coin)"""
     if df_news is None or df_news.empty:
         return
     
     # Calculate individual y ranges for each crypto
-    crypto_ranges = {}
-    for crypto in selected_cryptos:
-        if crypto in df.columns:
-            crypto_ranges[crypto] = {
-                'min': float(df[crypto].min()),
-                'max': float(df[crypto].max()),
-                'range': float(df[crypto].max() - df[crypto].min())
-            }
+    if stats is None:
+        stats = StatsIndex.from_frame(df, selected_cryptos)
+    crypto_ranges = {
+        crypto: {'min': s['min'], 'max': s['max'], 'range': s['max'] - s['min']}
+        for crypto, s in stats.summary(selected_cryptos).items()
+    }
     
     # Use the first crypto's range for image positioning
     first_crypto = selected_cryptos[0]
@@ -169,118 +228,26 @@ def add_news_overlays_multi_y(fig, df, df_news, selected_cryptos):
     y_range = crypto_ranges[first_crypto]['range']
     image_y = y_max + y_range * 0.15
     
-    # Ensure timestamp column exists in news data
-    if 'seendate' in df_news.columns:
-        df_news['Date'] = pd.to_datetime(df_news['seendate'], format='%Y%m%dT%H%M%SZ')
-    elif 'Date' not in df_news.columns:
+    points = news_points(df, df_news)
+    if points is None:
         return
+    # Images sit on the first Y-axis
+    add_news_images(fig, points, image_y, y_range * 0.08, "bottom")
     
-    # Make crypto timestamps timezone-aware
-    df_crypto = df.copy()
-    df_crypto['timestamp'] = pd.to_datetime(df_crypto['timestamp'])
-    if df_crypto['timestamp'].dt.tz is None:
-        df_crypto['timestamp'] = df_crypto['timestamp'].dt.tz_localize('UTC')
+    # A dashed line only to the first crypto, to avoid overlaps
+    if first_crypto in df.columns:
+        add_news_lines(fig, points, image_y, [news_prices(df, points, first_crypto)], yaxis='y')
     
-    # Calculate image width
-    time_range = (df_crypto['timestamp'].max() - df_crypto['timestamp'].min()).total_seconds() * 1000
-    image_width = time_range * 0.015
-    
-    # Add each news image as overlay
-    for i, row in df_news.iterrows():
-        date = pd.to_datetime(row['Date'])
-        
-        if date.tz is None:
-            date = date.tz_localize('UTC')
-        
-        person_key = row['person'].lower()
-        image_source = IMAGE_PATHS.get(person_key, IMAGE_PATHS.get('trump'))
-        
-        if image_source is None:
+    # Markers for each crypto on its respective Y-axis
+    for j, crypto in enumerate(selected_cryptos):
+        if crypto not in df.columns or crypto not in crypto_ranges:
             continue
-        
-        # Add image (positioned relative to first Y-axis)
-        fig.add_layout_image(
-            dict(
-                source=image_source,
-                x=date,
-                y=image_y,
-                xref="x",
-                yref="y",
-                sizex=image_width,
-                sizey=y_range * 0.08,
-                xanchor="center",
-                yanchor="bottom",  # Changed to bottom anchor
-                layer="above"
-            )
-        )
-        
-        # Find closest timestamp
-        closest_idx = (df_crypto['timestamp'] - date).abs().idxmin()
-        
-        # Collect all y-values for this date to draw a single line
-        line_x = [date]
-        line_y = [image_y]
-        
-        # Add markers for each crypto on its respective Y-axis
-        for j, crypto in enumerate(selected_cryptos):
-            if crypto not in df.columns or crypto not in crypto_ranges:
-                continue
-            
-            crypto_price = df.loc[closest_idx, crypto]
-            yaxis_ref = 'y' if j == 0 else f'y{j+1}'
-            
-            # Add point at intersection
-            fig.add_trace(go.Scatter(
-                x=[date],
-                y=[crypto_price],
-                mode='markers',
-                marker=dict(
-                    size=10,
-                    color=CRYPTO_COLORS.get(crypto, '#FFFFFF'),
-                    line=dict(color='white', width=2)
-                ),
-                showlegend=False,
-                hovertext=f"{crypto.capitalize()}: ${crypto_price:.2f}<br>{row.get('title', row.get('Title', 'News Event'))}",
-                hoverinfo='text',
-                yaxis=yaxis_ref
-            ))
-            
-            # For the first crypto, add a single dashed line from image to price
-            if j == 0:
-                line_x.append(date)
-                line_y.append(crypto_price)
-        
-        # Add single dashed line (only for first crypto to avoid overlaps)
-        if len(line_y) > 1:
-            fig.add_trace(go.Scatter(
-                x=line_x,
-                y=line_y,
-                mode='lines',
-                line=dict(color='rgba(255,255,255,0.5)', width=1, dash='dash'),
-                showlegend=False,
-                hoverinfo='skip',
-                yaxis='y'
-            ))
-    
-    # Add invisible scatter for hover on images
-    news_dates = pd.to_datetime(df_news['Date'])
-    if news_dates.dt.tz is None:
-        news_dates = news_dates.dt.tz_localize('UTC')
-    
-    fig.add_trace(go.Scatter(
-        x=news_dates,
-        y=[image_y] * len(df_news),
-        mode='markers',
-        marker=dict(size=60, opacity=0),
-        hovertext=df_news.get('title', df_news.get('Title', 'News Event')),
-        hoverinfo='text',
-        name='News Events',
-        showlegend=False,
-        yaxis='y'
-    ))
+        add_news_markers(fig, points, crypto, news_prices(df, points, crypto), currency,
+                         yaxis='y' if j == 0 else f'y{j+1}')
+    add_news_hover(fig, df_news, image_y, yaxis='y')
 
 
-def create_overlaid_chart(df, selected_cryptos, df_news=None):
+def create_overlaid_chart(df, selected_cryptos, df_news=None, stats=None, currency=BASE_CURRENCY):
     """Create overlaid chart with single Y axis"""
     fig = go.Figure()
     
@@ -292,8 +259,8 @@ def create_overlaid_chart(df, selected_cryptos, df_news=None):
             x=pd.to_datetime(df['timestamp']),
             y=df[crypto],
             mode='lines',
-            name=crypto.capitalize(),
-            line=dict(color=CRYPTO_COLORS.get(crypto, '#FFFFFF'), width=2.5),
+            name=CRYPTO_LABELS.get(crypto),
+            line=dict(color=CRYPTO_COLORS.get(crypto), width=2.5),
             marker=dict(size=5)
         ))
     
@@ -324,19 +291,19 @@ def create_overlaid_chart(df, selected_cryptos, df_news=None):
                 font=dict(color="#FFFFFF")
             )
         ),
-        yaxis={'title': 'Price (USD)', 'tickformat': '$,.0f'},
+        yaxis={'title': f'Price ({currency.upper()})', 'tickprefix': symbol(currency), 'tickformat': ',.0f'},
         hovermode='closest',
         height=600
     )
     
     # Add news overlays AFTER layout is set
     if df_news is not None and not df_news.empty:
-        add_news_overlays_single_y(fig, df, df_news, selected_cryptos)
+        add_news_overlays_single_y(fig, df, df_news, selected_cryptos, stats, currency)
     
     return fig
 
 
-def create_multi_y_chart(df, selected_cryptos, df_news=None):
+def create_multi_y_chart(df, selected_cryptos, df_news=None, stats=None, currency=BASE_CURRENCY):
     """Create chart with multiple Y axes"""
     fig = go.Figure()
     
@@ -350,8 +317,8 @@ def create_multi_y_chart(df, selected_cryptos, df_news=None):
             x=pd.to_datetime(df['timestamp']),
             y=df[crypto],
             mode='lines',
-            name=crypto.capitalize(),
-            line=dict(color=CRYPTO_COLORS.get(crypto, '#FFFFFF'), width=2.5),
+            name=CRYPTO_LABELS.get(crypto),
+            line=dict(color=CRYPTO_COLORS.get(crypto), width=2.5),
             marker=dict(size=5),
             yaxis=yaxis_name
         ))
@@ -371,10 +338,11 @@ def create_multi_y_chart(df, selected_cryptos, df_news=None):
             continue
         
         if i == 0:
-            layout['yaxis'] = {'tickformat': '$,.0f', 'showticklabels': False}
+            layout['yaxis'] = {'tickprefix': symbol(currency), 'tickformat': ',.0f', 'showticklabels': False}
         else:
             layout[f'yaxis{i+1}'] = {
-                'tickformat': '$,.0f',
+                'tickprefix': symbol(currency),
+                'tickformat': ',.0f',
                 'overlaying': 'y',
                 'showticklabels': False
             }
@@ -383,54 +351,126 @@ def create_multi_y_chart(df, selected_cryptos, df_news=None):
     
     # Add news overlays AFTER layout is set
     if df_news is not None and not df_news.empty:
-        add_news_overlays_multi_y(fig, df, df_news, selected_cryptos)
+        add_news_overlays_multi_y(fig, df, df_news, selected_cryptos, stats, currency)
     
     return fig
 
 
-def create_separated_charts(df, selected_cryptos):
-    """Create separated subplots - news overlay not supported in this mode"""
-    n_cryptos = len(selected_cryptos)
-    n_cols = 2
+def separated_grid(n_cryptos):
+    """(rows, cols, row height in px) for n separated subplots"""
+    n_cols = min(SEPARATED_MAX_COLS, max(2, math.ceil(math.sqrt(n_cryptos)))) if n_cryptos > 1 else 1
     n_rows = math.ceil(n_cryptos / n_cols)
+    plot_height = SEPARATED_ROW_HEIGHT if n_rows <= 3 else SEPARATED_MIN_ROW_HEIGHT
+    return n_rows, n_cols, plot_height
+
+
+def nearest_positions(x_ns, times_ns):
+    """Index of the closest x for every event time (x sorted ascending)"""
+    pos = np.clip(np.searchsorted(x_ns, times_ns), 1, len(x_ns) - 1)
+    left_closer = (times_ns - x_ns[pos - 1]) <= (x_ns[pos] - times_ns)
+    return np.where(left_closer, pos - 1, pos)
+
+
+def add_news_overlays_separated(fig, x, df, df_news, cells, stats, currency=BASE_CURRENCY):
+    """News markers and event lines for separated subplots: two traces per subplot
+
+    Every article becomes a point on each coin's line plus a dashed vertical
+    segment spanning the subplot, batched into one trace each (segments are
+    separated by None), so the figure grows with subplots, not articles.
+    """
+    event_times = news_times(df_news).tz_convert(None).to_numpy(dtype='datetime64[ns]')
+    if len(event_times) == 0 or len(x) < 2:
+        return
+    x_ns = x.astype('datetime64[ns]').view('int64')
+    inside = (event_times.view('int64') >= x_ns[0]) & (event_times.view('int64') <= x_ns[-1])
+    event_times = event_times[inside]
+    if len(event_times) == 0:
+        return
+    nearest = nearest_positions(x_ns, event_times.view('int64'))
+    titles = df_news.get('title', df_news.get('Title', pd.Series('News Event', index=df_news.index)))
+    titles = np.asarray(titles.astype(str))[inside]
+    people = np.asarray(df_news['person'].astype(str).str.capitalize())[inside] if 'person' in df_news.columns \
+        else np.full(len(event_times), '')
+    scores = np.round(article_sentiment(df_news).to_numpy()[inside], 3)
+    colors = np.asarray(sentiment_colors(scores), dtype=object)
+    prefix = symbol(currency)
+    summary = stats.summary([crypto for crypto, _, _ in cells])
+    event_x = np.asarray(pd.DatetimeIndex(event_times).strftime('%Y-%m-%dT%H:%M:%S'), dtype=object)
+    segment_x = np.repeat(event_x, 3)
+    segment_x[2::3] = None
+
+    for crypto, row, col in cells:
+        if crypto not in summary:
+            continue
+        prices = df[crypto].to_numpy(dtype=float)[nearest]
+        lo, hi = summary[crypto]['min'], summary[crypto]['max']
+
+        segment_y = np.tile([lo, hi, None], len(event_times))
+        fig.add_trace(go.Scatter(
+            x=segment_x, y=segment_y, mode='lines',
+            line=dict(color='rgba(255,255,255,0.35)', width=1, dash='dash'),
+            showlegend=False, hoverinfo='skip'
+        ), row=row, col=col)
+
+        has_price = ~np.isnan(prices)
+        fig.add_trace(go.Scatter(
+            x=event_x[has_price], y=prices[has_price], mode='markers',
+            marker=dict(size=marker_sizes(scores[has_price], base=6, scale=8), color=colors[has_price],
+                        line=dict(color=CRYPTO_COLORS.get(crypto), width=1.5)),
+            showlegend=False,
+            hovertext=[(f"{CRYPTO_LABELS.get(crypto)}: {prefix}{p:,.2f}<br>{who}: {title}" if who else f"{CRYPTO_LABELS.get(crypto)}: {prefix}{p:,.2f}<br>{title}")
+                       + f"<br>Sentiment: {score:+.2f}"
+                       for p, who, title, score in zip(prices[has_price], people[has_price], titles[has_price],
+                                                       scores[has_price])],
+            hoverinfo='text'
+        ), row=row, col=col)
+
+
+def create_separated_charts(df, selected_cryptos, df_news=None, stats=None, currency=BASE_CURRENCY):
+    """Create separated subplots on a grid sized to the selection, with optional news markers"""
+    n_cryptos = len(selected_cryptos)
+    n_rows, n_cols, plot_height = separated_grid(n_cryptos)
     
-    plot_height = 250
-    gap = 120
+    gap = 120 if n_rows <= 3 else 70
     total_height = (plot_height * n_rows) + (gap * (n_rows - 1)) + 150
     v_spacing = gap / total_height if n_rows > 1 else 0.1
     
     fig = make_subplots(
         rows=n_rows,
         cols=n_cols,
-        subplot_titles=[crypto.capitalize() for crypto in selected_cryptos],
+        subplot_titles=[CRYPTO_LABELS.get(crypto) for crypto in selected_cryptos],
         vertical_spacing=v_spacing,
-        horizontal_spacing=0.1
+        horizontal_spacing=0.1 if n_cols <= 2 else 0.05
     )
     
-    for i, crypto in enumerate(selected_cryptos):
-        if crypto not in df.columns:
-            continue
-        
-        row = (i // n_cols) + 1
-        col = (i % n_cols) + 1
-        
-        fig.add_trace(
-            go.Scatter(
-                x=pd.to_datetime(df['timestamp']),
-                y=df[crypto],
-                mode='lines',
-                name=crypto.capitalize(),
-                line=dict(color=CRYPTO_COLORS.get(crypto, '#FFFFFF'), width=2.5),
-                marker=dict(size=4),
-                showlegend=False
-            ),
-            row=row,
-            col=col
-        )
-        
-        fig.update_yaxes(title_text='Price (USD)', row=row, col=col, tickformat='$,.0f')
+    # Parse the time axis once; every subplot's trace references the same array
+    x = pd.DatetimeIndex(pd.to_datetime(df['timestamp'], utc=True)).tz_convert(None).to_numpy(dtype='datetime64[ns]')
+    if not (x.view('int64') % 10**9).any():
+        x = x.astype('datetime64[s]')  # grid timestamps: serialize without nanosecond digits
+    
+    cells = [(crypto, (i // n_cols) + 1, (i % n_cols) + 1)
+             for i, crypto in enumerate(selected_cryptos) if crypto in df.columns]
+    fig.add_traces(
+        [go.Scatter(
+            x=x,
+            y=df[crypto].to_numpy(dtype=float),
+            mode='lines',
+            name=CRYPTO_LABELS.get(crypto),
+            line=dict(color=CRYPTO_COLORS.get(crypto), width=2 if n_rows > 3 else 2.5),
+            showlegend=False
+        ) for crypto, _, _ in cells],
+        rows=[row for _, row, _ in cells],
+        cols=[col for _, _, col in cells]
+    )
+    
+    fig.update_yaxes(tickprefix=symbol(currency), tickformat=',.0f')
+    fig.update_yaxes(title_text=f'Price ({currency.upper()})', col=1)
+    fig.update_xaxes(title_text='Time', row=n_rows)
     
-    fig.update_xaxes(title_text='Time')
+    if df_news is not None and not df_news.empty and cells:
+        if stats is None:
+            stats = StatsIndex.from_frame(df, [crypto for crypto, _, _ in cells])
+        add_news_overlays_separated(fig, x, df, df_news, cells, stats, currency)
     
     fig.update_layout(
         template='plotly_dark',
@@ -441,4 +481,101 @@ def create_separated_charts(df, selected_cryptos):
         margin=dict(t=100, b=50, l=50, r=50)
     )
     
-    return fig
\ No newline at end of file
+    return fig
+
+
+ANALYTICS_MODES = {
+    'normalized': ('Rebased Prices (first tick = 100)', 'Index', ',.1f'),
+    'returns': ('Log Returns per Tick', 'Log return', '.2%'),
+    'volatility': (f'Rolling Volatility ({ANALYTICS_WINDOW}-tick window, annualized)', 'Volatility (%)', ',.1f'),
+    'correlation': (f'Rolling Correlation ({ANALYTICS_WINDOW}-tick window)', 'Correlation', '.2f'),
+}
+
+
+def create_analytics_chart(df, selected_cryptos, plot_mode, currency=BASE_CURRENCY):
+    """Create chart of derived analytics (rebased, returns, volatility, correlation)"""
+    prices = price_matrix(df, selected_cryptos)
+    if prices.empty:
+        return create_empty_figure()
+
+    analytics = ANALYTICS_CACHE.get(prices, currency)
+    title, y_title, tickformat = ANALYTICS_MODES[plot_mode]
+
+    if plot_mode == 'correlation':
+        return create_correlation_chart(analytics, title)
+
+    series = analytics[plot_mode]
+    fig = go.Figure()
+    for crypto in series.columns:
+        fig.add_trace(go.Scatter(
+            x=series.index,
+            y=series[crypto],
+            mode='lines',
+            name=CRYPTO_LABELS.get(crypto),
+            line=dict(color=CRYPTO_COLORS.get(crypto), width=2)
+        ))
+
+    fig.update_layout(
+        title=title,
+        template='plotly_dark',
+        paper_bgcolor='#1E1E1E',
+        plot_bgcolor='#2D2D2D',
+        xaxis=dict(title='Time', rangeslider_visible=True, rangeslider_thickness=0.1),
+        yaxis={'title': y_title, 'tickformat': tickformat},
+        hovermode='x unified',
+        height=600
+    )
+    return fig
+
+
+def create_correlation_chart(analytics, title):
+    """Rolling correlation against the first selected coin plus the latest full matrix"""
+    coins = list(analytics['prices'].columns)
+    corr = analytics['correlation']
+    index = analytics['prices'].index
+    if corr is None:
+        fig = go.Figure(create_empty_figure())
+        fig.update_layout(title=f'Rolling correlation is limited to {MAX_CORRELATION_COINS} coins '
+                                f'({len(coins)} selected); select fewer coins')
+        return fig
+
+    fig = make_subplots(
+        rows=1, cols=2,
+        column_widths=[0.62, 0.38],
+        subplot_titles=[f'Correlation with {CRYPTO_LABELS.get(coins[0])}', 'Latest window'],
+        horizontal_spacing=0.12
+    )
+
+    # Pairs (0, j) come first, in coin order
+    for j, crypto in enumerate(coins[1:], start=1):
+        fig.add_trace(go.Scatter(
+            x=index,
+            y=corr[:, j - 1],
+            mode='lines',
+            name=CRYPTO_LABELS.get(crypto),
+            line=dict(color=CRYPTO_COLORS.get(crypto), width=2)
+        ), row=1, col=1)
+
+    valid = np.flatnonzero(np.isfinite(corr).all(axis=1)) if len(corr) else []
+    if len(valid):
+        labels = [CRYPTO_LABELS.get(c) for c in coins]
+        fig.add_trace(go.Heatmap(
+            z=np.round(correlation_matrix(corr[valid[-1]], len(coins)), 3),
+            x=labels,
+            y=labels,
+            zmin=-1,
+            zmax=1,
+            colorscale='RdBu',
+            showscale=True
+        ), row=1, col=2)
+
+    fig.update_yaxes(range=[-1.05, 1.05], row=1, col=1)
+    fig.update_layout(
+        title=title,
+        template='plotly_dark',
+        paper_bgcolor='#1E1E1E',
+        plot_bgcolor='#2D2D2D',
+        hovermode='closest',
+        height=600
+    )
+    return fig
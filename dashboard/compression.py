@@ -0,0 +1,80 @@
+"""Response compression for the dashboard's Flask server
+
+Callback responses (figures, stored frames), the JSON API and Dash's own
+script bundles are compressed with brotli when the client accepts it and
+the `brotli` package is installed, otherwise with gzip. Streamed responses
+(NDJSON) and bodies below the size threshold go out unchanged. Static
+bundles are compressed once per worker and then served from memory.
+"""
+import gzip
+import hashlib
+from collections import OrderedDict
+
+from flask import request
+from config import COMPRESS_MIN_BYTES, COMPRESS_GZIP_LEVEL, COMPRESS_BROTLI_QUALITY
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = ('application/json', 'application/javascript', 'text/', 'application/x-ndjson')
+STATIC_PREFIXES = ('/_dash-component-suites/', '/assets/')
+STATIC_CACHE_SIZE = 64
+
+
+def choose_encoding(accept_encoding):
+    """'br', 'gzip' or None for an Accept-Encoding header"""
+    offered = {part.split(';')[0].strip().lower() for part in (accept_encoding or '').split(',')}
+    if brotli is not None and 'br' in offered:
+        return 'br'
+    if 'gzip' in offered:
+        return 'gzip'
+    return None
+
+
+def compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=COMPRESS_BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=COMPRESS_GZIP_LEVEL, mtime=0)
+
+
+def register_compression(server, min_size=COMPRESS_MIN_BYTES):
+    """Compress eligible responses of `server` after each request"""
+    static_cache = OrderedDict()
+
+    @server.after_request
+    def compress_response(response):
+        response.vary.add('Accept-Encoding')
+        if (response.direct_passthrough or response.is_streamed or response.status_code != 200
+                or 'Content-Encoding' in response.headers
+                or not (response.mimetype or '').startswith(COMPRESSIBLE_TYPES)):
+            return response
+        encoding = choose_encoding(request.headers.get('Accept-Encoding'))
+        if encoding is None:
+            return response
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+
+        if request.path.startswith(STATIC_PREFIXES):
+            key = (request.path, encoding, hashlib.sha1(data).digest())
+            body = static_cache.get(key)
+            if body is None:
+                body = static_cache[key] = compress(data, encoding)
+                if len(static_cache) > STATIC_CACHE_SIZE:
+                    static_cache.popitem(last=False)
+            else:
+                static_cache.move_to_end(key)
+        else:
+            body = compress(data, encoding)
+
+        response.set_data(body)
+        response.headers['Content-Encoding'] = encoding
+        # The compressed bytes differ from the identity representation
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+    return server
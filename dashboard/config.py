@@ -1,12 +1,106 @@
-CRYPTO_COLORS = {
-    'bitcoin': '#F7931A',
-    'ethereum': '#627EEA',
-    'tether': '#26A17B',
-    'binancecoin': '#F3BA2F',
-    'solana': '#14F195',
-    'ripple': '#23292F',
-    'cardano': '#0033AD',
-    'dogecoin': '#C2A633',
-    'tron': '#FF060A',
-    'usd-coin': '#2775CA',
-}
\ No newline at end of file
+import os
+import sys
+
+# Modules shared with the scraper (storage codecs) live in src/
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+if SRC_DIR not in sys.path:
+    sys.path.append(SRC_DIR)
+
+from coins import coin_colors, coin_labels
+from currencies import BASE_CURRENCY, QUOTE_CURRENCIES
+
+# Trace colors and names come from the coin registry (src/coins.py); coins
+# outside it get a stable palette color and their id in title case
+CRYPTO_COLORS = coin_colors()
+CRYPTO_LABELS = coin_labels()
+
+# GDELT DOC API endpoint (overridable so benchmarks can point at a local stub)
+GDELT_API_URL = os.environ.get('GDELT_API_URL', 'https://api.gdeltproject.org/api/v2/doc/doc')
+
+# Rolling window for derived analytics, in ticks (20 ticks = 1 hour at the 3-minute cadence)
+ANALYTICS_WINDOW = 20
+# Rolling correlation keeps one series per coin pair, so it is only computed
+# for selections of at most this many coins (190 pairs)
+MAX_CORRELATION_COINS = 20
+
+# Event-study windows around each article, in minutes (negative = before publication)
+EVENT_WINDOWS = [-60, 60, 360]
+# Ignore prices older than this when looking up the price at a window edge (minutes)
+EVENT_MAX_STALENESS = 15
+
+# Live mode: poll interval (seconds) and the minimum number of points kept per trace
+LIVE_POLL_SECONDS = 60
+LIVE_MAX_POINTS = 2880  # 6 days at the 3-minute cadence
+# A poll never reads further back than this (minutes), however old the client's cursor is
+LIVE_TAIL_WINDOW = 24 * 60
+
+# Viewport loading: maximum points per trace shipped for one view, and the
+# aggregation levels (pandas offsets) kept on the server, finest first
+MAX_POINTS_PER_VIEW = 1500
+RESOLUTION_LEVELS = ['15min', '1h', '4h', '1D']
+
+# Regular grid the scraper ticks are snapped to, and how long a price may be
+# carried forward across missing ticks before the gap is shown as a break
+GRID_FREQ = '3min'
+GRID_FILL_TOLERANCE = '6min'
+
+# Storage backend: 'dynamodb' (production table) or 'sqlite' (local file at
+# CRYPTO_SQLITE_PATH, see src/storage.py)
+STORAGE_BACKEND = os.environ.get('CRYPTO_STORAGE_BACKEND', 'dynamodb')
+
+# Stored price format: 'items' (one item per tick) or 'blocks' (compressed
+# per-block items written by the scraper, raw items for the open block)
+STORAGE_FORMAT = os.environ.get('CRYPTO_STORAGE_FORMAT', 'items')
+BLOCK_SECONDS = int(os.environ.get('CRYPTO_BLOCK_SECONDS', '3600'))
+
+# Server-side price cache shared by the dashboard callbacks and the JSON API:
+# number of ranges kept, and how long a range that reaches the present stays fresh
+PRICE_CACHE_SIZE = 16
+RECENT_CACHE_SECONDS = 60
+# How long an identical GDELT search reuses the previous response
+NEWS_CACHE_SECONDS = 300
+# Articles kept in the local news index before the least recently used searches are dropped
+NEWS_INDEX_MAX_ARTICLES = int(os.environ.get('NEWS_INDEX_MAX_ARTICLES', '50000'))
+# Rows GDELT returns at most per query; a full answer may be truncated
+GDELT_MAX_RECORDS = 250
+
+# Separated mode grid: columns grow with the number of coins up to this
+# limit, and rows shrink towards the minimum height once there are many
+SEPARATED_MAX_COLS = int(os.environ.get('SEPARATED_MAX_COLS', '4'))
+SEPARATED_ROW_HEIGHT = 250
+SEPARATED_MIN_ROW_HEIGHT = 160
+
+# Response compression on the Flask server: bodies smaller than this are sent
+# as-is; gzip level and brotli quality (brotli only when the package is installed)
+COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', '1024'))
+COMPRESS_GZIP_LEVEL = 6
+COMPRESS_BROTLI_QUALITY = 5
+
+# Figures ship prices rounded to this many significant digits of each trace's largest value
+PRICE_SIGNIFICANT_DIGITS = 7
+
+# Headline sentiment (dashboard/sentiment.py): article scores cached per URL,
+# and the compound score beyond which an article counts as positive/negative
+SENTIMENT_CACHE_SIZE = 20000
+SENTIMENT_NEUTRAL = 0.05
+
+# Display currencies: prices are stored in BASE_CURRENCY and converted with the
+# stored FX series (src/currencies.py); converted frames kept per (range, currency)
+DISPLAY_CURRENCIES = QUOTE_CURRENCIES
+CURRENCY_CACHE_SIZE = 16
+
+# Ingestion health (dashboard/health.py): days of tick coverage kept, how often
+# new ticks are read, and the age of the last tick beyond which data is stale
+HEALTH_DAYS = int(os.environ.get('HEALTH_DAYS', '30'))
+HEALTH_REFRESH_SECONDS = 60
+FRESHNESS_SLA_SECONDS = int(os.environ.get('FRESHNESS_SLA_SECONDS', '600'))
+# Run src/backfill.py for detected gaps (DynamoDB backend only), once a gap is
+# older than the grace period so late scheduled runs are not backfilled twice
+HEALTH_AUTO_BACKFILL = os.environ.get('HEALTH_AUTO_BACKFILL', '').lower() in ('1', 'true', 'yes')
+HEALTH_BACKFILL_GRACE_SECONDS = 900
+
+# Parquet snapshots exported from the dashboard (src/snapshot.py): one
+# directory (and zip download) per export under SNAPSHOT_DIR. Run the
+# dashboard from one with CRYPTO_STORAGE_BACKEND=snapshot and CRYPTO_SNAPSHOT_PATH.
+SNAPSHOT_DIR = os.environ.get('CRYPTO_SNAPSHOT_DIR',
+                              os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'snapshots'))
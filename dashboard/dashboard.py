@@ -1,45 +1,209 @@
-from dash import Dash, html, dcc, Input, Output, State
+from dash import Dash, html, dcc, dash_table, Input, Output, State, Patch, no_update
 import pandas as pd
 import plotly.graph_objs as go
 from plotly.subplots import make_subplots
 import boto3
-from boto3.dynamodb.conditions import Key
 import requests
-from datetime import datetime, timedelta, date
+from datetime import datetime, timedelta, date, UTC
 from io import StringIO
 import os
 import math
-from callbacks import update_chart
+import time
+import shutil
 from dotenv import load_dotenv
 
 load_dotenv()
 
+from callbacks import update_chart
+from config import (GDELT_API_URL, EVENT_WINDOWS, LIVE_POLL_SECONDS, LIVE_TAIL_WINDOW, STORAGE_BACKEND, STORAGE_FORMAT, BLOCK_SECONDS,
+                    PRICE_CACHE_SIZE, RECENT_CACHE_SECONDS, NEWS_CACHE_SECONDS, GDELT_MAX_RECORDS,
+                    BASE_CURRENCY, DISPLAY_CURRENCIES, CURRENCY_CACHE_SIZE, HEALTH_AUTO_BACKFILL,
+                    HEALTH_REFRESH_SECONDS, SNAPSHOT_DIR)
+from storage import DynamoDBBackend, get_backend
+from events import update_event_study
+from sentiment import update_sentiment_chart
+from live import make_cursor, build_tail_update, tail_since
+from resolution import MultiResolutionIndex, RESOLUTION_INDEXES, visible_range
+from stats import axis_ranges
+from coins import selector_options
+from currencies import to_currency
+from analytics import ANALYTICS_CACHE
+from cache import TTLCache, SingleFlight, is_past, range_covers, narrow_frame
+from api import register_api
+from newsindex import NewsIndex
+from compression import register_compression
+from payload import minimize_figure, encode_x, encode_y
+from health import HealthMonitor, update_health_panel
+from snapshots import export_snapshot
+
 # AWS configuration 
 AWS_ACCESS_KEY_ID = os.environ.get('AWS_ACCESS_KEY_ID')
 AWS_SECRET_ACCESS_KEY = os.environ.get('AWS_SECRET_ACCESS_KEY')
 AWS_REGION = 'us-east-1'
 
-dynamodb = boto3.resource(
-    'dynamodb',
-    aws_access_key_id=os.environ.get('AWS_ACCESS_KEY_ID'),
-    aws_secret_access_key=os.environ.get('AWS_SECRET_ACCESS_KEY'),
-    region_name='us-east-1'
-)
-table = dynamodb.Table('crypto-prices')
+if STORAGE_BACKEND == 'dynamodb':
+    dynamodb = boto3.resource(
+        'dynamodb',
+        aws_access_key_id=os.environ.get('AWS_ACCESS_KEY_ID'),
+        aws_secret_access_key=os.environ.get('AWS_SECRET_ACCESS_KEY'),
+        region_name='us-east-1'
+    )
+    store = DynamoDBBackend(table=dynamodb.Table('crypto-prices'),
+                            storage_format=STORAGE_FORMAT, block_seconds=BLOCK_SECONDS)
+else:
+    store = get_backend(STORAGE_BACKEND)
+
+def get_data(store, time1, time2, coins=None):
+    try:
+        return store.query(time1, time2, coins)
+    except Exception as e:
+        raise Exception(f'Query failed: {e}')
+
 
-def get_data(table, time1, time2):
+def get_data_since(store, since, coins=None):
+    """Fetch only the rows strictly newer than `since`"""
     try:
-        response = table.query(
-            KeyConditionExpression =Key('PK').eq('CRYPTO_PRICES') &
-                                    Key('timestamp').between(time1, time2)
-        )
-        df = pd.DataFrame(response['Items']).drop(columns=['ttl', 'PK'])
-        return df
+        return store.query_since(since, coins)
     except Exception as e:
         raise Exception(f'Query failed: {e}')
 
 
+PRICE_CACHE = TTLCache(maxsize=PRICE_CACHE_SIZE)
+PRICE_FLIGHT = SingleFlight(PRICE_CACHE, covers=range_covers, narrow=narrow_frame)
+
+
+def invalidate_prices():
+    """Drop every cached price range and what was derived from it (after past ticks changed)"""
+    PRICE_CACHE.clear()
+    FX_FLIGHT.cache.clear()
+    CONVERTED_PRICES.clear()
+    RESOLUTION_INDEXES.clear()
+    ANALYTICS_CACHE.clear()
+
+
+# Store version last seen and when it was checked (monotonic seconds)
+STORE_VERSION = {'value': None, 'checked': None}
+
+
+def check_store_version():
+    """Invalidate the caches when a backfill rewrote past ticks (checked every RECENT_CACHE_SECONDS)"""
+    now, checked = time.monotonic(), STORE_VERSION['checked']
+    if checked is not None and now - checked < RECENT_CACHE_SECONDS:
+        return
+    STORE_VERSION['checked'] = now
+    try:
+        version = store.version()
+    except Exception as e:
+        print(f"Store version check failed: {e}")
+        return
+    if checked is not None and version != STORE_VERSION['value']:
+        print(f"Store changed ({version}); dropping cached price ranges")
+        invalidate_prices()
+    STORE_VERSION['value'] = version
+
+
+def load_prices(time1, time2, coins=None):
+    """Single-flight, cached get_data shared by the callbacks and the JSON API
+
+    Only the `coins` columns are read (all when None). Concurrent requests
+    for the same window, or one inside a window (and coin set) being
+    loaded, share one backend query. Past ranges are kept until the store
+    version changes (a backfill); ranges that reach the present are reused
+    for RECENT_CACHE_SECONDS.
+    """
+    check_store_version()
+    coins = None if coins is None else tuple(sorted(coins))
+    ttl = None if is_past(time2) else RECENT_CACHE_SECONDS
+    return PRICE_FLIGHT.do((time1, time2, coins), lambda: get_data(store, time1, time2, coins), ttl=ttl)
+
+
+FX_FLIGHT = SingleFlight(TTLCache(maxsize=PRICE_CACHE_SIZE))
+
+
+def load_fx(time1, time2):
+    """Single-flight, cached FX rows for a price range (from a day earlier, so its first tick has a rate)"""
+    since = (datetime.fromisoformat(time1) - timedelta(days=1)).isoformat()
+    ttl = None if is_past(time2) else RECENT_CACHE_SECONDS
+    return FX_FLIGHT.do((time1, time2), lambda: store.query_fx(since, time2), ttl=ttl)
+
+
+def dataset_key(time1, time2, coins):
+    return f"{time1}|{time2}|{','.join(sorted(coins))}"
+
+
+def parse_dataset(dataset):
+    time1, time2, coins = dataset.split('|')
+    return time1, time2, tuple(coins.split(',')) if coins else ()
+
+
+# Converted prices per (dataset, currency): switching currency needs no new price query
+CONVERTED_PRICES = TTLCache(maxsize=CURRENCY_CACHE_SIZE)
+
+
+def prices_in(dataset, currency):
+    """(frame, currency shown) for a dataset's prices; the base currency when no FX rates exist"""
+    cached = CONVERTED_PRICES.get((dataset, currency))
+    if cached is None:
+        time1, time2, coins = parse_dataset(dataset)
+        prices = load_prices(time1, time2, coins)
+        cached = prices, BASE_CURRENCY
+        if currency != BASE_CURRENCY:
+            cached = to_currency(prices, load_fx(time1, time2), currency)
+        CONVERTED_PRICES.put((dataset, currency), cached, ttl=None if is_past(time2) else RECENT_CACHE_SECONDS)
+    return cached
+
+
+def resolution_index(dataset, currency=BASE_CURRENCY):
+    """This worker's MultiResolutionIndex of a dataset in a display currency, built when missing"""
+    key = dataset if currency == BASE_CURRENCY else f'{dataset}@{currency}'
+    index = RESOLUTION_INDEXES.get(key)
+    if index is None:
+        index = RESOLUTION_INDEXES.put(key, MultiResolutionIndex(prices_in(dataset, currency)[0]))
+    return index
+
+
+# GDELT responses, shared between concurrent identical searches and reused briefly
+NEWS_FLIGHT = SingleFlight(TTLCache(maxsize=64))
+# Every fetched article, so narrower news searches need no GDELT request
+NEWS_INDEX = NewsIndex()
+
+# Running from a Parquet snapshot: its news searches are answered from the
+# index and nothing is fetched from GDELT
+OFFLINE = STORAGE_BACKEND == 'snapshot'
+PRICE_DATES = (date(2025, 10, 13), '2025-10-13', '2025-10-17')  # earliest, default start, default end
+if OFFLINE:
+    NEWS_INDEX.restore(*store.news())
+    if store.manifest.get('start'):
+        first, last = store.manifest['start'][:10], store.manifest['end'][:10]
+        PRICE_DATES = (date.fromisoformat(first), first, last)
+
+
+def load_latest(coins=None):
+    """Most recent ticks (since the previous full hour) for the latest-price endpoint
+
+    Goes through load_prices with hour-aligned bounds, so requests within
+    the hour share one single-flight query cached for RECENT_CACHE_SECONDS.
+    """
+    hour = datetime.now(UTC).replace(minute=0, second=0, microsecond=0)
+    return load_prices((hour - timedelta(hours=1)).isoformat(), (hour + timedelta(hours=1)).isoformat(), coins)
+
+
+def backfill_gaps(start, end):
+    """Run the backfill flow (src/backfill.py) over a range with detected gaps"""
+    from backfill import backfill_flow
+    return backfill_flow(start, end)
+
+
+# Tick coverage, latency and freshness, read incrementally (timestamps only)
+HEALTH = HealthMonitor(lambda time1, time2: get_data(store, time1, time2, []),
+                       lambda since: get_data_since(store, since, []),
+                       backfill=backfill_gaps if HEALTH_AUTO_BACKFILL and STORAGE_BACKEND == 'dynamodb' else None,
+                       on_backfill=invalidate_prices)
+
+
 app = Dash(__name__)
+register_api(app.server, load_prices, load_latest, NEWS_INDEX, HEALTH)
+register_compression(app.server)
 
 app.layout = html.Div([
     # Header
@@ -64,6 +228,10 @@ app.layout = html.Div([
     html.Div([
         dcc.Store(id='news-data-store'),
         dcc.Store(id='crypto-data-store'),
+        dcc.Store(id='crypto-data-cursor'),
+        dcc.Store(id='live-cursor'),
+        dcc.Interval(id='live-interval', interval=LIVE_POLL_SECONDS * 1000, disabled=True),
+        dcc.Interval(id='health-interval', interval=HEALTH_REFRESH_SECONDS * 1000),
         
         # Left sidebar - Controls
         html.Div([
@@ -77,24 +245,19 @@ app.layout = html.Div([
                 html.P('Choose which cryptocurrencies to display on the chart', 
                        style={'color': '#888', 'fontSize': '13px', 'marginBottom': '15px', 'fontStyle': 'italic'}),
                 
-                dcc.Checklist(
+                # Searchable, virtualized list: only visible options are rendered,
+                # so the registry can hold hundreds of coins
+                dcc.Dropdown(
                     id='crypto-selector',
-                    options=[
-                        {'label': 'Bitcoin', 'value': 'bitcoin'},
-                        {'label': 'Ethereum', 'value': 'ethereum'},
-                        {'label': 'Tether', 'value': 'tether'},
-                        {'label': 'Binance Coin', 'value': 'binancecoin'},
-                        {'label': 'Solana', 'value': 'solana'},
-                        {'label': 'Cardano', 'value': 'cardano'},
-                        {'label': 'Dogecoin', 'value': 'dogecoin'},
-                        {'label': 'Ripple', 'value': 'ripple'},
-                        {'label': 'Tron', 'value': 'tron'},
-                        {'label': 'USD Coin', 'value': 'usd-coin'},
-                    ],
+                    options=selector_options(),
                     value=['bitcoin'],
-                    inline=False,
-                    style={'color': '#E0E0E0', 'fontSize': '17px'},
-                    labelStyle={'display': 'block', 'marginBottom': '10px', 'cursor': 'pointer'}
+                    multi=True,
+                    searchable=True,
+                    placeholder='Search coins...',
+                    optionHeight=32,
+                    maxHeight=320,
+                    style={'fontSize': '15px'},
+                    className='dark-dropdown'
                 ),
                 
                 # Time Range Section (below crypto selector)
@@ -111,13 +274,45 @@ app.layout = html.Div([
                     
                     dcc.DatePickerRange(
                         id='date-picker-range',
-                        min_date_allowed=date(2025, 10, 13),
+                        min_date_allowed=PRICE_DATES[0],
                         max_date_allowed=(datetime.now() - timedelta(hours=1)).date(),
-                        start_date='2025-10-13',
-                        end_date='2025-10-17',
+                        start_date=PRICE_DATES[1],
+                        end_date=PRICE_DATES[2],
                         display_format='YYYY-MM-DD',
                     ),
                 ]),
+
+                # Snapshot export of the loaded prices, news and analytics
+                html.Div([
+                    html.Hr(style={'border': 'none', 'borderTop': '1px solid #333', 'margin': '20px 0'}),
+
+                    html.Div([
+                        html.Span('💾', style={'fontSize': '22px', 'marginRight': '8px'}),
+                        html.Span('Snapshot', style={'fontSize': '18px', 'fontWeight': '600'})
+                    ], style={'marginBottom': '10px', 'display': 'flex', 'alignItems': 'center'}),
+
+                    html.P('Download the loaded prices, news and analytics as Parquet for offline analysis',
+                           style={'color': '#888', 'fontSize': '12px', 'marginBottom': '12px', 'fontStyle': 'italic'}),
+
+                    html.Button(
+                        'Export Snapshot',
+                        id='export-snapshot-button',
+                        n_clicks=0,
+                        style={
+                            'width': '100%',
+                            'padding': '10px 16px',
+                            'backgroundColor': '#2D2D2D',
+                            'color': '#E0E0E0',
+                            'border': '1px solid #444',
+                            'borderRadius': '6px',
+                            'fontSize': '14px',
+                            'fontWeight': '600',
+                            'cursor': 'pointer',
+                        }
+                    ),
+                    dcc.Download(id='snapshot-download'),
+                    html.Div(id='snapshot-status', style={'color': '#B0B0B0', 'fontSize': '12px', 'marginTop': '8px'}),
+                ]),
             ], style={
                 'padding': '20px',
                 'backgroundColor': '#1E1E1E',
@@ -310,13 +505,33 @@ app.layout = html.Div([
                     options=[
                         {'label': ' Overlaid (Same Y)', 'value': 'overlaid'},
                         {'label': ' Overlaid (Multi Y)', 'value': 'multi_y'},
-                        {'label': ' Separated', 'value': 'separated'}
+                        {'label': ' Separated', 'value': 'separated'},
+                        {'label': ' Rebased (=100)', 'value': 'normalized'},
+                        {'label': ' Returns', 'value': 'returns'},
+                        {'label': ' Volatility', 'value': 'volatility'},
+                        {'label': ' Correlation', 'value': 'correlation'}
                     ],
                     value='overlaid',
                     inline=True,
                     style={'color': '#E0E0E0', 'fontSize': '15px'},
                     labelStyle={'marginRight': '20px', 'cursor': 'pointer'}
                 ),
+                dcc.Dropdown(
+                    id='display-currency',
+                    options=[{'label': c.upper(), 'value': c} for c in DISPLAY_CURRENCIES],
+                    value=BASE_CURRENCY,
+                    clearable=False,
+                    searchable=False,
+                    className='dark-dropdown',
+                    style={'width': '90px', 'marginLeft': 'auto', 'marginRight': '20px'}
+                ),
+                dcc.Checklist(
+                    id='live-mode',
+                    options=[{'label': ' Live', 'value': 'live'}],
+                    value=[],
+                    style={'color': '#E0E0E0', 'fontSize': '15px'},
+                    labelStyle={'cursor': 'pointer'}
+                ),
             ], style={
                 'display': 'flex',
                 'alignItems': 'center',
@@ -345,6 +560,92 @@ app.layout = html.Div([
                 'border': '1px solid #333'
             }),
 
+            # News Impact Section
+            html.Div([
+                html.Div([
+                    html.Span('📊', style={'fontSize': '26px', 'marginRight': '10px'}),
+                    html.Span('News Impact', style={'fontSize': '22px', 'fontWeight': '600'})
+                ], style={'marginBottom': '10px', 'display': 'flex', 'alignItems': 'center'}),
+
+                html.P('Price change of the selected cryptocurrencies around each article, averaged per group',
+                       style={'color': '#888', 'fontSize': '13px', 'marginBottom': '15px', 'fontStyle': 'italic'}),
+
+                html.Div([
+                    html.Label('Windows (min):', style={'color': '#B0B0B0', 'fontSize': '15px', 'marginRight': '15px'}),
+                    dcc.Input(
+                        id='event-windows',
+                        type='text',
+                        value=', '.join(str(w) for w in EVENT_WINDOWS),
+                        debounce=True,
+                        style={
+                            'width': '200px',
+                            'padding': '8px 12px',
+                            'backgroundColor': '#2D2D2D',
+                            'border': '1px solid #444',
+                            'borderRadius': '4px',
+                            'color': '#E0E0E0',
+                            'fontSize': '14px',
+                            'marginRight': '30px'
+                        }
+                    ),
+                    html.Label('Group by:', style={'color': '#B0B0B0', 'fontSize': '15px', 'marginRight': '15px'}),
+                    dcc.RadioItems(
+                        id='event-group-by',
+                        options=[
+                            {'label': ' Person', 'value': 'person'},
+                            {'label': ' Source', 'value': 'source'}
+                        ],
+                        value='person',
+                        inline=True,
+                        style={'color': '#E0E0E0', 'fontSize': '15px'},
+                        labelStyle={'marginRight': '20px', 'cursor': 'pointer'}
+                    ),
+                ], style={'display': 'flex', 'alignItems': 'center', 'marginBottom': '15px'}),
+
+                dcc.Graph(id='event-study-heatmap', config={'displaylogo': False}),
+
+                dash_table.DataTable(
+                    id='event-study-table',
+                    page_size=15,
+                    sort_action='native',
+                    style_table={'overflowX': 'auto', 'marginTop': '15px'},
+                    style_header={'backgroundColor': '#2D2D2D', 'color': '#E0E0E0', 'fontWeight': '600'},
+                    style_cell={'backgroundColor': '#1E1E1E', 'color': '#E0E0E0', 'border': '1px solid #333',
+                                'fontSize': '13px', 'padding': '6px'}
+                ),
+
+                # Headline sentiment per day, scored offline from the titles
+                dcc.Graph(id='news-sentiment-chart', config={'displaylogo': False}, style={'marginTop': '20px'}),
+            ], style={
+                'backgroundColor': '#1E1E1E',
+                'borderRadius': '12px',
+                'padding': '20px',
+                'marginTop': '20px',
+                'boxShadow': '0 2px 8px rgba(0,0,0,0.3)',
+                'border': '1px solid #333'
+            }),
+
+            # Ingestion Health Section
+            html.Div([
+                html.Div([
+                    html.Span('🩺', style={'fontSize': '26px', 'marginRight': '10px'}),
+                    html.Span('Data Health', style={'fontSize': '22px', 'fontWeight': '600'})
+                ], style={'marginBottom': '10px', 'display': 'flex', 'alignItems': 'center'}),
+
+                html.P('Share of 3-minute ticks stored per hour, and the time between consecutive ticks',
+                       style={'color': '#888', 'fontSize': '13px', 'marginBottom': '15px', 'fontStyle': 'italic'}),
+
+                html.Div(id='health-status', style={'color': '#E0E0E0', 'fontSize': '15px', 'marginBottom': '10px'}),
+                dcc.Graph(id='health-chart', config={'displaylogo': False}),
+            ], style={
+                'backgroundColor': '#1E1E1E',
+                'borderRadius': '12px',
+                'padding': '20px',
+                'marginTop': '20px',
+                'boxShadow': '0 2px 8px rgba(0,0,0,0.3)',
+                'border': '1px solid #333'
+            }),
+
         ], style={'flex': '1'}),
         
     ], style={
@@ -375,20 +676,27 @@ def sync_dates(n_clicks, crypto_start, crypto_end):
     return crypto_start, crypto_end
 
 
-# Query database and store data
+# Query database and store data (only the selected coins' columns are read)
 @app.callback(
-    Output('crypto-data-store', 'data'),  
+    [Output('crypto-data-store', 'data'),
+     Output('crypto-data-cursor', 'data')],
     [Input('date-picker-range', 'start_date'),
-     Input('date-picker-range', 'end_date')]
+     Input('date-picker-range', 'end_date'),
+     Input('crypto-selector', 'value')]
 )
-def query_database(start_date, end_date):
+def query_database(start_date, end_date, selected_cryptos=None):
     start_time = f"{start_date}T12:00:00"
     end_time = f"{end_date}T12:59:59"
+    coins = selected_cryptos or []
     
-    df_all = get_data(table, start_time, end_time)
+    df_all = load_prices(start_time, end_time, coins)
     data_json = df_all.to_json(date_format='iso', orient='split')
     
-    return data_json
+    dataset = dataset_key(start_time, end_time, coins)
+    if not df_all.empty:
+        RESOLUTION_INDEXES.put(dataset, MultiResolutionIndex(df_all))
+    
+    return data_json, make_cursor(df_all, dataset)
 
 
 @app.callback(
@@ -446,7 +754,7 @@ def search_news(n_clicks, preset_people, custom_people, preset_keywords, custom_
         end_dt = datetime.strptime(news_end, '%Y-%m-%d').strftime('%Y%m%d235959')
         
         # GDELT API setup
-        base_url = "https://api.gdeltproject.org/api/v2/doc/doc"
+        base_url = GDELT_API_URL
         proximity = 15
         all_news = []
         failed_searches = []
@@ -460,6 +768,17 @@ def search_news(n_clicks, preset_people, custom_people, preset_keywords, custom_
         
         # Search for each person separately
         for personality in people:
+            # Narrower than an earlier complete search: answer from the local index
+            if OFFLINE or NEWS_INDEX.covers(personality, keywords, sources, news_start, news_end):
+                df_person = NEWS_INDEX.lookup(personality, keywords, sources, news_start, news_end)
+                if df_person.empty:
+                    print(f"✗ No indexed articles for {personality}")
+                    failed_searches.append(f"{personality} (0 articles)")
+                else:
+                    all_news.append(df_person)
+                    print(f"✓ Found {len(df_person)} indexed articles for {personality}")
+                continue
+            
             domain_filters = " OR ".join([f"domainis:{d}" for d in sources])
             
             # Build near queries
@@ -478,11 +797,15 @@ def search_news(n_clicks, preset_people, custom_people, preset_keywords, custom_
                 "startdatetime": start_dt,
                 "enddatetime": end_dt,
                 "sort": "datedesc",
-                "maxrecords": 250
+                "maxrecords": GDELT_MAX_RECORDS
             }
             
             try:
-                response = requests.get(base_url, params=params, timeout=30)
+                response = NEWS_FLIGHT.do(
+                    (base_url, tuple(sorted(params.items()))),
+                    lambda: requests.get(base_url, params=params, timeout=30),
+                    ttl=NEWS_CACHE_SECONDS,
+                    cacheable=lambda r: r.status_code == 200)
                 
                 print(f"Status: {response.status_code}")
                 print(f"Response length: {len(response.text)} chars")
@@ -507,11 +830,15 @@ def search_news(n_clicks, preset_people, custom_people, preset_keywords, custom_
                         csv_data = StringIO(response.text)
                         df_person = pd.read_csv(csv_data, on_bad_lines='skip')
                         
+                        if not df_person.empty:
+                            df_person['person'] = personality
+                        NEWS_INDEX.add(personality, keywords, sources, news_start, news_end, df_person,
+                                       complete=len(df_person) < GDELT_MAX_RECORDS)
+                        
                         if df_person.empty:
                             print(f"✗ Empty results for {personality}")
                             failed_searches.append(f"{personality} (0 articles)")
                         else:
-                            df_person['person'] = personality
                             all_news.append(df_person)
                             print(f"✓ Found {len(df_person)} articles for {personality}")
                             
@@ -582,14 +909,175 @@ def search_news(n_clicks, preset_people, custom_people, preset_keywords, custom_
 
 # Update chart display with news events
 @app.callback(
-    Output('chart', 'figure'),
+    [Output('chart', 'figure'),
+     Output('live-cursor', 'data')],
+    [Input('crypto-data-store', 'data'),
+     Input('news-data-store', 'data'),
+     Input('plot-mode', 'value'),
+     # Live mode extends the traces with plain arrays, so the figure is re-encoded for it
+     Input('live-mode', 'value'),
+     # Converted on the server from the cached range, without a new price query
+     Input('display-currency', 'value')],
+    # The selection reaches the chart through the store, which is re-queried for it
+    [State('crypto-selector', 'value'),
+     State('crypto-data-cursor', 'data')]
+)
+def chart_callback(stored_crypto_data, stored_news_data, plot_mode, live_mode, currency, selected_cryptos,
+                   data_cursor):
+    # A full rebuild only shows the stored range, so live polling restarts from its end
+    index, fx = None, None
+    if data_cursor:
+        dataset = data_cursor['dataset']
+        # This worker holds the range: its converted index costs no new price query
+        if RESOLUTION_INDEXES.get(dataset) is not None:
+            index = resolution_index(dataset, currency)
+        if currency != BASE_CURRENCY:
+            fx = load_fx(*parse_dataset(dataset)[:2])
+    fig = update_chart(stored_crypto_data, stored_news_data, selected_cryptos, plot_mode, index, currency, fx)
+    return minimize_figure(fig, typed='live' not in (live_mode or [])), data_cursor
+
+
+# Reload the price traces at a resolution matched to the visible window
+@app.callback(
+    Output('chart', 'figure', allow_duplicate=True),
+    [Input('chart', 'relayoutData')],
+    [State('crypto-data-cursor', 'data'),
+     State('crypto-selector', 'value'),
+     State('plot-mode', 'value'),
+     State('live-mode', 'value'),
+     State('display-currency', 'value')],
+    prevent_initial_call=True
+)
+def viewport_callback(relayout_data, data_cursor, selected_cryptos, plot_mode, live_mode, currency):
+    window = visible_range(relayout_data)
+    if window is None or not data_cursor or not selected_cryptos or plot_mode not in ('overlaid', 'multi_y'):
+        return no_update
+    
+    # Rebuilt from storage when another worker served the original query
+    index = resolution_index(data_cursor['dataset'], currency)
+    
+    if window == 'all':
+        frame, level = index.view(selected_cryptos)
+    else:
+        frame, level = index.view(selected_cryptos, *window)
+    
+    patched = Patch()
+    typed = 'live' not in (live_mode or [])
+    x = encode_x(frame['timestamp'], typed)
+    coins = [c for c in selected_cryptos if c in frame.columns]
+    for i, crypto in enumerate(coins):
+        patched['data'][i]['x'] = x
+        patched['data'][i]['y'] = encode_y(frame[crypto], typed)
+    # Keep the user's viewport, since the figure's layout still holds the initial range
+    if window == 'all':
+        patched['layout']['xaxis']['autorange'] = True
+    else:
+        patched['layout']['xaxis']['range'] = list(window)
+    # Fit the y axes to the window from the per-day stats, not the shipped points
+    for axis, y_range in axis_ranges(index.stats, selected_cryptos, plot_mode, window).items():
+        if window == 'all':
+            patched['layout'][axis]['autorange'] = True
+        else:
+            patched['layout'][axis]['range'] = y_range
+    return patched
+
+
+@app.callback(
+    Output('live-interval', 'disabled'),
+    [Input('live-mode', 'value')]
+)
+def toggle_live_mode(live_mode):
+    return 'live' not in (live_mode or [])
+
+
+# Append ticks newer than the client's cursor without rebuilding the figure
+@app.callback(
+    [Output('chart', 'extendData'),
+     Output('live-cursor', 'data', allow_duplicate=True)],
+    [Input('live-interval', 'n_intervals')],
+    [State('live-cursor', 'data'),
+     State('crypto-selector', 'value'),
+     State('plot-mode', 'value'),
+     State('display-currency', 'value')],
+    prevent_initial_call=True
+)
+def live_tail_callback(n_intervals, cursor, selected_cryptos, plot_mode, currency):
+    now = datetime.now(UTC)
+    since = tail_since(cursor, now)
+    if since is None:
+        return no_update, no_update
+    df_new = get_data_since(store, since, selected_cryptos)
+    if currency != BASE_CURRENCY and not df_new.empty:
+        # Hour-aligned bounds, so polls within the hour share one cached FX query
+        hour = now.replace(minute=0, second=0, microsecond=0)
+        fx = load_fx((hour - timedelta(minutes=LIVE_TAIL_WINDOW)).isoformat(), (hour + timedelta(hours=1)).isoformat())
+        df_new, _ = to_currency(df_new, fx, currency)
+    return build_tail_update(df_new, cursor, selected_cryptos, plot_mode)
+
+
+# Event study of price moves around news articles (kept out of the chart callback)
+@app.callback(
+    [Output('event-study-heatmap', 'figure'),
+     Output('event-study-table', 'data'),
+     Output('event-study-table', 'columns')],
     [Input('crypto-data-store', 'data'),
      Input('news-data-store', 'data'),
-     Input('crypto-selector', 'value'),
-     Input('plot-mode', 'value')]
+     Input('event-windows', 'value'),
+     Input('event-group-by', 'value')],
+    [State('crypto-selector', 'value')]
+)
+def event_study_callback(stored_crypto_data, stored_news_data, windows_text, group_by, selected_cryptos):
+    return update_event_study(stored_crypto_data, stored_news_data, selected_cryptos, windows_text, group_by)
+
+
+# Daily headline sentiment of the searched news
+@app.callback(
+    Output('news-sentiment-chart', 'figure'),
+    [Input('news-data-store', 'data')]
+)
+def sentiment_callback(stored_news_data):
+    return update_sentiment_chart(stored_news_data)
+
+
+# Write the loaded dataset, news and analytics to a Parquet snapshot and download it zipped
+@app.callback(
+    [Output('snapshot-download', 'data'),
+     Output('snapshot-status', 'children')],
+    [Input('export-snapshot-button', 'n_clicks')],
+    [State('crypto-data-cursor', 'data'),
+     State('news-data-store', 'data'),
+     State('display-currency', 'value'),
+     State('crypto-selector', 'value'),
+     State('event-windows', 'value')],
+    prevent_initial_call=True
+)
+def export_snapshot_callback(n_clicks, cursor, stored_news_data, currency, selected_cryptos, windows_text):
+    if not cursor or not cursor.get('dataset'):
+        return no_update, '⚠️ Load a price range first'
+    try:
+        dataset = cursor['dataset']
+        time1, time2, coins = parse_dataset(dataset)
+        shown, shown_currency = prices_in(dataset, currency)
+        path = os.path.join(SNAPSHOT_DIR, datetime.now(UTC).strftime('snapshot-%Y%m%dT%H%M%S'))
+        manifest = export_snapshot(path, load_prices(time1, time2, coins), load_fx(time1, time2), NEWS_INDEX,
+                                   shown, selected_cryptos, shown_currency, stored_news_data, windows_text)
+        archive = shutil.make_archive(path, 'zip', path)
+    except Exception as e:
+        print(f"Snapshot export failed: {e}")
+        return no_update, f'❌ Export failed: {e}'
+    tables = ', '.join(f"{name} ({entry['rows']})" for name, entry in manifest['tables'].items())
+    return dcc.send_file(archive), f'✓ Saved {os.path.basename(path)}: {tables}'
+
+
+# Ingestion freshness, coverage and tick latency
+@app.callback(
+    [Output('health-status', 'children'),
+     Output('health-chart', 'figure')],
+    [Input('health-interval', 'n_intervals')]
 )
-def chart_callback(stored_crypto_data, stored_news_data, selected_cryptos, plot_mode):
-    return update_chart(stored_crypto_data, stored_news_data, selected_cryptos, plot_mode)
+def health_callback(n_intervals):
+    status, fig = update_health_panel(HEALTH)
+    return status, minimize_figure(fig)
 
 
 app.index_string = '''
@@ -0,0 +1,160 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from config import EVENT_WINDOWS, EVENT_MAX_STALENESS
+from analytics import price_matrix
+from utils import load_dataframe_from_store, create_empty_figure, to_epoch_ns
+
+
+def parse_windows(text):
+    """Parse a comma-separated list of minute offsets, e.g. '-60, 60, 360'"""
+    if not text:
+        return list(EVENT_WINDOWS)
+    windows = []
+    for part in str(text).split(','):
+        part = part.strip()
+        if part:
+            try:
+                value = int(float(part))
+            except ValueError:
+                continue
+            if value != 0:
+                windows.append(value)
+    return sorted(set(windows)) or list(EVENT_WINDOWS)
+
+
+def window_label(minutes):
+    """Format a minute offset as '-1h', '+6h', '+30m'"""
+    sign = '-' if minutes < 0 else '+'
+    minutes = abs(minutes)
+    if minutes % 1440 == 0:
+        return f'{sign}{minutes // 1440}d'
+    if minutes % 60 == 0:
+        return f'{sign}{minutes // 60}h'
+    return f'{sign}{minutes}m'
+
+
+def news_times(df_news):
+    """UTC publication times for every article"""
+    if 'seendate' in df_news.columns:
+        return pd.DatetimeIndex(pd.to_datetime(df_news['seendate'], format='%Y%m%dT%H%M%SZ', utc=True))
+    return pd.DatetimeIndex(pd.to_datetime(df_news['Date'], utc=True))
+
+
+def news_sources(df_news):
+    """Source domain per article, taken from the URL when no domain column exists"""
+    for column in ('domain', 'Domain'):
+        if column in df_news.columns:
+            return df_news[column].astype(str)
+    url_column = 'URL' if 'URL' in df_news.columns else 'url'
+    if url_column not in df_news.columns:
+        return pd.Series('unknown', index=df_news.index)
+    return (df_news[url_column].astype(str)
+            .str.extract(r'^(?:https?://)?(?:www\.)?([^/]+)', expand=False)
+            .fillna('unknown'))
+
+
+def event_returns(prices, event_times, windows, max_staleness=EVENT_MAX_STALENESS):
+    """Percent price change per (article, window, coin)
+
+    All article times and window edges are located with a single
+    searchsorted over the price index. For a window after publication the
+    change is price(t + w) / price(t) - 1; for a window before it is
+    price(t) / price(t + w) - 1, i.e. the move leading into the article.
+    Edges outside the loaded range, or whose nearest earlier tick is older
+    than `max_staleness` minutes, are NaN.
+    """
+    ts = to_epoch_ns(prices.index)
+    n_events, n_windows = len(event_times), len(windows)
+    if len(ts) == 0 or n_events == 0:
+        return np.full((n_events, n_windows, prices.shape[1]), np.nan)
+
+    offsets = np.concatenate([[0], np.asarray(windows, dtype=np.int64)]) * 60_000_000_000
+    targets = (to_epoch_ns(event_times)[:, None] + offsets[None, :]).ravel()
+
+    pos = np.searchsorted(ts, targets, side='right') - 1
+    valid = (pos >= 0) & (targets <= ts[-1])
+    pos = np.clip(pos, 0, len(ts) - 1)
+    valid &= (targets - ts[pos]) <= max_staleness * 60_000_000_000
+
+    values = prices.to_numpy(dtype=float)[pos]
+    values[~valid] = np.nan
+    values = values.reshape(n_events, n_windows + 1, -1)
+
+    ref, edge = values[:, :1, :], values[:, 1:, :]
+    before = (np.asarray(windows) < 0)[None, :, None]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        change = np.where(before, ref / edge, edge / ref) - 1
+    return change * 100
+
+
+def event_study(prices, df_news, windows):
+    """One row per article with metadata plus a '<coin> <window>' column per change"""
+    change = event_returns(prices, news_times(df_news), windows)
+    columns = [f'{coin} {window_label(w)}' for w in windows for coin in prices.columns]
+    flat = change.reshape(len(df_news), -1)
+
+    title_column = 'title' if 'title' in df_news.columns else 'Title'
+    study = pd.DataFrame(flat, columns=columns, index=df_news.index)
+    study.insert(0, 'title', df_news[title_column] if title_column in df_news.columns else '')
+    study.insert(0, 'source', news_sources(df_news).values)
+    study.insert(0, 'person', df_news['person'].values if 'person' in df_news.columns else 'unknown')
+    study.insert(0, 'date', news_times(df_news))
+    return study
+
+
+def aggregate_event_study(study, group_by='person'):
+    """Mean change and article count per person or source"""
+    value_columns = [c for c in study.columns if c not in ('date', 'person', 'source', 'title')]
+    grouped = study.groupby(group_by)
+    summary = grouped[value_columns].mean()
+    summary.insert(0, 'articles', grouped.size())
+    return summary.sort_values('articles', ascending=False)
+
+
+def create_event_heatmap(summary, group_by):
+    """Heat map of mean change per group (rows) and coin/window (columns)"""
+    value_columns = [c for c in summary.columns if c != 'articles']
+    z = summary[value_columns].to_numpy(dtype=float)
+    limit = float(np.nanmax(np.abs(z))) if np.isfinite(z).any() else 1.0
+
+    fig = go.Figure(go.Heatmap(
+        z=np.round(z, 3),
+        x=value_columns,
+        y=[f'{g} ({n})' for g, n in zip(summary.index, summary['articles'])],
+        zmin=-limit,
+        zmax=limit,
+        zmid=0,
+        colorscale='RdYlGn',
+        colorbar=dict(title='%'),
+        hovertemplate='%{y}<br>%{x}: %{z:.2f}%<extra></extra>'
+    ))
+    fig.update_layout(
+        title=f'Mean price change around articles, by {group_by}',
+        template='plotly_dark',
+        paper_bgcolor='#1E1E1E',
+        plot_bgcolor='#2D2D2D',
+        height=150 + 40 * len(summary),
+        margin=dict(t=60, b=80, l=150, r=30)
+    )
+    return fig
+
+
+def update_event_study(stored_crypto_data, stored_news_data, selected_cryptos, windows_text, group_by):
+    """Event-study callback logic: returns (heat map, table rows, table columns)"""
+    if not stored_crypto_data or not stored_news_data or not selected_cryptos:
+        return create_empty_figure(), [], []
+
+    df = load_dataframe_from_store(stored_crypto_data)
+    df_news = load_dataframe_from_store(stored_news_data)
+    prices = price_matrix(df, selected_cryptos)
+    if prices.empty or df_news is None or df_news.empty:
+        return create_empty_figure(), [], []
+
+    windows = parse_windows(windows_text)
+    study = event_study(prices, df_news, windows)
+    summary = aggregate_event_study(study, group_by or 'person')
+
+    table = summary.round(3).reset_index()
+    columns = [{'name': c, 'id': c} for c in table.columns]
+    return create_event_heatmap(summary, group_by or 'person'), table.to_dict('records'), columns
@@ -0,0 +1,363 @@
+"""Ingestion health: per-day tick coverage, tick latency, gaps and freshness
+
+The scraper is meant to write one tick every GRID_FREQ (3 minutes), but
+the scheduled workflow runs late or not at all now and then. The monitor
+keeps, for each of the last HEALTH_DAYS days,
+
+    bitmap      one bool per 3-minute slot of the day, set when a tick landed in it
+    latency     histogram of the time since the previous tick (LATENCY_BINS_SECONDS)
+
+plus the list of gaps (consecutive ticks more than 1.5 slots apart, the
+same rule as src/backfill.py). Only timestamps are read, and only those
+newer than the last one seen: each refresh is one query_since with no
+coin columns. Ranges rewritten by a backfill are rescanned on their own,
+so their gaps close without rereading the rest of the history.
+"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, UTC
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+from config import (GRID_FREQ, HEALTH_DAYS, HEALTH_REFRESH_SECONDS, FRESHNESS_SLA_SECONDS,
+                    HEALTH_BACKFILL_GRACE_SECONDS)
+
+TICK_NS = pd.Timedelta(GRID_FREQ).value
+DAY_NS = pd.Timedelta(days=1).value
+SLOTS_PER_DAY = DAY_NS // TICK_NS
+GAP_NS = int(TICK_NS * 1.5)
+# Upper edges of the tick latency histogram (the last bin is open-ended)
+LATENCY_BINS_SECONDS = [170, 190, 240, 300, 360, 600, 900, 1800, 3600, 6 * 3600]
+_LATENCY_EDGES_NS = np.array(LATENCY_BINS_SECONDS, dtype=np.int64) * 1_000_000_000
+
+
+def _ns(timestamps):
+    return pd.DatetimeIndex(pd.to_datetime(pd.Series(timestamps), utc=True, format='ISO8601')).as_unit('ns').asi8
+
+
+def _iso(ns):
+    return pd.Timestamp(int(ns), tz='UTC').isoformat()
+
+
+class _Day:
+    def __init__(self):
+        self.bitmap = np.zeros(SLOTS_PER_DAY, dtype=bool)
+        self.latency = np.zeros(len(LATENCY_BINS_SECONDS) + 1, dtype=np.int64)
+        self.ticks = 0
+
+
+class HealthMonitor:
+    """Incremental coverage, latency and gap tracker over a store's tick timestamps
+
+    load(time1, time2) and load_since(since) return frames with a
+    'timestamp' column (the storage backend's query / query_since with no
+    coins). backfill(start, end), when given, is run in a background thread
+    for closed gaps older than HEALTH_BACKFILL_GRACE_SECONDS, once per gap;
+    on_backfill() is called once it has written, e.g. to drop cached ranges.
+    """
+
+    def __init__(self, load, load_since, backfill=None, days=HEALTH_DAYS, sla_seconds=FRESHNESS_SLA_SECONDS,
+                 refresh_seconds=HEALTH_REFRESH_SECONDS, on_backfill=None):
+        self.load = load
+        self.load_since = load_since
+        self.backfill = backfill
+        self.on_backfill = on_backfill
+        self.days = days
+        self.sla_seconds = sla_seconds
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._days = OrderedDict()  # day start ns -> _Day, oldest first
+        self._gaps = []             # (previous tick ns, next tick ns), oldest first
+        self._last_ns = None
+        self._refreshed = None
+        self._attempted = set()
+        self._backfill_thread = None
+        self.backfill_status = {'running': False, 'runs': 0, 'last': None}
+
+    def _day(self, day_ns):
+        day = self._days.get(day_ns)
+        if day is None:
+            day = self._days[day_ns] = _Day()
+        return day
+
+    def _count_latency(self, at_ns, delta_ns, sign=1):
+        """Add (or with sign=-1 remove) intervals ending at at_ns to their day's histogram"""
+        bins = np.searchsorted(_LATENCY_EDGES_NS, delta_ns, side='left')
+        days = at_ns - at_ns % DAY_NS
+        for day_ns in np.unique(days):
+            if day_ns in self._days:
+                np.add.at(self._days[day_ns].latency, bins[days == day_ns], sign)
+
+    def _mark(self, ns):
+        days = ns - ns % DAY_NS
+        slots = (ns - days) // TICK_NS
+        for day_ns in np.unique(days):
+            day = self._day(int(day_ns))
+            in_day = days == day_ns
+            day.bitmap[slots[in_day]] = True
+            day.ticks += int(in_day.sum())
+
+    def _ingest(self, ns):
+        """Append ticks newer than the last one seen"""
+        ns = np.unique(ns)
+        if self._last_ns is not None:
+            ns = ns[ns > self._last_ns]
+        if not len(ns):
+            return 0
+        self._mark(ns)
+        points = ns if self._last_ns is None else np.concatenate([[self._last_ns], ns])
+        deltas = np.diff(points)
+        self._count_latency(points[1:], deltas)
+        for i in np.flatnonzero(deltas > GAP_NS):
+            self._gaps.append((int(points[i]), int(points[i + 1])))
+        self._last_ns = int(ns[-1])
+        return len(ns)
+
+    def _rescan(self, gap, ns):
+        """Fold ticks written inside a gap (by a backfill) into the stats"""
+        start, end = gap
+        ns = np.unique(ns[(ns > start) & (ns < end)])
+        if not len(ns) or gap not in self._gaps:
+            return 0
+        self._mark(ns)
+        self._count_latency(np.array([end]), np.array([end - start]), sign=-1)
+        points = np.concatenate([[start], ns, [end]])
+        deltas = np.diff(points)
+        self._count_latency(points[1:], deltas)
+        i = self._gaps.index(gap)
+        self._gaps[i:i + 1] = [(int(points[j]), int(points[j + 1])) for j in np.flatnonzero(deltas > GAP_NS)]
+        return len(ns)
+
+    def _expire(self, now_ns):
+        oldest = now_ns - now_ns % DAY_NS - (self.days - 1) * DAY_NS
+        while self._days and next(iter(self._days)) < oldest:
+            self._days.popitem(last=False)
+        self._gaps = [gap for gap in self._gaps if gap[1] >= oldest]
+
+    def refresh(self, force=False):
+        """Read the ticks written since the last refresh (at most every refresh_seconds)"""
+        now = time.monotonic()
+        with self._lock:
+            if not force and self._refreshed is not None and now - self._refreshed < self.refresh_seconds:
+                return False
+            now_ns = pd.Timestamp.now(tz='UTC').value
+            if self._last_ns is None:
+                start_ns = now_ns - now_ns % DAY_NS - (self.days - 1) * DAY_NS
+                df = self.load(_iso(start_ns), _iso(now_ns))
+            else:
+                df = self.load_since(_iso(self._last_ns))
+            if df is not None and not df.empty:
+                self._ingest(_ns(df['timestamp']))
+            self._expire(now_ns)
+            self._refreshed = now
+        if self.backfill is not None:
+            self._maybe_backfill(now_ns)
+        return True
+
+    def _maybe_backfill(self, now_ns):
+        """Start one background backfill for the closed gaps not tried yet"""
+        with self._lock:
+            if self._backfill_thread is not None and self._backfill_thread.is_alive():
+                return
+            grace_ns = HEALTH_BACKFILL_GRACE_SECONDS * 1_000_000_000
+            gaps = [gap for gap in self._gaps if gap not in self._attempted and gap[1] < now_ns - grace_ns]
+            if not gaps:
+                return
+            self._attempted.update(gaps)
+            self._backfill_thread = threading.Thread(target=self._run_backfill, args=(gaps,), daemon=True)
+            self.backfill_status['running'] = True
+            self._backfill_thread.start()
+
+    def _run_backfill(self, gaps):
+        start, end = gaps[0][0], max(gap[1] for gap in gaps)
+        print(f"Health monitor: backfilling {len(gaps)} gaps between {_iso(start)} and {_iso(end)}")
+        try:
+            result = self.backfill(datetime.fromtimestamp(start / 1e9, UTC), datetime.fromtimestamp(end / 1e9, UTC))
+            if self.on_backfill is not None:
+                self.on_backfill()
+            filled = 0
+            for gap in gaps:
+                df = self.load(_iso(gap[0]), _iso(gap[1]))
+                if df is not None and not df.empty:
+                    with self._lock:
+                        filled += self._rescan(gap, _ns(df['timestamp']))
+            status = {'gaps': len(gaps), 'ticks_filled': filled, 'result': result}
+        except Exception as e:
+            print(f"Health monitor: backfill failed: {e}")
+            status = {'gaps': len(gaps), 'error': str(e)}
+        with self._lock:
+            self.backfill_status.update(running=False, runs=self.backfill_status['runs'] + 1,
+                                        last={'finished': datetime.now(UTC).isoformat(), **status})
+
+    @staticmethod
+    def _quantile(counts, q):
+        """Upper bin edge (seconds) below which a fraction q of the intervals fall; None past the last edge"""
+        total = counts.sum()
+        if not total:
+            return None
+        i = int(np.searchsorted(np.cumsum(counts), q * total, side='left'))
+        return LATENCY_BINS_SECONDS[i] if i < len(LATENCY_BINS_SECONDS) else None
+
+    def _expected_slots(self, day_ns, now_ns, first_ns):
+        """Slots of a day that should hold a tick: from the first tick ever seen up to now"""
+        lo = max(day_ns, first_ns - first_ns % TICK_NS)
+        hi = min(day_ns + DAY_NS, now_ns)
+        return max(0, (hi - lo) // TICK_NS)
+
+    def summary(self):
+        """Freshness, coverage, latency and gap metrics as a JSON-ready dict"""
+        now_ns = pd.Timestamp.now(tz='UTC').value
+        with self._lock:
+            days = [(day_ns, day.bitmap.copy(), day.latency.copy(), day.ticks) for day_ns, day in self._days.items()]
+            gaps = list(self._gaps)
+            last_ns = self._last_ns
+            backfill = dict(self.backfill_status)
+
+        first_ns = None
+        for day_ns, bitmap, _, _ in days:
+            if bitmap.any():
+                first_ns = day_ns + int(np.argmax(bitmap)) * TICK_NS
+                break
+        latency = sum((counts for _, _, counts, _ in days), np.zeros(len(LATENCY_BINS_SECONDS) + 1, dtype=np.int64))
+        per_day = []
+        for day_ns, bitmap, _, ticks in days:
+            expected = self._expected_slots(day_ns, now_ns, first_ns) if first_ns is not None else 0
+            per_day.append({'day': _iso(day_ns)[:10], 'ticks': ticks, 'slots_filled': int(bitmap.sum()),
+                            'slots_expected': int(expected),
+                            'coverage': round(min(1.0, float(bitmap.sum()) / expected), 4) if expected else None})
+        filled = sum(d['slots_filled'] for d in per_day)
+        expected = sum(d['slots_expected'] for d in per_day)
+
+        # The time since the last tick is an open gap once it exceeds a tick and a half
+        open_gap = last_ns is not None and now_ns - last_ns > GAP_NS
+        freshness = None if last_ns is None else (now_ns - last_ns) / 1e9
+        missing = sum(max(0, round((b - a) / TICK_NS) - 1) for a, b in gaps)
+        return {
+            'last_tick': None if last_ns is None else _iso(last_ns),
+            'freshness_seconds': None if freshness is None else round(freshness, 1),
+            'sla_seconds': self.sla_seconds,
+            'fresh': freshness is not None and freshness <= self.sla_seconds,
+            'coverage': round(filled / expected, 4) if expected else None,
+            'days': per_day,
+            'gaps': len(gaps) + int(open_gap),
+            'missing_ticks': missing + (max(0, round((now_ns - last_ns) / TICK_NS) - 1) if open_gap else 0),
+            'longest_gap_seconds': max([(b - a) / 1e9 for a, b in gaps] or [0]),
+            'recent_gaps': [{'start': _iso(a), 'end': _iso(b), 'seconds': (b - a) / 1e9} for a, b in gaps[-20:]],
+            'latency': {
+                'bins_seconds': LATENCY_BINS_SECONDS,
+                'counts': latency.tolist(),
+                'p50_seconds': self._quantile(latency, 0.5),
+                'p90_seconds': self._quantile(latency, 0.9),
+                'p99_seconds': self._quantile(latency, 0.99),
+            },
+            'backfill': backfill if self.backfill is not None else None,
+        }
+
+    def coverage_grid(self, hours=24):
+        """(day labels, hour labels, fraction of slots filled per day and hour)"""
+        with self._lock:
+            items = [(day_ns, day.bitmap.copy()) for day_ns, day in self._days.items()]
+        labels = [_iso(day_ns)[:10] for day_ns, _ in items]
+        grid = np.array([bitmap.reshape(hours, -1).mean(axis=1) for _, bitmap in items]).reshape(len(items), hours)
+        return labels, [f'{h:02d}:00' for h in range(hours)], grid
+
+
+def prometheus_text(summary):
+    """The summary in the Prometheus text exposition format"""
+    lines = []
+
+    def metric(name, value, help_text, kind='gauge', labels=''):
+        if value is None:
+            return
+        lines.append(f'# HELP crypto_ingest_{name} {help_text}')
+        lines.append(f'# TYPE crypto_ingest_{name} {kind}')
+        lines.append(f'crypto_ingest_{name}{labels} {float(value)}')
+
+    metric('freshness_seconds', summary['freshness_seconds'], 'Seconds since the last stored tick')
+    metric('fresh', int(summary['fresh']), '1 when the last tick is within the freshness SLA')
+    metric('sla_seconds', summary['sla_seconds'], 'Freshness SLA')
+    metric('coverage_ratio', summary['coverage'], 'Share of expected 3-minute slots holding a tick')
+    metric('gaps', summary['gaps'], 'Gaps between ticks in the monitored window, the open one included')
+    metric('missing_ticks', summary['missing_ticks'], 'Ticks missing from the gaps')
+    metric('longest_gap_seconds', summary['longest_gap_seconds'], 'Longest closed gap')
+
+    latency = summary['latency']
+    lines.append('# HELP crypto_ingest_tick_latency_seconds Time since the previous tick')
+    lines.append('# TYPE crypto_ingest_tick_latency_seconds histogram')
+    cumulative = 0
+    for edge, count in zip(latency['bins_seconds'] + ['+Inf'], latency['counts']):
+        cumulative += count
+        lines.append(f'crypto_ingest_tick_latency_seconds_bucket{{le="{edge}"}} {cumulative}')
+    lines.append(f'crypto_ingest_tick_latency_seconds_count {cumulative}')
+
+    for day in summary['days']:
+        if day['coverage'] is not None:
+            lines.append(f'crypto_ingest_day_coverage_ratio{{day="{day["day"]}"}} {day["coverage"]}')
+    return '\n'.join(lines) + '\n'
+
+
+def _duration(seconds):
+    if seconds >= 3600:
+        return f'{seconds // 3600}h'
+    return f'{seconds // 60}m' if seconds >= 600 else f'{seconds}s'
+
+
+def _latency_labels():
+    edges = [0] + LATENCY_BINS_SECONDS
+    return [f'{_duration(a)}–{_duration(b)}' for a, b in zip(edges, edges[1:])] + [f'>{_duration(edges[-1])}']
+
+
+def create_health_figure(monitor):
+    """Coverage heat map (day x hour) next to the tick latency histogram"""
+    summary = monitor.summary()
+    days, hours, grid = monitor.coverage_grid()
+    fig = make_subplots(rows=1, cols=2, column_widths=[0.62, 0.38], horizontal_spacing=0.1,
+                        subplot_titles=('Tick coverage per hour', 'Time between ticks'))
+    fig.add_trace(go.Heatmap(
+        z=np.round(grid, 3), x=hours, y=days, zmin=0, zmax=1, colorscale='RdYlGn',
+        colorbar=dict(title='Coverage', x=0.56, len=0.9),
+        hovertemplate='%{y} %{x}<br>Coverage: %{z:.0%}<extra></extra>'
+    ), row=1, col=1)
+    fig.add_trace(go.Bar(
+        x=_latency_labels(), y=summary['latency']['counts'], marker_color='#667eea',
+        hovertemplate='%{x}: %{y} ticks<extra></extra>', showlegend=False
+    ), row=1, col=2)
+    fig.update_yaxes(autorange='reversed', row=1, col=1)
+    fig.update_yaxes(type='log', title='Ticks', row=1, col=2)
+    fig.update_layout(
+        template='plotly_dark',
+        paper_bgcolor='#1E1E1E',
+        plot_bgcolor='#2D2D2D',
+        height=max(300, 60 + 18 * len(days)),
+        margin=dict(l=90, r=30, t=50, b=60),
+    )
+    return fig
+
+
+def health_status_text(summary):
+    """One-line freshness and gap summary for the panel header"""
+    if summary['last_tick'] is None:
+        return '⚠️ No ticks stored in the monitored window'
+    minutes = summary['freshness_seconds'] / 60
+    state = '✅' if summary['fresh'] else '⚠️ Stale:'
+    coverage = '' if summary['coverage'] is None else f" · coverage {summary['coverage']:.1%}"
+    p90 = summary['latency']['p90_seconds']
+    latency = '' if p90 is None else f' · p90 tick interval ≤ {p90}s'
+    backfill = ''
+    if summary['backfill'] and summary['backfill']['running']:
+        backfill = ' · backfill running'
+    return (f"{state} last tick {minutes:.1f} min ago (SLA {summary['sla_seconds'] / 60:.0f} min)"
+            f"{coverage} · {summary['gaps']} gaps, {summary['missing_ticks']} missing ticks{latency}{backfill}")
+
+
+def update_health_panel(monitor):
+    """Health panel callback logic: (status text, figure)"""
+    try:
+        monitor.refresh()
+    except Exception as e:
+        print(f"Health monitor refresh failed: {e}")
+    summary = monitor.summary()
+    return health_status_text(summary), create_health_figure(monitor)
@@ -0,0 +1,71 @@
+import pandas as pd
+from dash import no_update
+from cache import is_past
+from config import LIVE_MAX_POINTS, LIVE_TAIL_WINDOW
+from payload import encode_x, encode_y
+
+# Plot modes whose first traces are the raw price lines, in selection order
+PRICE_MODES = ('overlaid', 'multi_y', 'separated')
+
+
+def make_cursor(df, dataset=None):
+    """Cursor describing the last tick the client holds and the dataset it came from"""
+    if df is None or df.empty:
+        return None
+    return {'timestamp': str(df['timestamp'].max()), 'rows': int(len(df)), 'dataset': dataset}
+
+
+def _utc(value):
+    ts = pd.Timestamp(value)
+    return ts.tz_localize('UTC') if ts.tz is None else ts.tz_convert('UTC')
+
+
+def tail_since(cursor, now):
+    """Timestamp to poll from, or None when the client's range does not reach the present
+
+    Only a dataset ending today (or a cursor within LIVE_TAIL_WINDOW of
+    `now`) is tailed, and the result is clamped to that window so a stale
+    cursor cannot trigger a read of everything stored since it.
+    """
+    if not cursor:
+        return None
+    window_start = _utc(now) - pd.Timedelta(minutes=LIVE_TAIL_WINDOW)
+    last = _utc(cursor['timestamp'])
+    dataset = cursor.get('dataset')
+    if last < window_start and (not dataset or is_past(dataset.split('|')[1])):
+        return None
+    return max(last, window_start).isoformat()
+
+
+def build_tail_update(df_new, cursor, selected_cryptos, plot_mode):
+    """Turn rows newer than the cursor into an extendData payload
+
+    Returns (extend_data, new_cursor). The payload appends to the price
+    traces only, which are the first traces of every price plot mode, and
+    keeps at most max(rows loaded, LIVE_MAX_POINTS) points per trace so a
+    dashboard left open does not grow without bound.
+    """
+    if df_new is None or df_new.empty or not cursor or not selected_cryptos:
+        return no_update, no_update
+    if plot_mode not in PRICE_MODES:
+        return no_update, no_update
+
+    df_new = df_new.sort_values('timestamp')
+    coins = [c for c in selected_cryptos if c in df_new.columns]
+    if not coins:
+        return no_update, no_update
+
+    # Same encoding as the live figure: epoch-ms x, prices at display precision
+    x = encode_x(df_new['timestamp'], typed=False)
+    update = {
+        'x': [x] * len(coins),
+        'y': [encode_y(df_new[c].astype(float), typed=False) for c in coins],
+    }
+    max_points = max(cursor.get('rows', 0), LIVE_MAX_POINTS)
+
+    new_cursor = {
+        **cursor,
+        'timestamp': str(df_new['timestamp'].iloc[-1]),
+        'rows': min(cursor.get('rows', 0) + len(df_new), max_points),
+    }
+    return [update, list(range(len(coins))), max_points], new_cursor
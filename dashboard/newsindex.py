@@ -0,0 +1,217 @@
+"""Local store and inverted index of every fetched news article
+
+GDELT is queried per person with a keyword set, a source list and a date
+range. Each fetch is recorded with the articles it returned; articles are
+indexed by title word, domain, person and the (person, keywords) query
+that found them. A later search whose person uses the same keywords, and
+whose sources and dates fall inside a complete earlier fetch, is answered
+from the index without contacting GDELT.
+
+A fetch only counts as complete when GDELT returned fewer rows than the
+record cap (a capped answer may be missing articles a narrower query would
+return), and fetches reaching into the current day expire after a while
+since new articles keep arriving.
+"""
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+from config import NEWS_CACHE_SECONDS, NEWS_INDEX_MAX_ARTICLES
+from cache import is_past
+from events import news_times, news_sources
+
+WORD = re.compile(r'[a-z0-9]+')
+
+
+def words(text):
+    return set(WORD.findall(str(text).lower()))
+
+
+def _day_bounds(start_date, end_date):
+    """UTC nanosecond bounds of the inclusive 'YYYY-MM-DD' range"""
+    start = pd.Timestamp(start_date, tz='UTC')
+    end = pd.Timestamp(end_date, tz='UTC') + pd.Timedelta(days=1) - pd.Timedelta(1, 'ns')
+    return start.value, end.value
+
+
+class _Fetch:
+    def __init__(self, person, keywords, sources, start, end, ids, complete, expires):
+        self.person = person
+        self.keywords = keywords
+        self.sources = sources
+        self.start, self.end = start, end
+        self.ids = ids
+        self.complete = complete
+        self.expires = expires
+
+    def covers(self, person, keywords, sources, start, end):
+        return (self.complete and self.person == person and self.keywords == keywords
+                and sources <= self.sources and self.start <= start and end <= self.end)
+
+
+class NewsIndex:
+    """Thread-safe article store with postings per title word, domain, person and query"""
+
+    def __init__(self, max_articles=NEWS_INDEX_MAX_ARTICLES, recent_seconds=NEWS_CACHE_SECONDS):
+        self.max_articles = max_articles
+        self.recent_seconds = recent_seconds
+        self._lock = threading.Lock()
+        self._fetches = OrderedDict()  # least recently used first
+        self._articles = {}            # id -> (row, time ns, title words, domain, person, query)
+        self._keys = {}                # (url, person) -> id
+        self._refs = {}                # id -> number of fetches holding it
+        self._postings = {'word': {}, 'domain': {}, 'person': {}, 'query': {}}
+        self._next_id = 0
+        self.stats = {'local': 0, 'remote': 0}
+
+    def clear(self):
+        with self._lock:
+            self._fetches.clear()
+            self._articles.clear()
+            self._keys.clear()
+            self._refs.clear()
+            for postings in self._postings.values():
+                postings.clear()
+
+    @staticmethod
+    def _normalize(person, keywords, sources):
+        return person.lower(), frozenset(k.lower() for k in keywords), frozenset(s.lower() for s in sources)
+
+    def _post(self, field, value, article_id):
+        self._postings[field].setdefault(value, set()).add(article_id)
+
+    def _unpost(self, field, value, article_id):
+        ids = self._postings[field].get(value)
+        if ids is not None:
+            ids.discard(article_id)
+            if not ids:
+                del self._postings[field][value]
+
+    def _insert(self, row, ts, domain, person, query):
+        url = row.get('URL', row.get('url'))
+        key = (url, person)
+        article_id = self._keys.get(key)
+        if article_id is None:
+            article_id = self._keys[key] = self._next_id
+            self._next_id += 1
+            title = words(row.get('title', row.get('Title', '')))
+            self._articles[article_id] = (row, ts, title, domain, person, set())
+            self._refs[article_id] = 0
+            for word in title:
+                self._post('word', word, article_id)
+            self._post('domain', domain, article_id)
+            self._post('person', person, article_id)
+        queries = self._articles[article_id][5]
+        if query not in queries:
+            queries.add(query)
+            self._post('query', query, article_id)
+        self._refs[article_id] += 1
+        return article_id
+
+    def _drop_fetch(self, key):
+        fetch = self._fetches.pop(key)
+        for article_id in fetch.ids:
+            self._refs[article_id] -= 1
+            if self._refs[article_id]:
+                continue
+            row, _, title, domain, person, queries = self._articles.pop(article_id)
+            del self._refs[article_id]
+            del self._keys[(row.get('URL', row.get('url')), person)]
+            for word in title:
+                self._unpost('word', word, article_id)
+            self._unpost('domain', domain, article_id)
+            self._unpost('person', person, article_id)
+            for query in queries:
+                self._unpost('query', query, article_id)
+
+    def add(self, person, keywords, sources, start_date, end_date, df, complete):
+        """Record one GDELT fetch and the articles it returned (df may be empty)"""
+        person, keywords, sources = self._normalize(person, keywords, sources)
+        start, end = _day_bounds(start_date, end_date)
+        expires = None if is_past(end_date) else time.monotonic() + self.recent_seconds
+        if df is None or df.empty:
+            rows, times, domains = [], [], []
+        else:
+            rows = df.to_dict('records')
+            times = news_times(df).as_unit('ns').asi8
+            domains = news_sources(df).str.lower().str.replace(r'^www\.', '', regex=True).tolist()
+
+        with self._lock:
+            key = (person, keywords, sources, start, end)
+            if key in self._fetches:
+                self._drop_fetch(key)
+            ids = [self._insert(row, ts, domain, person, (person, keywords))
+                   for row, ts, domain in zip(rows, times, domains)]
+            self._fetches[key] = _Fetch(person, keywords, sources, start, end, ids, complete, expires)
+            while len(self._articles) > self.max_articles and len(self._fetches) > 1:
+                self._drop_fetch(next(iter(self._fetches)))
+
+    def covers(self, person, keywords, sources, start_date, end_date):
+        """True when a complete, unexpired earlier fetch contains this query"""
+        person, keywords, sources = self._normalize(person, keywords, sources)
+        start, end = _day_bounds(start_date, end_date)
+        now = time.monotonic()
+        with self._lock:
+            for key, fetch in list(self._fetches.items()):
+                if fetch.expires is not None and fetch.expires < now:
+                    self._drop_fetch(key)
+                elif fetch.covers(person, keywords, sources, start, end):
+                    self._fetches.move_to_end(key)
+                    self.stats['local'] += 1
+                    return True
+            self.stats['remote'] += 1
+        return False
+
+    def export(self):
+        """(articles, searches): one row per article and search (its number in 'search'), and the searches"""
+        with self._lock:
+            fetches = list(self._fetches.values())
+            rows = [{**self._articles[i][0], 'search': n} for n, fetch in enumerate(fetches) for i in fetch.ids]
+        searches = [{
+            'person': fetch.person,
+            'keywords': sorted(fetch.keywords),
+            'sources': sorted(fetch.sources),
+            'start_date': pd.Timestamp(fetch.start, tz='UTC').strftime('%Y-%m-%d'),
+            'end_date': pd.Timestamp(fetch.end, tz='UTC').strftime('%Y-%m-%d'),
+            'complete': fetch.complete,
+        } for fetch in fetches]
+        return pd.DataFrame.from_records(rows), searches
+
+    def restore(self, df, searches):
+        """Re-add the searches of an export, so they are answered locally again"""
+        for n, search in enumerate(searches):
+            articles = df[df['search'] == n].drop(columns='search') if 'search' in df.columns else df.iloc[:0]
+            self.add(search['person'], search['keywords'], search['sources'], search['start_date'],
+                     search['end_date'], articles, search['complete'])
+
+    def lookup(self, person=None, keywords=None, sources=None, start_date=None, end_date=None, terms=None):
+        """Articles matching every given filter, newest first, as a DataFrame with a 'person' column
+
+        `keywords` selects the articles GDELT returned for (person, keywords);
+        `terms` requires each word to appear in the title.
+        """
+        start, end = _day_bounds(start_date or '1970-01-01', end_date or '2262-01-01')
+        with self._lock:
+            candidates = []
+            if person is not None:
+                candidates.append(self._postings['person'].get(person.lower(), set()))
+                if keywords is not None:
+                    query = (person.lower(), frozenset(k.lower() for k in keywords))
+                    candidates.append(self._postings['query'].get(query, set()))
+            if sources is not None:
+                # domainis:ft.com also matches subdomains such as markets.ft.com
+                wanted = tuple(s.lower() for s in sources)
+                candidates.append(set().union(*(ids for domain, ids in self._postings['domain'].items()
+                                                if domain in wanted or domain.endswith(tuple('.' + w for w in wanted)))))
+            for term in words(' '.join(terms or [])):
+                candidates.append(self._postings['word'].get(term, set()))
+            ids = set.intersection(*candidates) if candidates else set(self._articles)
+            found = [self._articles[i][:2] for i in sorted(ids) if start <= self._articles[i][1] <= end]
+
+        found.sort(key=lambda item: item[1], reverse=True)
+        df = pd.DataFrame.from_records([row for row, _ in found])
+        if person is not None and found:
+            df['person'] = person
+        return df
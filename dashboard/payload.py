@@ -0,0 +1,96 @@
+import base64
+
+import numpy as np
+import pandas as pd
+from config import PRICE_SIGNIFICANT_DIGITS
+
+
+def typed_array(values, dtype='f8'):
+    """Plotly.js typed-array spec ({'dtype', 'bdata'}) for a numeric array"""
+    array = np.ascontiguousarray(values, dtype=np.dtype(dtype).newbyteorder('<'))
+    return {'dtype': dtype, 'bdata': base64.b64encode(array.tobytes()).decode('ascii')}
+
+
+def epoch_ms(values):
+    """Datetimes (naive = UTC) as float milliseconds since the epoch, which date axes accept"""
+    index = pd.DatetimeIndex(pd.to_datetime(values, utc=True, format='ISO8601'))
+    ms = index.tz_localize(None).to_numpy(dtype='datetime64[ns]').view('int64') / 1e6
+    ms[index.isna()] = np.nan
+    return ms
+
+
+def display_round(values, digits=PRICE_SIGNIFICANT_DIGITS):
+    """Round a series to `digits` significant figures of its largest magnitude"""
+    values = np.asarray(values, dtype=float)
+    finite = np.abs(values[np.isfinite(values)])
+    if not len(finite) or finite.max() == 0:
+        return values
+    decimals = max(0, digits - 1 - int(np.floor(np.log10(finite.max()))))
+    return np.round(values, decimals)
+
+
+def _decode(value):
+    """Plain numpy array from a list or a typed-array spec"""
+    if isinstance(value, dict) and 'bdata' in value:
+        return np.frombuffer(base64.b64decode(value['bdata']), dtype=np.dtype(value['dtype']).newbyteorder('<'))
+    return np.asarray(value)
+
+
+def _is_time_axis(values):
+    if isinstance(values, dict) or len(values) == 0:
+        return False
+    sample = values[0]
+    return isinstance(sample, (str, pd.Timestamp, np.datetime64)) and not any(v is None for v in values)
+
+
+def encode_x(values, typed=True):
+    ms = epoch_ms(values)
+    return typed_array(ms) if typed else [None if np.isnan(v) else round(v) for v in ms.tolist()]
+
+
+def encode_y(values, typed=True):
+    y = display_round(_decode(values))
+    return typed_array(y, 'f4') if typed else [None if np.isnan(v) else v for v in y.tolist()]
+
+
+def minimize_figure(fig, typed=True):
+    """Figure dict with a smaller wire format and the same rendering
+
+    - datetime x values become epoch milliseconds (the axes are pinned to
+      type 'date'), as float64 typed arrays
+    - numeric y values are rounded to display precision and sent as
+      float32 typed arrays
+    - line-only traces drop their unused marker styling, and the template
+      keeps trace defaults only for the trace types in the figure
+
+    With typed=False (live mode, whose extendData appends plain arrays to
+    the traces) the same values are sent as plain JSON lists instead.
+    """
+    figure = fig if isinstance(fig, dict) else fig.to_dict()
+    layout = figure.setdefault('layout', {})
+
+    date_axes = set()
+    for trace in figure.get('data', []):
+        x = trace.get('x')
+        if x is not None and _is_time_axis(x):
+            try:
+                trace['x'] = encode_x(x, typed)
+                date_axes.add(trace.get('xaxis', 'x'))
+            except ValueError:
+                pass  # category labels, e.g. the correlation heatmap
+        y = trace.get('y')
+        if y is not None and (isinstance(y, dict) or (len(y) and not any(v is None for v in y)
+                                                      and not isinstance(y[0], str))):
+            trace['y'] = encode_y(y, typed)
+        if trace.get('mode') == 'lines':
+            trace.pop('marker', None)
+
+    for axis in date_axes:
+        key = 'xaxis' + axis[1:]
+        layout.setdefault(key, {})['type'] = 'date'
+
+    template = layout.get('template')
+    if isinstance(template, dict) and 'data' in template:
+        used = {trace.get('type', 'scatter') for trace in figure.get('data', [])}
+        template['data'] = {k: v for k, v in template['data'].items() if k in used}
+    return figure
@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+from config import GRID_FREQ, GRID_FILL_TOLERANCE
+from utils import to_epoch_ns
+
+
+def ffill_within(values, limit):
+    """Forward-fill NaNs along axis 0, but only up to `limit` rows past the last valid one"""
+    n = len(values)
+    if n == 0 or limit <= 0:
+        return values
+    rows = np.arange(n)[:, None]
+    valid = ~np.isnan(values)
+    last = np.maximum.accumulate(np.where(valid, rows, -1), axis=0)
+    fill = ~valid & (last >= 0) & (rows - last <= limit)
+    out = values.copy()
+    out[fill] = values[last[fill], np.nonzero(fill)[1]]
+    return out
+
+
+class PriceGrid:
+    """Prices on a regular time grid: row i is at start + i * step
+
+    Missing ticks are NaN rows, so any timestamp maps to its row in O(1)
+    and slices are zero-copy views of one dense (rows, coins) array.
+    """
+
+    def __init__(self, start_ns, step_ns, values, coins):
+        self.start_ns = int(start_ns)
+        self.step_ns = int(step_ns)
+        self.values = values
+        self.coins = list(coins)
+
+    @classmethod
+    def from_frame(cls, prices, freq=GRID_FREQ, tolerance=GRID_FILL_TOLERANCE):
+        """Snap a timestamp-indexed price frame to the grid
+
+        Each tick goes to its nearest grid slot (the latest tick wins when two
+        land in the same slot); prices are carried forward for at most
+        `tolerance`, after which the slots stay NaN and the gap is explicit.
+        """
+        step = pd.Timedelta(freq).value
+        ts = to_epoch_ns(prices.index)
+        coins = list(prices.columns)
+        if len(ts) == 0:
+            return cls(0, step, np.empty((0, len(coins))), coins)
+
+        start = (ts.min() + step // 2) // step * step
+        slots = np.rint((ts - start) / step).astype(np.int64)
+        values = np.full((int(slots.max()) + 1, len(coins)), np.nan)
+
+        order = np.argsort(ts, kind='stable')
+        values[slots[order]] = prices.to_numpy(dtype=float)[order]
+
+        limit = pd.Timedelta(tolerance).value // step
+        return cls(start, step, ffill_within(values, limit), coins)
+
+    def __len__(self):
+        return len(self.values)
+
+    @property
+    def end_ns(self):
+        return self.start_ns + (len(self) - 1) * self.step_ns
+
+    @property
+    def index(self):
+        return pd.DatetimeIndex(self.start_ns + np.arange(len(self)) * self.step_ns, tz='UTC')
+
+    def position(self, when):
+        """Row for a timestamp (rounded to the nearest slot, clipped to the grid)"""
+        t = to_epoch_ns([when])[0]
+        pos = int(round((t - self.start_ns) / self.step_ns))
+        return min(max(pos, 0), len(self) - 1)
+
+    def slice(self, start=None, end=None):
+        """Grid restricted to [start, end]; shares memory with this one"""
+        lo = 0 if start is None else self.position(start)
+        hi = len(self) if end is None else self.position(end) + 1
+        return PriceGrid(self.start_ns + lo * self.step_ns, self.step_ns, self.values[lo:hi], self.coins)
+
+    def column(self, coin):
+        return self.values[:, self.coins.index(coin)]
+
+    def gap_mask(self):
+        """True for rows where no coin has a price"""
+        return np.isnan(self.values).all(axis=1)
+
+    def to_frame(self):
+        """Timestamp-indexed frame with NaN rows at gaps (breaks the plotted lines)"""
+        return pd.DataFrame(self.values, index=self.index, columns=self.coins)
+
+
+def align_prices(prices, freq=GRID_FREQ, tolerance=GRID_FILL_TOLERANCE):
+    """Timestamp-indexed price frame snapped to the regular grid"""
+    frame = PriceGrid.from_frame(prices, freq, tolerance).to_frame()
+    frame.index.name = prices.index.name
+    return frame
+
+
+def align_frame(df, selected_cryptos=None):
+    """Store-shaped frame (with a 'timestamp' column) snapped to the regular grid"""
+    coins = [c for c in (selected_cryptos or df.columns) if c in df.columns and c != 'timestamp']
+    prices = df[coins].apply(pd.to_numeric, errors='coerce')
+    prices.index = pd.DatetimeIndex(pd.to_datetime(df['timestamp'], utc=True))
+    return align_prices(prices).reset_index(names='timestamp')
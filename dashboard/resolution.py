@@ -0,0 +1,110 @@
+import pandas as pd
+from collections import OrderedDict
+from cache import TTLCache
+from config import MAX_POINTS_PER_VIEW, RESOLUTION_LEVELS
+from resample import align_prices
+from stats import StatsIndex
+
+
+def _utc(value):
+    ts = pd.Timestamp(value)
+    return ts.tz_localize('UTC') if ts.tz is None else ts.tz_convert('UTC')
+
+
+class MultiResolutionIndex:
+    """Raw ticks plus pre-aggregated copies at coarser resolutions
+
+    Level 'raw' is the stored data snapped to the regular tick grid (gaps
+    are NaN rows); the others are bucket means at the offsets in
+    RESOLUTION_LEVELS, where a bucket with no ticks stays NaN so outages
+    remain visible at every zoom level. A view picks, for any time window,
+    the finest level that fits in `max_points` per trace. `stats` holds the
+    per-day summaries used for axis ranges.
+    """
+
+    def __init__(self, df):
+        prices = df.drop(columns=['timestamp']).apply(pd.to_numeric, errors='coerce')
+        prices.index = pd.DatetimeIndex(pd.to_datetime(df['timestamp'], utc=True))
+        prices = align_prices(prices)
+
+        self.levels = OrderedDict([('raw', prices)])
+        for rule in RESOLUTION_LEVELS:
+            self.levels[rule] = prices.resample(rule).mean()
+        self.stats = StatsIndex(prices)
+
+    @property
+    def start(self):
+        return self.levels['raw'].index[0]
+
+    @property
+    def end(self):
+        return self.levels['raw'].index[-1]
+
+    def _slice(self, frame, start, end):
+        index = frame.index
+        lo = 0 if start is None else index.searchsorted(start, side='left')
+        hi = len(index) if end is None else index.searchsorted(end, side='right')
+        return frame.iloc[lo:hi]
+
+    def level_for(self, start=None, end=None, max_points=MAX_POINTS_PER_VIEW):
+        """Name of the finest level with at most max_points rows in [start, end]"""
+        for name, frame in self.levels.items():
+            if len(self._slice(frame, start, end)) <= max_points:
+                return name
+        return name
+
+    def view(self, coins, start=None, end=None, max_points=MAX_POINTS_PER_VIEW):
+        """Frame with a 'timestamp' column: coarse over the full span, fine inside [start, end]
+
+        Returns (frame, level name used for the window).
+        """
+        coins = [c for c in coins if c in self.levels['raw'].columns]
+        coarse = self.levels[self.level_for(max_points=max_points)][coins]
+
+        if start is None and end is None:
+            level = self.level_for(max_points=max_points)
+            frame = coarse
+        else:
+            start, end = _utc(start), _utc(end)
+            level = self.level_for(start, end, max_points)
+            fine = self._slice(self.levels[level][coins], start, end)
+            frame = pd.concat([
+                self._slice(coarse, None, start - pd.Timedelta(1, 'ns')),
+                fine,
+                self._slice(coarse, end + pd.Timedelta(1, 'ns'), None),
+            ])
+
+        frame = frame.reset_index(names='timestamp')
+        return frame, level
+
+
+def plot_frame(df, selected_cryptos, plot_mode, max_points=MAX_POINTS_PER_VIEW, index=None):
+    """Bounded, grid-aligned frame for the initial render of a price chart
+
+    Overlaid mode opens on the last 24 hours, so that window is served at
+    the finest fitting level; other modes start fully zoomed out. Pass the
+    dataset's cached `index` to skip rebuilding it.
+    """
+    if index is None:
+        index = MultiResolutionIndex(df)
+    if plot_mode == 'overlaid':
+        return index.view(selected_cryptos, index.end - pd.Timedelta(hours=24), index.end, max_points)[0]
+    return index.view(selected_cryptos, max_points=max_points)[0]
+
+
+def visible_range(relayout_data):
+    """Extract the x-axis window from relayoutData: (start, end), 'all', or None"""
+    if not relayout_data:
+        return None
+    if relayout_data.get('xaxis.autorange'):
+        return 'all'
+    if 'xaxis.range[0]' in relayout_data and 'xaxis.range[1]' in relayout_data:
+        return relayout_data['xaxis.range[0]'], relayout_data['xaxis.range[1]']
+    if 'xaxis.range' in relayout_data:
+        return tuple(relayout_data['xaxis.range'][:2])
+    return None
+
+
+# Per-process LRU of MultiResolutionIndex objects keyed by dataset; thread-safe,
+# since viewport callbacks run concurrently on the Flask worker threads
+RESOLUTION_INDEXES = TTLCache(maxsize=4)
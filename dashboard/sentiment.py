@@ -0,0 +1,170 @@
+"""Offline headline sentiment from a bundled lexicon
+
+Titles are tokenized and scored for the whole news frame at once: every
+word found in sentiment_lexicon.tsv contributes its valence, flipped and
+damped when one of the three preceding words is a negation, and the sum
+is squashed into [-1, 1] (the VADER compound normalization). Scores are
+cached per article URL, so re-rendering the same news never rescores it.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from plotly.colors import sample_colorscale
+from config import SENTIMENT_CACHE_SIZE, SENTIMENT_NEUTRAL
+from cache import TTLCache
+from events import news_times
+from utils import load_dataframe_from_store, create_empty_figure
+
+LEXICON_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sentiment_lexicon.tsv')
+TOKEN = r"[a-z0-9]+(?:[-'][a-z0-9]+)*"
+NEGATIONS = {'not', 'no', 'never', 'without', "isn't", "aren't", "wasn't", "won't", "can't", "don't",
+             "doesn't", "didn't", 'nor', 'hardly', 'despite'}
+NEGATION_WINDOW = 3
+NEGATION_SCALAR = -0.74
+NORMALIZATION_ALPHA = 15
+# Shared with the event-study heat map, so red/green mean the same thing in both
+SENTIMENT_COLORSCALE = 'RdYlGn'
+
+SENTIMENT_CACHE = TTLCache(maxsize=SENTIMENT_CACHE_SIZE)
+
+
+def load_lexicon(path=LEXICON_PATH):
+    lexicon = {}
+    with open(path) as f:
+        for line in f:
+            if line.startswith('#') or not line.strip():
+                continue
+            word, score = line.split('\t')
+            lexicon[word] = float(score)
+    return lexicon
+
+
+LEXICON = load_lexicon()
+
+
+def score_titles(titles):
+    """Compound sentiment in [-1, 1] for each title (0 when no lexicon word occurs)"""
+    titles = pd.Series(titles, dtype=object).reset_index(drop=True)
+    if titles.empty:
+        return np.zeros(0)
+    tokens = titles.fillna('').astype(str).str.lower().str.findall(TOKEN).explode().dropna()
+    if tokens.empty:
+        return np.zeros(len(titles))
+
+    article = tokens.index.to_numpy()
+    words = tokens.to_numpy()
+    valence = tokens.map(LEXICON).to_numpy(dtype=float)
+    is_negation = tokens.isin(NEGATIONS).to_numpy()
+
+    # A negation within the previous NEGATION_WINDOW words of the same title
+    negated = np.zeros(len(words), dtype=bool)
+    for k in range(1, NEGATION_WINDOW + 1):
+        negated[k:] |= is_negation[:-k] & (article[k:] == article[:-k])
+    valence = np.where(negated, valence * NEGATION_SCALAR, valence)
+
+    total = np.zeros(len(titles))
+    hit = ~np.isnan(valence)
+    np.add.at(total, article[hit], valence[hit])
+    return total / np.sqrt(total * total + NORMALIZATION_ALPHA)
+
+
+def _titles(df_news):
+    column = 'title' if 'title' in df_news.columns else 'Title'
+    return df_news[column] if column in df_news.columns else pd.Series('', index=df_news.index)
+
+
+def article_sentiment(df_news):
+    """Sentiment per article, aligned with df_news; only uncached URLs are scored"""
+    if df_news is None or df_news.empty:
+        return pd.Series(dtype=float)
+    titles = _titles(df_news)
+    url_column = 'URL' if 'URL' in df_news.columns else 'url'
+    if url_column not in df_news.columns:
+        return pd.Series(score_titles(titles), index=df_news.index)
+
+    urls = df_news[url_column].astype(str).to_numpy()
+    scores = np.array([SENTIMENT_CACHE.get(url) for url in urls], dtype=float)
+    missing = np.isnan(scores)
+    if missing.any():
+        scores[missing] = score_titles(titles[missing])
+        for url, score in zip(urls[missing], scores[missing]):
+            SENTIMENT_CACHE.put(url, float(score))
+    return pd.Series(scores, index=df_news.index)
+
+
+def sentiment_colors(scores):
+    """Marker color per score on SENTIMENT_COLORSCALE (-1 red, 0 yellow, +1 green)"""
+    positions = (np.clip(np.nan_to_num(np.asarray(scores, dtype=float)), -1, 1) + 1) / 2
+    return sample_colorscale(SENTIMENT_COLORSCALE, positions.tolist())
+
+
+def marker_sizes(scores, base=8, scale=10):
+    """Marker size growing with the strength of the sentiment"""
+    return base + scale * np.abs(np.asarray(scores, dtype=float))
+
+
+def sentiment_label(score):
+    if score >= SENTIMENT_NEUTRAL:
+        return 'positive'
+    if score <= -SENTIMENT_NEUTRAL:
+        return 'negative'
+    return 'neutral'
+
+
+def daily_sentiment(df_news, scores=None):
+    """Mean sentiment and article count per UTC day, overall and per person"""
+    if df_news is None or df_news.empty:
+        return pd.DataFrame(columns=['day', 'person', 'sentiment', 'articles'])
+    if scores is None:
+        scores = article_sentiment(df_news)
+    frame = pd.DataFrame({
+        'day': news_times(df_news).floor('D').tz_convert(None),
+        'person': df_news['person'].astype(str).str.capitalize().values if 'person' in df_news.columns else 'All',
+        'sentiment': np.asarray(scores, dtype=float),
+    })
+    per_person = frame.groupby(['day', 'person'])['sentiment'].agg(sentiment='mean', articles='size').reset_index()
+    overall = frame.groupby('day')['sentiment'].agg(sentiment='mean', articles='size').reset_index()
+    overall.insert(1, 'person', 'All')
+    return pd.concat([overall, per_person], ignore_index=True)
+
+
+def create_sentiment_chart(daily):
+    """Daily mean headline sentiment: bars for all articles, a line per person"""
+    fig = go.Figure()
+    overall = daily[daily['person'] == 'All']
+    fig.add_trace(go.Bar(
+        x=overall['day'], y=overall['sentiment'].round(3),
+        marker=dict(color=overall['sentiment'], colorscale=SENTIMENT_COLORSCALE, cmin=-1, cmax=1),
+        customdata=overall['articles'], name='All articles',
+        hovertemplate='%{x|%Y-%m-%d}<br>Sentiment: %{y:+.2f}<br>%{customdata} articles<extra></extra>'
+    ))
+    for person, group in daily[daily['person'] != 'All'].groupby('person'):
+        fig.add_trace(go.Scatter(
+            x=group['day'], y=group['sentiment'].round(3), mode='lines+markers', name=person,
+            customdata=group['articles'],
+            hovertemplate=f'{person}<br>' + '%{x|%Y-%m-%d}: %{y:+.2f} (%{customdata} articles)<extra></extra>'
+        ))
+    fig.update_layout(
+        title='Daily News Sentiment',
+        template='plotly_dark',
+        paper_bgcolor='#1E1E1E',
+        plot_bgcolor='#2D2D2D',
+        height=300,
+        margin=dict(l=60, r=30, t=50, b=40),
+        yaxis=dict(range=[-1, 1], zeroline=True, zerolinecolor='#666', title='Sentiment'),
+        legend=dict(orientation='h', y=-0.2),
+        bargap=0.3
+    )
+    return fig
+
+
+def update_sentiment_chart(stored_news_data):
+    """Sentiment callback logic: figure of the per-day series for the stored news"""
+    if not stored_news_data:
+        return create_empty_figure()
+    df_news = load_dataframe_from_store(stored_news_data)
+    if df_news is None or df_news.empty:
+        return create_empty_figure()
+    return create_sentiment_chart(daily_sentiment(df_news))
@@ -0,0 +1,58 @@
+"""Dashboard export of the loaded datasets to a Parquet snapshot (src/snapshot.py)
+
+Besides the raw prices and FX rows, the snapshot carries what the
+dashboard derives from them, in the display currency: normalized prices,
+log returns, rolling volatility and pairwise rolling correlation, plus,
+when news is loaded, per-article and daily sentiment and the event study.
+Every fetched news article and the searches that found them are included
+too, so a dashboard run from the snapshot answers the same searches offline.
+"""
+import numpy as np
+import pandas as pd
+from config import BASE_CURRENCY
+from analytics import correlation_pairs, price_matrix, compute_analytics
+from events import event_study, parse_windows
+from sentiment import article_sentiment, daily_sentiment
+from snapshot import write_snapshot
+from utils import load_dataframe_from_store
+
+
+def _with_timestamp(frame):
+    return frame.reset_index(names='timestamp')
+
+
+def correlation_frame(index, corr, coins):
+    """Rolling correlation as one column per coin pair ('a/b'), pairs listed once"""
+    data = {f'{coins[i]}/{coins[j]}': corr[:, p] for p, (i, j) in enumerate(correlation_pairs(len(coins)))}
+    return pd.DataFrame({'timestamp': index, **data})
+
+
+def derived_tables(prices, selected_cryptos, df_news=None, windows=None):
+    """{table name: frame} of the analytics the dashboard shows for these prices"""
+    matrix = price_matrix(prices, selected_cryptos)
+    if matrix.empty:
+        return {}
+    analytics = compute_analytics(matrix)
+    tables = {name: _with_timestamp(analytics[name]) for name in ('normalized', 'returns', 'volatility')}
+    if len(matrix.columns) > 1 and analytics['correlation'] is not None:
+        tables['correlation'] = correlation_frame(matrix.index, analytics['correlation'], list(matrix.columns))
+
+    if df_news is not None and not df_news.empty:
+        tables['daily_sentiment'] = daily_sentiment(df_news)
+        study = event_study(matrix, df_news, parse_windows(windows))
+        tables['event_study'] = study.replace([np.inf, -np.inf], np.nan)
+    return tables
+
+
+def export_snapshot(path, prices, fx, news_index, shown, selected_cryptos, currency=BASE_CURRENCY,
+                    stored_news_data=None, windows=None):
+    """Write prices (base currency), FX, indexed news and derived tables in `currency` to `path`"""
+    articles, searches = news_index.export()
+    if not articles.empty:
+        articles['sentiment'] = article_sentiment(articles).to_numpy()
+    df_news = load_dataframe_from_store(stored_news_data) if stored_news_data else None
+    return write_snapshot(
+        path, prices, fx, articles, derived_tables(shown, selected_cryptos, df_news, windows),
+        meta={'base_currency': BASE_CURRENCY, 'currency': currency, 'selected': list(selected_cryptos or []),
+              'news_searches': searches}
+    )
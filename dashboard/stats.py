@@ -0,0 +1,134 @@
+import numpy as np
+import pandas as pd
+from utils import to_epoch_ns
+
+DAY_NS = 86_400 * 10**9
+FIELDS = ('min', 'max', 'first', 'last', 'count')
+
+
+def _summarize(values):
+    """min/max/first/last/count per column of a (rows, coins) block, NaN-aware"""
+    valid = ~np.isnan(values)
+    count = valid.sum(axis=0)
+    n_coins = values.shape[1]
+    out = {field: np.full(n_coins, np.nan) for field in FIELDS}
+    out['count'] = count.astype(float)
+    has = count > 0
+    if not has.any():
+        return out
+    with np.errstate(all='ignore'):
+        out['min'][has] = np.nanmin(values[:, has], axis=0)
+        out['max'][has] = np.nanmax(values[:, has], axis=0)
+    cols = np.flatnonzero(has)
+    out['first'][has] = values[valid[:, has].argmax(axis=0), cols]
+    out['last'][has] = values[len(values) - 1 - valid[::-1, has].argmax(axis=0), cols]
+    return out
+
+
+def _reduce(stacked):
+    """Merge summaries stacked one row per consecutive piece, in time order"""
+    with np.errstate(all='ignore'):
+        return {
+            'min': np.fmin.reduce(stacked['min'], axis=0),
+            'max': np.fmax.reduce(stacked['max'], axis=0),
+            'first': _summarize(stacked['first'])['first'],
+            'last': _summarize(stacked['last'])['last'],
+            'count': stacked['count'].sum(axis=0),
+        }
+
+
+def _combine(parts):
+    return _reduce({field: np.vstack([p[field] for p in parts if p is not None]) for field in FIELDS})
+
+
+class StatsIndex:
+    """Per-coin min/max/first/last/count for every UTC day block of a dataset
+
+    Extremes over any time window combine the summaries of the day blocks it
+    fully covers with a scan of the partial days at its edges, so layout and
+    zoom rescaling never touch more than two days of raw ticks.
+    """
+
+    def __init__(self, prices):
+        self.coins = list(prices.columns)
+        self._col = {c: i for i, c in enumerate(self.coins)}
+        self._times = to_epoch_ns(prices.index)
+        self._values = prices.to_numpy(dtype=float, na_value=np.nan)
+
+        days = self._times // DAY_NS
+        starts = np.flatnonzero(np.r_[True, days[1:] != days[:-1]]) if len(days) else np.empty(0, dtype=int)
+        self._offsets = np.r_[starts, len(days)]
+        self.blocks = {field: np.empty((len(starts), len(self.coins))) for field in FIELDS}
+        for b in range(len(starts)):
+            summary = _summarize(self._values[self._offsets[b]:self._offsets[b + 1]])
+            for field in FIELDS:
+                self.blocks[field][b] = summary[field]
+
+    @classmethod
+    def from_frame(cls, df, coins=None):
+        """Build from a dashboard frame with a 'timestamp' column"""
+        coins = [c for c in (coins or df.columns) if c in df.columns and c != 'timestamp']
+        prices = df[coins].apply(pd.to_numeric, errors='coerce')
+        prices.index = pd.DatetimeIndex(pd.to_datetime(df['timestamp'], utc=True))
+        return cls(prices)
+
+    def _rows(self, start, end):
+        lo = 0 if start is None else self._times.searchsorted(to_epoch_ns([start])[0], side='left')
+        hi = len(self._times) if end is None else self._times.searchsorted(to_epoch_ns([end])[0], side='right')
+        return lo, hi
+
+    def _window(self, start, end):
+        lo, hi = self._rows(start, end)
+        if lo >= hi:
+            return None
+        starts, ends = self._offsets[:-1], self._offsets[1:]
+        first_block = starts.searchsorted(lo, side='left')
+        end_block = ends.searchsorted(hi, side='right')
+        if first_block >= end_block:
+            return _summarize(self._values[lo:hi])
+
+        head = _summarize(self._values[lo:starts[first_block]]) if lo < starts[first_block] else None
+        middle = _reduce({field: self.blocks[field][first_block:end_block] for field in FIELDS})
+        parts = [head, middle]
+        if ends[end_block - 1] < hi:
+            parts.append(_summarize(self._values[ends[end_block - 1]:hi]))
+        return _combine(parts)
+
+    def summary(self, coins, start=None, end=None):
+        """{coin: {'min', 'max', 'first', 'last', 'count'}} over [start, end]"""
+        window = self._window(start, end)
+        out = {}
+        for coin in coins:
+            i = self._col.get(coin)
+            if i is None or window is None or window['count'][i] == 0:
+                continue
+            out[coin] = {field: float(window[field][i]) for field in FIELDS}
+        return out
+
+    def extent(self, coins, start=None, end=None):
+        """(min, max) across all coins over [start, end], or None when empty"""
+        ranges = self.summary(coins, start, end)
+        if not ranges:
+            return None
+        return min(r['min'] for r in ranges.values()), max(r['max'] for r in ranges.values())
+
+
+def padded(lo, hi, pad=0.05):
+    """Axis range with a margin on both sides (a flat series still gets height)"""
+    span = (hi - lo) or abs(hi) or 1.0
+    return [lo - span * pad, hi + span * pad]
+
+
+def axis_ranges(stats, selected_cryptos, plot_mode, window):
+    """{layout y-axis key: [lo, hi]} fitting the price traces inside window
+
+    Overlaid mode shares one axis across coins; multi_y gives every selected
+    coin its own axis ('yaxis', 'yaxis2', ...), in selection order.
+    """
+    start, end = (None, None) if window == 'all' else window
+    if plot_mode == 'overlaid':
+        extent = stats.extent(selected_cryptos, start, end)
+        return {'yaxis': padded(*extent)} if extent else {}
+    summary = stats.summary(selected_cryptos, start, end)
+    return {('yaxis' if i == 0 else f'yaxis{i+1}'): padded(summary[c]['min'], summary[c]['max'])
+            for i, c in enumerate(selected_cryptos) if c in summary}
@@ -31,4 +31,10 @@ def img_to_base64(path):
             return "data:image/png;base64," + base64.b64encode(f.read()).decode()
     except FileNotFoundError:
         print(f"Warning: Image not found at {path}")
-        return None
\ No newline at end of file
+        return None
+
+
+def to_epoch_ns(values):
+    """Convert datetimes (naive = UTC) to an int64 array of epoch nanoseconds"""
+    index = pd.DatetimeIndex(pd.to_datetime(values, utc=True))
+    return index.tz_localize(None).to_numpy(dtype='datetime64[ns]').view('int64')
@@ -0,0 +1,292 @@
+"""Backfill gaps in the crypto-prices table from CoinGecko price history
+
+    python src/backfill.py --start 2025-10-13 --end 2025-10-20
+
+Gaps are found from the stored timestamps, each gap is fetched for every
+coin concurrently under a shared token-bucket rate limit, and the prices
+are written on the scraper's 3-minute grid with batched, idempotent puts
+(re-running a backfill overwrites the same keys). A coin whose history
+cannot be fetched is logged and left out of the rows of that gap.
+
+On DynamoDB (CRYPTO_STORAGE_BACKEND unset or 'dynamodb') the table is
+read and written directly, so compressed blocks covering backfilled ticks
+are re-packed. Other writable backends (sqlite) go through the scraper's
+storage interface (get_storage); read-only ones (mmap, snapshot) cannot
+be backfilled.
+"""
+import argparse
+import bisect
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, UTC
+
+import requests
+from boto3.dynamodb.conditions import Key
+from prefect import flow, task
+
+from crypto_scraper import (COINGECKO_API_URL, CRYPTO_IDS, STORAGE_FORMAT, BLOCK_SECONDS,
+                            build_item, get_storage, pack_block, resolve_table)
+from currencies import BASE_CURRENCY
+from storage import DEFAULT_BACKEND, bump_version
+from tscodec import block_start
+
+TICK = timedelta(minutes=3)
+# CoinGecko's granularity depends on how far back a range lies, not on its
+# length: 5-minute points within the last day, hourly points up to 90 days
+# back, daily beyond. Requests are still split into days to keep them small.
+MAX_REQUEST_SPAN = timedelta(days=1)
+# Largest distance between a grid point and the history point used for it:
+# MAX_PRICE_AGE, widened to 60% of the spacing CoinGecko actually returned
+# so hourly history fills older gaps. Sparser (daily) history is not
+# widened, so gaps more than 90 days back are left essentially unfilled.
+MAX_PRICE_AGE = timedelta(minutes=5)
+MAX_PRICE_AGE_CAP = timedelta(minutes=40)
+# Base delay (seconds) for exponential backoff on throttled or failed requests
+RETRY_BACKOFF = 2.0
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, bursts up to `capacity`"""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def get_with_retry(session, url, params, limiter, retries=5, timeout=30):
+    """GET through the rate limiter, retrying 429/5xx and network errors with jittered backoff"""
+    for attempt in range(retries + 1):
+        limiter.acquire()
+        try:
+            response = session.get(url, params=params, timeout=timeout)
+        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError):
+            response = None
+
+        if response is not None and response.status_code == 200:
+            return response.json()
+        if response is not None and response.status_code not in (429, 500, 502, 503, 504):
+            response.raise_for_status()
+        if attempt == retries:
+            break
+
+        delay = RETRY_BACKOFF * (2 ** attempt) * random.uniform(0.5, 1.5)
+        if response is not None and response.headers.get('Retry-After', '').isdigit():
+            delay = max(delay, int(response.headers['Retry-After']))
+        time.sleep(delay)
+
+    raise RuntimeError(f'Giving up on {url} after {retries + 1} attempts')
+
+
+def parse_timestamp(value):
+    ts = datetime.fromisoformat(value)
+    return ts if ts.tzinfo else ts.replace(tzinfo=UTC)
+
+
+def stored_timestamps(table, start, end):
+    """All stored tick timestamps in [start, end], projected to the key only"""
+    kwargs = {
+        'KeyConditionExpression': Key('PK').eq('CRYPTO_PRICES') &
+                                  Key('timestamp').between(start.isoformat(), end.isoformat()),
+        'ProjectionExpression': '#ts',
+        'ExpressionAttributeNames': {'#ts': 'timestamp'},
+    }
+    timestamps = []
+    while True:
+        response = table.query(**kwargs)
+        timestamps.extend(parse_timestamp(item['timestamp']) for item in response['Items'])
+        if 'LastEvaluatedKey' not in response:
+            return timestamps
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def find_gaps(timestamps, start, end, tolerance=1.5):
+    """(gap_start, gap_end) pairs where consecutive ticks are more than tolerance * TICK apart"""
+    points = [start] + sorted(timestamps) + [end]
+    return [(a, b) for a, b in zip(points, points[1:]) if b - a > TICK * tolerance]
+
+
+def grid_points(gap_start, gap_end):
+    """3-minute grid timestamps strictly inside a gap, at least one tick from either edge"""
+    epoch = int(gap_start.timestamp())
+    first = datetime.fromtimestamp(epoch - epoch % int(TICK.total_seconds()), UTC) + TICK
+    points = []
+    while first <= gap_end - TICK:
+        if first >= gap_start + TICK / 2:
+            points.append(first)
+        first += TICK
+    return points
+
+
+def on_dynamodb(table_name):
+    """True when `table_name` is a table object or names a table of the configured DynamoDB backend"""
+    return not isinstance(table_name, str) or DEFAULT_BACKEND == 'dynamodb'
+
+
+@task
+def detect_gaps(table_name, start, end):
+    """Gaps in the stored tick sequence between start and end"""
+    if on_dynamodb(table_name):
+        timestamps = stored_timestamps(resolve_table(table_name), start, end)
+    else:
+        df = get_storage(table_name).query(start.isoformat(), end.isoformat(), coins=[])
+        timestamps = [parse_timestamp(str(ts)) for ts in df['timestamp']]
+    gaps = find_gaps(timestamps, start, end)
+    print(f"Found {len(gaps)} gaps covering {sum((b - a for a, b in gaps), timedelta())}")
+    return gaps
+
+
+def fetch_coin_history(session, limiter, coin, start, end):
+    """[(epoch_ms, price), ...] for one coin, split into <= 1 day requests"""
+    url = f"{COINGECKO_API_URL}/coins/{coin}/market_chart/range"
+    history = []
+    chunk_start = start
+    while chunk_start < end:
+        chunk_end = min(chunk_start + MAX_REQUEST_SPAN, end)
+        data = get_with_retry(session, url, {
+            'vs_currency': BASE_CURRENCY,
+            'from': int(chunk_start.timestamp()),
+            'to': int(chunk_end.timestamp()),
+        }, limiter)
+        history.extend((int(ms), float(price)) for ms, price in data.get('prices', []))
+        chunk_start = chunk_end
+    history.sort()
+    return history
+
+
+def max_price_age(times):
+    """Tolerance for a history: MAX_PRICE_AGE, widened to its point spacing unless that exceeds MAX_PRICE_AGE_CAP"""
+    if len(times) < 2:
+        return MAX_PRICE_AGE
+    widened = timedelta(milliseconds=statistics.median(b - a for a, b in zip(times, times[1:]))) * 0.6
+    return max(MAX_PRICE_AGE, widened) if widened <= MAX_PRICE_AGE_CAP else MAX_PRICE_AGE
+
+
+def price_at(times, prices, when, max_age=MAX_PRICE_AGE):
+    """Price of the history point nearest to `when`, if within `max_age`"""
+    target = int(when.timestamp() * 1000)
+    i = bisect.bisect_left(times, target)
+    best = None
+    for j in (i - 1, i):
+        if 0 <= j < len(times) and (best is None or abs(times[j] - target) < abs(times[best] - target)):
+            best = j
+    if best is None or abs(times[best] - target) > max_age.total_seconds() * 1000:
+        return None
+    return prices[best]
+
+
+def rows_for_gap(histories, gap_start, gap_end):
+    """Scraper-shaped rows on the grid with the coins that have a nearby price; none if no coin has"""
+    columns = {}
+    for coin, history in histories.items():
+        times = [ms for ms, _ in history]
+        columns[coin] = (times, [p for _, p in history], max_price_age(times))
+    rows = []
+    for point in grid_points(gap_start, gap_end):
+        prices = {coin: price_at(times, values, point, max_age)
+                  for coin, (times, values, max_age) in columns.items()}
+        prices = {coin: price for coin, price in prices.items() if price is not None}
+        if prices:
+            rows.append({'timestamp': point.isoformat(), **prices})
+    return rows
+
+
+@task
+def fetch_gap_rows(gaps, coins, workers=4, rate_per_minute=25):
+    """Fetch every (gap, coin) history concurrently and merge them into rows"""
+    limiter = TokenBucket(rate_per_minute / 60, capacity=max(1, workers // 2))
+    session = requests.Session()
+    rows = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            (gap, coin): pool.submit(fetch_coin_history, session, limiter, coin, gap[0] - TICK, gap[1] + TICK)
+            for gap in gaps for coin in coins
+        }
+        for gap in gaps:
+            histories = {}
+            for coin in coins:
+                try:
+                    histories[coin] = futures[(gap, coin)].result()
+                except Exception as e:
+                    # One coin failing (retries exhausted, a 4xx) leaves partial rows, not a failed backfill
+                    print(f"Skipping {coin} for {gap[0].isoformat()} - {gap[1].isoformat()}: {e}")
+                    histories[coin] = []
+            rows.extend(rows_for_gap(histories, *gap))
+    return rows
+
+
+@task
+def save_rows(rows, table_name='crypto-prices'):
+    """Batched, idempotent writes keyed on (PK, timestamp)"""
+    if not on_dynamodb(table_name):
+        storage = get_storage(table_name)
+        storage.write(rows)
+        storage.flush()
+        return len(rows)
+
+    table = resolve_table(table_name)
+    with table.batch_writer(overwrite_by_pkeys=['PK', 'timestamp']) as batch:
+        for row in rows:
+            batch.put_item(Item=build_item(row))
+
+    # Re-pack compressed blocks that now contain backfilled ticks
+    if STORAGE_FORMAT == 'blocks':
+        now_block = block_start(datetime.now(UTC).isoformat(), BLOCK_SECONDS)
+        for start in sorted({block_start(row['timestamp'], BLOCK_SECONDS) for row in rows}):
+            if start < now_block:
+                pack_block(table, start, BLOCK_SECONDS)
+    bump_version(table)
+    return len(rows)
+
+
+@flow(name="Crypto Price Backfill")
+def backfill_flow(start, end, coins=None, table_name='crypto-prices', workers=4, rate_per_minute=25):
+    """Detect gaps between start and end and fill them from CoinGecko history"""
+    coins = coins or CRYPTO_IDS
+    t0 = time.perf_counter()
+
+    gaps = detect_gaps(table_name, start, end)
+    rows = fetch_gap_rows(gaps, coins, workers, rate_per_minute) if gaps else []
+    written = save_rows(rows, table_name) if rows else 0
+
+    elapsed = time.perf_counter() - t0
+    stats = {'gaps': len(gaps), 'rows': written, 'seconds': round(elapsed, 2),
+             'rows_per_second': round(written / elapsed, 1) if elapsed else 0.0}
+    print(f"Backfilled {written} rows in {elapsed:.1f}s ({stats['rows_per_second']} rows/s)")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--start', required=True, help='Start date or ISO timestamp (UTC)')
+    parser.add_argument('--end', help='End date or ISO timestamp (UTC, default: now)')
+    parser.add_argument('--coins', nargs='+', help='Coin ids (default: all tracked coins)')
+    parser.add_argument('--table', default='crypto-prices')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--rate', type=float, default=25, help='API requests per minute')
+    args = parser.parse_args()
+
+    start = parse_timestamp(args.start)
+    end = parse_timestamp(args.end) if args.end else datetime.now(UTC)
+    backfill_flow(start, end, args.coins, args.table, args.workers, args.rate)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Registry of tracked coins
+
+One list drives ingestion (which ids the scraper requests, in chunks),
+the dashboard selector, trace colors and which columns are read back.
+The built-in list below is the default; point CRYPTO_COINS_FILE at a JSON
+file to track a different universe without code edits:
+
+    [{"id": "bitcoin", "label": "Bitcoin", "color": "#F7931A"},
+     {"id": "chainlink", "label": "Chainlink"}, ...]
+
+`label` defaults to the id in title case ('avalanche-2' -> 'Avalanche 2')
+and `color` to a stable color derived from the id; coins outside the
+registry get the same defaults.
+"""
+import colorsys
+import functools
+import hashlib
+import json
+import os
+from collections import namedtuple
+
+Coin = namedtuple('Coin', ['id', 'label', 'color'])
+
+COINS_FILE = os.getenv('CRYPTO_COINS_FILE')
+
+DEFAULT_COINS = [
+    {'id': 'bitcoin', 'label': 'Bitcoin', 'color': '#F7931A'},
+    {'id': 'ethereum', 'label': 'Ethereum', 'color': '#627EEA'},
+    {'id': 'tether', 'label': 'Tether', 'color': '#26A17B'},
+    {'id': 'binancecoin', 'label': 'Binance Coin', 'color': '#F3BA2F'},
+    {'id': 'solana', 'label': 'Solana', 'color': '#14F195'},
+    {'id': 'ripple', 'label': 'Ripple', 'color': '#23292F'},
+    {'id': 'usd-coin', 'label': 'USD Coin', 'color': '#2775CA'},
+    {'id': 'cardano', 'label': 'Cardano', 'color': '#0033AD'},
+    {'id': 'dogecoin', 'label': 'Dogecoin', 'color': '#C2A633'},
+    {'id': 'tron', 'label': 'Tron', 'color': '#FF060A'},
+]
+
+
+def palette_color(coin_id):
+    """Stable, well-spread color for a coin without one in the registry"""
+    digest = hashlib.md5(coin_id.encode()).digest()
+    hue = int.from_bytes(digest[:2], 'big') / 65535
+    r, g, b = colorsys.hls_to_rgb(hue, 0.6, 0.7)
+    return '#{:02X}{:02X}{:02X}'.format(round(r * 255), round(g * 255), round(b * 255))
+
+
+def default_label(coin_id):
+    return coin_id.replace('-', ' ').title()
+
+
+@functools.lru_cache(maxsize=None)
+def load_registry(path=COINS_FILE):
+    """Tracked coins, in registry order"""
+    entries = DEFAULT_COINS
+    if path:
+        with open(path) as f:
+            entries = json.load(f)
+    return tuple(
+        Coin(entry['id'], entry.get('label') or default_label(entry['id']),
+             entry.get('color') or palette_color(entry['id']))
+        for entry in entries
+    )
+
+
+def coin_ids():
+    return [coin.id for coin in load_registry()]
+
+
+def chunks(ids, size):
+    """Split ids into request-sized lists"""
+    return [ids[i:i + size] for i in range(0, len(ids), size)]
+
+
+class CoinColors(dict):
+    """Registry colors; coins outside the registry get their palette color"""
+
+    def get(self, coin_id):
+        return super().get(coin_id) or palette_color(coin_id)
+
+
+class CoinLabels(dict):
+    """Registry labels; coins outside the registry get their id in title case"""
+
+    def get(self, coin_id):
+        return super().get(coin_id) or default_label(coin_id)
+
+
+def coin_colors():
+    return CoinColors({coin.id: coin.color for coin in load_registry()})
+
+
+def coin_labels():
+    return CoinLabels({coin.id: coin.label for coin in load_registry()})
+
+
+def selector_options():
+    """Options for the dashboard's coin selector"""
+    return [{'label': coin.label, 'value': coin.id} for coin in load_registry()]
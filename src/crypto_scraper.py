@@ -1,74 +1,259 @@
 # flows/bitcoin_flow.py
-from prefect import flow, task
+from prefect import flow, task, unmapped
+from prefect.task_runners import ThreadPoolTaskRunner
 import requests
 import boto3
-from datetime import datetime, UTC
+from datetime import datetime, timedelta, UTC
 import os
+import functools
+import hashlib
+import math
+import time
+from coins import chunks, coin_ids
+from currencies import BASE_CURRENCY, QUOTE_CURRENCIES, fx_rates
 
+COINGECKO_API_URL = os.getenv('COINGECKO_API_URL', 'https://api.coingecko.com/api/v3')
 
-@task(retries=3, retry_delay_seconds=10)
-def fetch_crypto_data():
-    """Fetch crypto price data"""
-    url = "https://api.coingecko.com/api/v3/simple/price"
-    params = {
-        'ids': 'bitcoin,ethereum,tether,binancecoin,solana,ripple,usd-coin,cardano,dogecoin,tron',
-        'vs_currencies': 'eur',
+# Tracked coins come from the registry (coins.py); CoinGecko is asked for
+# at most COINGECKO_CHUNK_SIZE ids per request
+CRYPTO_IDS = coin_ids()
+COINGECKO_CHUNK_SIZE = int(os.getenv('COINGECKO_CHUNK_SIZE', '100'))
+
+TTL_DAYS = 180
+
+# 'items' writes one item per tick; 'blocks' additionally packs every closed
+# block of ticks into one compressed item (see tscodec.py)
+STORAGE_FORMAT = os.getenv('CRYPTO_STORAGE_FORMAT', 'items')
+BLOCK_SECONDS = int(os.getenv('CRYPTO_BLOCK_SECONDS', '3600'))
+
+
+_writers = {}
+
+
+@functools.lru_cache(maxsize=None)
+def get_dynamodb():
+    """Shared DynamoDB resource in the configured region"""
+    return boto3.resource('dynamodb', region_name=os.getenv('AWS_DEFAULT_REGION'))
+
+
+def get_table(table_name='crypto-prices'):
+    """DynamoDB table handle in the configured region"""
+    return get_dynamodb().Table(table_name)
+
+
+def get_writer(table_name='crypto-prices'):
+    """Process-wide buffered writer for a table (see writer.py)"""
+    from writer import BufferedWriter
+
+    if table_name not in _writers:
+        _writers[table_name] = BufferedWriter(get_dynamodb(), table_name)
+    return _writers[table_name]
+
+
+def build_item(data, ttl_days=TTL_DAYS, partition='CRYPTO_PRICES'):
+    """Convert {'timestamp': ..., coin: price, ...} (or an FX row) into a DynamoDB item"""
+    from decimal import Decimal
+
+    # Expire ttl_days after the tick itself, so backfilled rows age out on schedule
+    observed = datetime.fromisoformat(data['timestamp']).timestamp()
+    item = {
+        'PK': partition,  # fixed partition key per series
+        'timestamp': data['timestamp'],  # sort key
+        'ttl': int(observed) + (ttl_days * 24 * 3600)
+    }
+
+    for key, value in data.items():
+        # Coins missing from a tick (NaN in frame rows) are left out: DynamoDB rejects NaN
+        if key == 'timestamp' or value is None or (isinstance(value, float) and math.isnan(value)):
+            continue
+        item[key] = Decimal(str(value))
+
+    return item
+
+
+def fetch_coingecko(ids):
+    """{coin: {currency: price}} for one chunk of ids from CoinGecko /simple/price"""
+    response = requests.get(f"{COINGECKO_API_URL}/simple/price", params={
+        'ids': ','.join(ids),
+        'vs_currencies': ','.join(QUOTE_CURRENCIES),
         'include_24hr_change': 'false',
         'include_24hr_vol': 'false',
         'include_market_cap': 'false'
-    }
-
-    response = requests.get(url, params=params)
+    }, timeout=30)
     response.raise_for_status()
     return response.json()
 
 
+# Price sources by name, each fetching one chunk of coin ids; CRYPTO_PRICE_SOURCES
+# lists the ones to query, in priority order for coins more than one returns
+SOURCES = {'coingecko': fetch_coingecko}
+PRICE_SOURCES = [s.strip() for s in os.getenv('CRYPTO_PRICE_SOURCES', 'coingecko').split(',') if s.strip()]
+# Concurrent (source, chunk) fetches per tick
+FETCH_WORKERS = int(os.getenv('CRYPTO_FETCH_WORKERS', '8'))
+
+
+def fetch_cache_key(context, parameters):
+    """(source, chunk, minute): a retried tick reuses the chunks it already fetched"""
+    chunk = hashlib.sha1(','.join(parameters['ids']).encode()).hexdigest()[:12]
+    return f"{parameters['source']}-{chunk}-{parameters['minute']}"
+
+
+@task(retries=3, retry_delay_seconds=10, cache_key_fn=fetch_cache_key, cache_expiration=timedelta(minutes=5),
+      task_run_name='fetch-{source}-{minute}')
+def fetch_chunk(source, ids, minute):
+    """Prices of one chunk of coin ids from one source, in every quote currency"""
+    return SOURCES[source](ids)
+
+
+def merge_prices(results):
+    """One {coin: {currency: price}} dict; earlier sources win for coins several returned"""
+    prices = {}
+    for result in reversed(results):
+        prices.update(result)
+    return prices
+
+
+def fetch_crypto_data(ids=None, minute=None, sources=None):
+    """Fan fetch_chunk out over every (source, chunk) pair and merge what succeeded
+
+    A chunk that still fails after its retries is dropped; the tick fails
+    only when no chunk of any source returned prices.
+    """
+    sources = sources or PRICE_SOURCES
+    minute = minute or datetime.now(UTC).strftime('%Y-%m-%dT%H:%M')
+    pairs = [(source, chunk) for source in sources for chunk in chunks(ids or CRYPTO_IDS, COINGECKO_CHUNK_SIZE)]
+    futures = fetch_chunk.map([source for source, _ in pairs], [chunk for _, chunk in pairs], unmapped(minute))
+
+    results, failed = [], []
+    for (source, chunk), future in zip(pairs, futures):
+        result = future.result(raise_on_failure=False)
+        if isinstance(result, BaseException):
+            failed.append((source, len(chunk), result))
+        else:
+            results.append(result)
+    for source, size, error in failed:
+        print(f"Skipped a {size}-coin chunk from {source}: {error}")
+    if not results:
+        raise RuntimeError(f"No prices fetched from {', '.join(sources)}")
+    return merge_prices(results)
+
+
 @task
 def transform_data(raw_data):
-    """Add timestamp and format data"""
+    """Add timestamp and keep the base-currency price of every coin"""
     return {
        'timestamp': datetime.now(UTC).isoformat(),
-       **{key: item['eur'] for key, item in raw_data.items()}
+       **{key: item[BASE_CURRENCY] for key, item in raw_data.items() if BASE_CURRENCY in item}
     }
 
 
 @task
-def save_to_dynamodb(data, table_name='crypto-prices'):
-    """Save to DynamoDB - all cryptos in one item per timestamp"""
-    from decimal import Decimal
-    import time
-    
-    dynamodb = boto3.resource('dynamodb', region_name=os.getenv('AWS_DEFAULT_REGION'))
-    table = dynamodb.Table(table_name)
-    
-    timestamp = data['timestamp']
-    ttl = int(time.time()) + (180 * 24 * 3600)  # Expire in 180 days
-    
-    item = {
-        'PK': 'CRYPTO_PRICES',  # fixed partition key
-        'timestamp': timestamp,  # sort key
-        'ttl': ttl
+def transform_fx(raw_data, timestamp):
+    """FX row for the other quote currencies, stamped like the price tick"""
+    return {'timestamp': timestamp, **fx_rates(raw_data)}
+
+
+@functools.lru_cache(maxsize=None)
+def get_storage(table_name='crypto-prices'):
+    """Configured storage backend (CRYPTO_STORAGE_BACKEND, see storage.py)"""
+    from storage import DEFAULT_BACKEND, get_backend
+
+    if DEFAULT_BACKEND == 'dynamodb':
+        return get_backend('dynamodb', table_name=table_name, storage_format=STORAGE_FORMAT,
+                           block_seconds=BLOCK_SECONDS)
+    return get_backend(DEFAULT_BACKEND)
+
+
+@task
+def save_tick(data, fx_row=None, table_name='crypto-prices'):
+    """Save one tick (all cryptos for one timestamp) and its FX row in one batched step
+
+    On DynamoDB both items are queued on the buffered writer.
+    """
+    storage = get_storage(table_name)
+    storage.write([data])
+    if fx_row is not None and len(fx_row) > 1:
+        storage.write_fx([fx_row])
+    return 1
+
+
+@task
+def flush_writes(table_name='crypto-prices'):
+    """Wait for buffered writes and report writer metrics"""
+    return get_storage(table_name).flush()
+
+
+def resolve_table(table):
+    """Accept a table name or an already constructed table object"""
+    return get_table(table) if isinstance(table, str) else table
+
+
+def pack_block(table, start, block_seconds=BLOCK_SECONDS):
+    """(Re)write the compressed block item for the block starting at `start`"""
+    from boto3.dynamodb.conditions import Key
+    from tscodec import encode_block, from_micros, to_micros
+
+    end = from_micros(to_micros(start) + block_seconds * 1_000_000)
+    kwargs = {
+        'KeyConditionExpression': Key('PK').eq('CRYPTO_PRICES') &
+                                  Key('timestamp').between(start, end),
     }
+    items = []
+    while True:
+        response = table.query(**kwargs)
+        items.extend(i for i in response['Items'] if i['timestamp'] < end)
+        if 'LastEvaluatedKey' not in response:
+            break
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    if not items:
+        return 0
 
-    for key, value in data.items():
-        if key == 'timestamp':
-            continue
-        item[key] = Decimal(str(value))
-    
-    table.put_item(Item=item)
-    
-    return 1 
+    rows = [{k: v for k, v in item.items() if k not in ('PK', 'ttl')} for item in items]
+    ttl = max(int(item['ttl']) for item in items)
+    table.put_item(Item=encode_block(rows, start, ttl))
+    return len(rows)
+
+
+@task
+def compact_previous_block(data, table_name='crypto-prices', block_seconds=BLOCK_SECONDS):
+    """Pack the block before the current tick into one compressed item, once"""
+    from tscodec import BLOCK_PARTITION, block_start, from_micros, to_micros
+
+    table = resolve_table(table_name)
+    current = block_start(data['timestamp'], block_seconds)
+    previous = from_micros(to_micros(current) - block_seconds * 1_000_000)
+
+    if 'Item' in table.get_item(Key={'PK': BLOCK_PARTITION, 'timestamp': previous}):
+        return 0
+    return pack_block(table, previous, block_seconds)
+
+
+@flow(name="Crypto Price Tracker", task_runner=ThreadPoolTaskRunner(max_workers=FETCH_WORKERS))
+def crypto_tracking_flow(ticks=1, interval_seconds=0):
+    """Main flow to track Crypto prices
 
+    Every (source, chunk) fetch runs as its own mapped task on the thread
+    pool task runner, so a tick takes about as long as the slowest request
+    and a failing chunk is retried alone. With ticks > 1 the flow keeps
+    polling every interval_seconds; writes are buffered on a background
+    thread so the fetch loop never waits on DynamoDB.
+    """
+    for tick in range(ticks):
+        started = time.monotonic()
+        raw_data = fetch_crypto_data()
+        transformed = transform_data(raw_data)
+        save_tick(transformed, transform_fx(raw_data, transformed['timestamp']))
+        if tick < ticks - 1:
+            time.sleep(max(0, interval_seconds - (time.monotonic() - started)))
 
-@flow(name="Crypto Price Tracker")
-def crypto_tracking_flow():
-    """Main flow to track Crypto prices"""
-    raw_data = fetch_crypto_data()
-    transformed = transform_data(raw_data)
-    dynamodb_path = save_to_dynamodb(transformed)
+    metrics = flush_writes()
+    print(f"Saved crypto data: {metrics}")
 
-    print(f"Saved crypto data to {dynamodb_path}")
+    if STORAGE_FORMAT == 'blocks' and os.getenv('CRYPTO_STORAGE_BACKEND', 'dynamodb') == 'dynamodb':
+        packed = compact_previous_block(transformed)
+        if packed:
+            print(f"Packed {packed} ticks into a compressed block")
 
 
 if __name__ == "__main__":
-    crypto_tracking_flow()
\ No newline at end of file
+    crypto_tracking_flow()
@@ -0,0 +1,68 @@
+"""Quote currencies: one base currency for prices plus an FX-rate series
+
+CoinGecko is asked for every currency in CRYPTO_QUOTE_CURRENCIES, but coin
+prices are stored in the first one (the base) only. The other currencies
+become one small FX row per tick, {'timestamp': iso, 'usd': rate, ...},
+with rate = units of that currency per unit of the base, taken as the
+median over coins of price[currency] / price[base]. The dashboard
+converts stored prices with a vectorized multiplication by the rate in
+force at each tick.
+
+    CRYPTO_QUOTE_CURRENCIES=eur,usd,gbp
+"""
+import os
+import statistics
+
+QUOTE_CURRENCIES = [c.strip().lower() for c in os.getenv('CRYPTO_QUOTE_CURRENCIES', 'eur,usd,gbp').split(',')
+                    if c.strip()]
+BASE_CURRENCY = QUOTE_CURRENCIES[0]
+FX_PARTITION = 'FX_RATES'
+
+SYMBOLS = {'eur': '€', 'usd': '$', 'gbp': '£', 'jpy': '¥', 'cny': '¥', 'inr': '₹', 'krw': '₩', 'chf': 'CHF '}
+
+
+def symbol(currency):
+    return SYMBOLS.get(currency, currency.upper() + ' ')
+
+
+def fx_rates(raw_prices, base=BASE_CURRENCY, currencies=QUOTE_CURRENCIES):
+    """{currency: rate per base unit} from a CoinGecko /simple/price response"""
+    rates = {}
+    for currency in currencies:
+        if currency == base:
+            continue
+        ratios = [item[currency] / item[base] for item in raw_prices.values()
+                  if item.get(base) and item.get(currency)]
+        if ratios:
+            rates[currency] = statistics.median(ratios)
+    return rates
+
+
+def rates_at(fx, timestamps, currency):
+    """Rate in force at each timestamp: the latest FX row at or before it (the first row before the series)"""
+    import numpy as np
+    import pandas as pd
+
+    series = fx[['timestamp', currency]].dropna()
+    fx_ns = pd.DatetimeIndex(pd.to_datetime(series['timestamp'], utc=True)).as_unit('ns').asi8
+    order = np.argsort(fx_ns, kind='stable')
+    fx_ns, rates = fx_ns[order], series[currency].to_numpy(dtype=float)[order]
+    at_ns = pd.DatetimeIndex(pd.to_datetime(timestamps, utc=True)).as_unit('ns').asi8
+    return rates[np.clip(np.searchsorted(fx_ns, at_ns, side='right') - 1, 0, len(rates) - 1)]
+
+
+def to_currency(df, fx, currency, base=BASE_CURRENCY):
+    """(frame, currency) with prices converted from the base currency
+
+    Falls back to the unconverted frame and the base currency when the
+    FX series has no rates for `currency`.
+    """
+    if currency == base or df is None or df.empty:
+        return df, base
+    if fx is None or currency not in fx.columns or not fx[currency].notna().any():
+        return df, base
+    coins = [c for c in df.columns if c != 'timestamp']
+    rates = rates_at(fx, df['timestamp'], currency)
+    converted = df.copy()
+    converted[coins] = df[coins].to_numpy(dtype=float) * rates[:, None]
+    return converted, currency
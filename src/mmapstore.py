@@ -0,0 +1,339 @@
+"""Shared, memory-mapped columnar price store, appended to by one refresher
+
+Layout of a store directory:
+
+    header          64 bytes: magic, row count, capacity, number of coins
+    coins.json      column order, e.g. ["bitcoin", "ethereum", ...]
+    timestamp.i8    epoch nanoseconds (int64), strictly increasing
+    <coin>.f8       one float64 array per coin, NaN where a tick lacks it
+    fx/             the FX-rate series, a nested store with one column per currency
+
+Exactly one refresher process appends (MmapWriter, or the `refresh`
+command below, which tails another backend). Any number of dashboard
+workers open an MmapBackend: it maps the files read-only, so every
+process shares the same page-cache copy of the history, and a query is a
+binary search on the timestamp array plus zero-copy slices of the coin
+arrays. The writer fills the new rows before it bumps the row count in
+the header, so readers see either the old or the new rows, never a
+partial tick, and pick up new ticks without reloading.
+
+Ticks at or before the last stored one (a backfill of the source) are
+merged: existing timestamps get their missing or changed prices, new ones
+are inserted by rewriting the rows from the first of them onward in place.
+A reader querying those rows during the rewrite can see them shifted, so
+the merge bumps the header's version slot, which makes dashboards drop the
+ranges they cached (MmapBackend.version). `refresh` re-reads its window
+from the source whenever the source's version changes, so backfilled gaps
+reach the store.
+
+    python src/mmapstore.py refresh --from dynamodb --days 30 --interval 60
+"""
+import argparse
+import json
+import os
+import re
+import time
+
+import numpy as np
+
+DEFAULT_MMAP_PATH = os.getenv('CRYPTO_MMAP_PATH',
+                              os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'prices.mmap'))
+MAGIC = int.from_bytes(b'CPRICES1', 'little')
+HEADER_FIELDS = 8  # uint64 slots: magic, rows, capacity, n_coins, version, reserved...
+VERSION_SLOT = 4  # bumped when past rows are rewritten
+INITIAL_CAPACITY = 1 << 16
+
+
+def _utc_ns(value):
+    import pandas as pd
+
+    ts = pd.Timestamp(value)
+    ts = ts.tz_localize('UTC') if ts.tz is None else ts.tz_convert('UTC')
+    return ts.value
+
+
+class _Store:
+    """File locations shared by the reader and the writer"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def file(self, name):
+        return os.path.join(self.path, name)
+
+    def column_file(self, coin):
+        return self.file(f'{coin}.f8')
+
+    def read_coins(self):
+        with open(self.file('coins.json')) as f:
+            return json.load(f)
+
+
+class MmapBackend(_Store):
+    """Read-only view of a store, for dashboard workers (see storage.py)"""
+
+    def __init__(self, path=DEFAULT_MMAP_PATH):
+        super().__init__(path)
+        self._header = np.memmap(self.file('header'), dtype='<u8', mode='r', shape=(HEADER_FIELDS,))
+        if int(self._header[0]) != MAGIC:
+            raise ValueError(f'Not a price store: {path}')
+        self._capacity = 0
+        self._n_coins = -1
+        self._fx = None
+        self._remap()
+
+    def _remap(self):
+        """Map every column at the current capacity (after the writer grows or adds coins)"""
+        capacity, n_coins = int(self._header[2]), int(self._header[3])
+        if capacity == self._capacity and n_coins == self._n_coins:
+            return
+        self.coins = self.read_coins()[:n_coins]
+        self._ts = np.memmap(self.file('timestamp.i8'), dtype='<i8', mode='r', shape=(capacity,))
+        self._columns = {coin: np.memmap(self.column_file(coin), dtype='<f8', mode='r', shape=(capacity,))
+                         for coin in self.coins}
+        self._capacity, self._n_coins = capacity, n_coins
+
+    def rows(self):
+        self._remap()
+        return int(self._header[1])
+
+    def columns(self):
+        self._remap()
+        return list(self.coins)
+
+    def _slice(self, lo_ns, hi_ns, coins, exclusive=False):
+        import pandas as pd
+
+        n = self.rows()
+        ts = self._ts[:n]
+        lo = 0 if lo_ns is None else int(np.searchsorted(ts, lo_ns, side='right' if exclusive else 'left'))
+        hi = n if hi_ns is None else int(np.searchsorted(ts, hi_ns, side='right'))
+        coins = self.coins if coins is None else [c for c in coins if c in self._columns]
+
+        stamps = pd.DatetimeIndex(np.asarray(ts[lo:hi]).view('datetime64[ns]')).tz_localize('UTC')
+        data = {'timestamp': stamps}
+        for coin in coins:
+            data[coin] = np.asarray(self._columns[coin][lo:hi])
+        return pd.DataFrame(data, copy=False)
+
+    def query(self, time1, time2, coins=None):
+        return self._slice(_utc_ns(time1), _utc_ns(time2), coins)
+
+    def query_since(self, since, coins=None):
+        return self._slice(_utc_ns(since), None, coins, exclusive=True)
+
+    def last_timestamp(self):
+        n = self.rows()
+        return int(self._ts[n - 1]) if n else None
+
+    def version(self):
+        return int(self._header[VERSION_SLOT])
+
+    def query_fx(self, time1, time2):
+        import pandas as pd
+
+        if self._fx is None:
+            if not os.path.exists(os.path.join(self.file('fx'), 'header')):
+                return pd.DataFrame({'timestamp': []})
+            self._fx = MmapBackend(self.file('fx'))
+        return self._fx.query(time1, time2)
+
+    def write(self, rows):
+        raise ValueError('The memory-mapped store is read-only here; the refresher appends to it')
+
+    def write_fx(self, rows):
+        self.write(rows)
+
+    def flush(self):
+        return {'written': 'read-only'}
+
+
+class MmapWriter(_Store):
+    """The single appender of a store; creates it when missing"""
+
+    def __init__(self, path=DEFAULT_MMAP_PATH, capacity=INITIAL_CAPACITY):
+        super().__init__(path)
+        os.makedirs(path, exist_ok=True)
+        if not os.path.exists(self.file('header')):
+            self._create(capacity)
+        self._header = np.memmap(self.file('header'), dtype='<u8', mode='r+', shape=(HEADER_FIELDS,))
+        self.coins = self.read_coins()
+        self._map()
+
+    def _create(self, capacity):
+        with open(self.file('timestamp.i8'), 'wb') as f:
+            f.truncate(capacity * 8)
+        self._write_coins([])
+        header = np.zeros(HEADER_FIELDS, dtype='<u8')
+        header[0], header[2] = MAGIC, capacity
+        header.tofile(self.file('header'))
+
+    def _write_coins(self, coins):
+        tmp = self.file('coins.json.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(coins, f)
+        os.replace(tmp, self.file('coins.json'))
+
+    def _map(self):
+        capacity = int(self._header[2])
+        self._ts = np.memmap(self.file('timestamp.i8'), dtype='<i8', mode='r+', shape=(capacity,))
+        self._columns = {coin: np.memmap(self.column_file(coin), dtype='<f8', mode='r+', shape=(capacity,))
+                         for coin in self.coins}
+
+    @property
+    def rows(self):
+        return int(self._header[1])
+
+    def last_timestamp(self):
+        return int(self._ts[self.rows - 1]) if self.rows else None
+
+    def _grow(self, needed):
+        capacity = int(self._header[2])
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name in ['timestamp.i8'] + [f'{coin}.f8' for coin in self.coins]:
+            with open(self.file(name), 'r+b') as f:
+                f.truncate(capacity * 8)
+        self._header[2] = capacity
+        self._map()
+
+    def _add_coin(self, coin):
+        if not re.fullmatch(r'[A-Za-z0-9_\-]+', coin):
+            raise ValueError(f'Invalid coin id: {coin!r}')
+        capacity = int(self._header[2])
+        with open(self.column_file(coin), 'wb') as f:
+            f.truncate(capacity * 8)
+        column = np.memmap(self.column_file(coin), dtype='<f8', mode='r+', shape=(capacity,))
+        column[:self.rows] = np.nan
+        self._columns[coin] = column
+        self.coins.append(coin)
+        self._write_coins(self.coins)
+
+    def _merge(self, ts, values):
+        """Merge ticks at or before the last stored one; returns how many were inserted
+
+        Stored timestamps take the given non-NaN prices; new timestamps are
+        inserted in order by rewriting the rows from the first of them on.
+        """
+        rows = self.rows
+        stored = np.asarray(self._ts[:rows])
+        pos = np.searchsorted(stored, ts)
+        exists = stored[np.minimum(pos, rows - 1)] == ts
+        for coin, column in values.items():
+            known = exists & ~np.isnan(column)
+            self._columns[coin][pos[known]] = column[known]
+
+        inserted = ~exists
+        n = int(inserted.sum())
+        if n:
+            start = int(pos[inserted].min())
+            merged_ts = np.concatenate([stored[start:], ts[inserted]])
+            order = np.argsort(merged_ts, kind='stable')
+            tails = {coin: np.concatenate([np.asarray(column[start:rows]),
+                                           values[coin][inserted] if coin in values else np.full(n, np.nan)])
+                     for coin, column in self._columns.items()}
+            self._grow(rows + n)
+            for coin, tail in tails.items():
+                self._columns[coin][start:rows + n] = tail[order]
+            self._ts[start:rows + n] = merged_ts[order]
+
+        for array in [self._ts, *self._columns.values()]:
+            array.flush()
+        self._header[3] = len(self.coins)
+        self._header[1] = rows + n
+        self._header[VERSION_SLOT] += 1
+        self._header.flush()
+        print(f"Merged {len(ts)} past ticks ({n} inserted)")
+        return n
+
+    def append(self, df):
+        """Add the rows of a store-shaped frame; returns how many ticks were new
+
+        Rows newer than the last stored tick are appended, older ones are
+        merged into the stored history (see _merge).
+        """
+        import pandas as pd
+
+        if df is None or df.empty:
+            return 0
+        ts = pd.DatetimeIndex(pd.to_datetime(df['timestamp'], utc=True)).as_unit('ns').asi8
+        order = np.argsort(ts, kind='stable')
+        ts = ts[order]
+        keep = np.r_[True, ts[1:] != ts[:-1]]  # one row per timestamp
+        for coin in (c for c in df.columns if c != 'timestamp'):
+            if coin not in self._columns:
+                self._add_coin(coin)
+        values = {coin: df[coin].to_numpy(dtype=float)[order] for coin in self._columns if coin in df.columns}
+
+        last = self.last_timestamp()
+        merged = 0
+        if last is not None:
+            past = keep & (ts <= last)
+            if past.any():
+                merged = self._merge(ts[past], {coin: column[past] for coin, column in values.items()})
+            keep &= ts > last
+        if not keep.any():
+            return merged
+
+        rows, n = self.rows, int(keep.sum())
+        self._grow(rows + n)
+        for coin, column in self._columns.items():
+            column[rows:rows + n] = values[coin][keep] if coin in values else np.nan
+        self._ts[rows:rows + n] = ts[keep]
+
+        # Publish: data first, then the coin count and the row count readers trust
+        for array in [self._ts, *self._columns.values()]:
+            array.flush()
+        self._header[3] = len(self.coins)
+        self._header[1] = rows + n
+        self._header.flush()
+        return merged + n
+
+
+def refresh(source, path=DEFAULT_MMAP_PATH, days=30, interval=60, once=False):
+    """Tail `source` (a storage backend) into the store at `path`"""
+    import pandas as pd
+
+    writer = MmapWriter(path)
+    fx_writer = MmapWriter(writer.file('fx'))
+    seen = None
+    while True:
+        now = pd.Timestamp.now(tz='UTC')
+        last = writer.last_timestamp()
+        # A changed source version means past ticks were backfilled: re-read the window to merge them
+        version = source.version()
+        if last is None or (seen is not None and version != seen):
+            since = (now - pd.Timedelta(days=days)).isoformat()
+            df = source.query(since, now.isoformat())
+        else:
+            df = source.query_since(pd.Timestamp(last, tz='UTC').isoformat())
+        seen = version
+        added = writer.append(df)
+        fx_last = fx_writer.last_timestamp()
+        fx_since = now - pd.Timedelta(days=days) if fx_last is None else pd.Timestamp(fx_last, tz='UTC')
+        fx_writer.append(source.query_fx(fx_since.isoformat(), now.isoformat()))
+        print(f"Appended {added} ticks ({writer.rows} total)")
+        if once:
+            return writer.rows
+        time.sleep(interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='command', required=True)
+    tail = sub.add_parser('refresh', help='Append new ticks from another backend, forever (or --once)')
+    tail.add_argument('--from', dest='source', default='dynamodb', choices=['dynamodb', 'sqlite'])
+    tail.add_argument('--path', default=DEFAULT_MMAP_PATH)
+    tail.add_argument('--days', type=int, default=30, help='History to load into a new store')
+    tail.add_argument('--interval', type=float, default=60)
+    tail.add_argument('--once', action='store_true')
+    args = parser.parse_args()
+
+    from storage import get_backend
+    refresh(get_backend(args.source), args.path, args.days, args.interval, args.once)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,246 @@
+"""Parquet snapshots of price, FX, news and derived analytics data
+
+Layout of a snapshot directory:
+
+    manifest.json   range, coins, currency, tables and row counts, news searches
+    prices/         timestamp + one column per coin, hive-partitioned by date=YYYY-MM-DD
+    fx/             FX rows (rate per base unit per currency), partitioned by date
+    news/           the news articles loaded in the dashboard, partitioned by person
+    <analytics>/    derived tables written by the dashboard export (returns,
+                    volatility, correlation, sentiment, event study, ...)
+
+Files are compressed Parquet (CRYPTO_SNAPSHOT_COMPRESSION, zstd by
+default) and need pyarrow, which requirements-dashboard.txt installs. A
+date-partitioned table is read back with partition pruning plus a
+timestamp filter, so a query touches only the days it covers. SnapshotBackend serves a snapshot through the storage
+backend interface (storage.py), which lets the dashboard run from it
+with no AWS reads:
+
+    python src/snapshot.py export --start 2025-10-13 --end 2025-10-20 --from dynamodb --out data/snapshot
+    python src/snapshot.py info data/snapshot
+    CRYPTO_STORAGE_BACKEND=snapshot CRYPTO_SNAPSHOT_PATH=data/snapshot python dashboard/dashboard.py
+"""
+import argparse
+import json
+import os
+import shutil
+from datetime import datetime, UTC
+
+DEFAULT_SNAPSHOT_PATH = os.getenv('CRYPTO_SNAPSHOT_PATH',
+                                  os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'snapshot'))
+COMPRESSION = os.getenv('CRYPTO_SNAPSHOT_COMPRESSION', 'zstd')
+MANIFEST = 'manifest.json'
+VERSION = 1
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+    except ImportError:
+        raise RuntimeError('Parquet snapshots require pyarrow (pip install -r requirements-dashboard.txt)')
+    return pa, ds
+
+
+def _utc(value):
+    import pandas as pd
+
+    ts = pd.Timestamp(value)
+    return ts.tz_localize('UTC') if ts.tz is None else ts.tz_convert('UTC')
+
+
+def _partitioning(key):
+    pa, ds = _pyarrow()
+    return ds.partitioning(pa.schema([(key, pa.string())]), flavor='hive')
+
+
+def _prepare(df):
+    """(frame, partition key): UTC timestamps and a date column for time series, text for mixed columns"""
+    import pandas as pd
+
+    df = df.reset_index(drop=True).copy()
+    if 'timestamp' in df.columns:
+        df['timestamp'] = pd.to_datetime(df['timestamp'], utc=True, format='ISO8601').dt.as_unit('ns')
+        df['date'] = df['timestamp'].dt.strftime('%Y-%m-%d')
+        key = 'date'
+    elif 'person' in df.columns:
+        df['person'] = df['person'].astype(str)
+        key = 'person'
+    else:
+        key = None
+    for column in df.columns:
+        if df[column].dtype == object:
+            df[column] = df[column].astype('string')
+    return df, key
+
+
+def write_table(path, name, df):
+    """Write one table under path/name, replacing any earlier copy; returns its manifest entry"""
+    pa, ds = _pyarrow()
+    df, key = _prepare(df)
+    target = os.path.join(path, name)
+    if os.path.exists(target):
+        shutil.rmtree(target)
+    ds.write_dataset(
+        pa.Table.from_pandas(df, preserve_index=False), target, format='parquet',
+        partitioning=_partitioning(key) if key else None,
+        file_options=ds.ParquetFileFormat().make_write_options(compression=COMPRESSION),
+        basename_template='part-{i}.parquet',
+    )
+    return {'rows': int(len(df)), 'partitioning': key}
+
+
+def write_snapshot(path, prices, fx=None, news=None, tables=None, meta=None):
+    """Write a snapshot directory and its manifest; returns the manifest
+
+    `tables` maps extra table names to frames (derived analytics); `meta`
+    is merged into the manifest (e.g. the display currency, news searches).
+    Tables of an earlier snapshot at `path` that this one does not write
+    are removed.
+    """
+    import pandas as pd
+
+    os.makedirs(path, exist_ok=True)
+    previous = read_manifest(path)['tables'] if os.path.exists(os.path.join(path, MANIFEST)) else {}
+    entries = {'prices': write_table(path, 'prices', prices)}
+    if fx is not None and not fx.empty:
+        entries['fx'] = write_table(path, 'fx', fx)
+    if news is not None and not news.empty:
+        entries['news'] = write_table(path, 'news', news)
+    for name, df in (tables or {}).items():
+        if df is not None and not df.empty:
+            entries[name] = write_table(path, name, df)
+
+    times = pd.to_datetime(prices['timestamp'], utc=True, format='ISO8601') if not prices.empty else None
+    manifest = {
+        'version': VERSION,
+        'created': datetime.now(UTC).isoformat(),
+        'start': None if times is None else times.min().isoformat(),
+        'end': None if times is None else times.max().isoformat(),
+        'coins': [c for c in prices.columns if c != 'timestamp'],
+        'compression': COMPRESSION,
+        'tables': entries,
+        **(meta or {}),
+    }
+    with open(os.path.join(path, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    for name in set(previous) - set(entries):
+        target = os.path.join(path, name)
+        if os.path.isdir(target):
+            shutil.rmtree(target)
+    return manifest
+
+
+def read_manifest(path):
+    with open(os.path.join(path, MANIFEST)) as f:
+        return json.load(f)
+
+
+def read_table(path, name, start=None, end=None, columns=None, exclusive=False):
+    """A snapshot table as a DataFrame, optionally only the [start, end] time range and some columns
+
+    Only tables the manifest lists are read. Date-partitioned tables skip
+    the files outside the range; their timestamps come back as UTC
+    datetimes, sorted.
+    """
+    import pandas as pd
+
+    pa, ds = _pyarrow()
+    entry = read_manifest(path)['tables'].get(name)
+    if entry is None:
+        return pd.DataFrame({'timestamp': []}) if name in ('prices', 'fx') else pd.DataFrame()
+    key = entry.get('partitioning')
+    dataset = ds.dataset(os.path.join(path, name), format='parquet', partitioning=_partitioning(key) if key else None)
+
+    condition = None
+    if key == 'date':
+        ts_type = dataset.schema.field('timestamp').type
+        bounds = []
+        if start is not None:
+            start = _utc(start)
+            bounds.append(ds.field('date') >= start.strftime('%Y-%m-%d'))
+            bounds.append((ds.field('timestamp') > pa.scalar(start, ts_type)) if exclusive
+                          else (ds.field('timestamp') >= pa.scalar(start, ts_type)))
+        if end is not None:
+            end = _utc(end)
+            bounds.append(ds.field('date') <= end.strftime('%Y-%m-%d'))
+            bounds.append(ds.field('timestamp') <= pa.scalar(end, ts_type))
+        for bound in bounds:
+            condition = bound if condition is None else condition & bound
+
+    names = [n for n in dataset.schema.names if n != 'date' or key != 'date']
+    if columns is not None:
+        names = [n for n in names if n in columns]
+    df = dataset.to_table(columns=names, filter=condition).to_pandas()
+    if 'timestamp' in df.columns:
+        df = df.sort_values('timestamp', kind='stable').reset_index(drop=True)
+    return df
+
+
+class SnapshotBackend:
+    """Read-only storage backend over a snapshot directory (see storage.py)"""
+
+    def __init__(self, path=DEFAULT_SNAPSHOT_PATH):
+        self.path = path
+        self.manifest = read_manifest(path)
+
+    def _select(self, coins):
+        return None if coins is None else ['timestamp'] + list(coins)
+
+    def query(self, time1, time2, coins=None):
+        return read_table(self.path, 'prices', time1, time2, self._select(coins))
+
+    def query_since(self, since, coins=None):
+        return read_table(self.path, 'prices', since, columns=self._select(coins), exclusive=True)
+
+    def query_fx(self, time1, time2):
+        return read_table(self.path, 'fx', time1, time2)
+
+    def version(self):
+        return self.manifest['created']
+
+    def news(self):
+        """(articles, searches): the snapshot's news frame and the searches recorded in the manifest"""
+        return read_table(self.path, 'news'), self.manifest.get('news_searches', [])
+
+    def write(self, rows):
+        raise ValueError('Snapshots are read-only; export a new one instead')
+
+    def write_fx(self, rows):
+        self.write(rows)
+
+    def flush(self):
+        return {'written': 'read-only'}
+
+
+def export_range(source, path, time1, time2, coins=None):
+    """Snapshot the prices and FX rows of [time1, time2] from a storage backend"""
+    prices = source.query(time1, time2, coins)
+    return write_snapshot(path, prices, source.query_fx(time1, time2), meta={'source': type(source).__name__})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='command', required=True)
+    export = sub.add_parser('export', help='Write the prices and FX rows of a time range to a snapshot')
+    export.add_argument('--start', required=True)
+    export.add_argument('--end', required=True)
+    export.add_argument('--from', dest='source', default='dynamodb', choices=['dynamodb', 'sqlite', 'mmap'])
+    export.add_argument('--coins', nargs='+', help='Coin ids (default: every stored coin)')
+    export.add_argument('--out', default=DEFAULT_SNAPSHOT_PATH)
+    info = sub.add_parser('info', help='Print the manifest of a snapshot')
+    info.add_argument('path', nargs='?', default=DEFAULT_SNAPSHOT_PATH)
+    args = parser.parse_args()
+
+    if args.command == 'info':
+        print(json.dumps(read_manifest(args.path), indent=2))
+        return
+
+    from storage import get_backend
+    manifest = export_range(get_backend(args.source), args.out, args.start, args.end, args.coins)
+    rows = ', '.join(f"{name}: {entry['rows']}" for name, entry in manifest['tables'].items())
+    print(f"Wrote snapshot {args.out} ({rows})")
+
+
+if __name__ == '__main__':
+    main()
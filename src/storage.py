@@ -0,0 +1,319 @@
+"""Storage backends for price ticks
+
+Both the scraper and the dashboard talk to a backend instead of a raw
+DynamoDB table:
+
+    backend.write(rows)             rows are {'timestamp': iso, coin: price}
+    backend.flush()                 wait for buffered writes, return metrics
+    backend.query(time1, time2)     DataFrame with 'timestamp' + one column per coin
+    backend.query_since(since)      rows strictly newer than `since`
+    backend.write_fx(rows)          FX rows {'timestamp': iso, currency: rate per base unit}
+    backend.query_fx(time1, time2)  DataFrame with 'timestamp' + one column per currency
+    backend.version()               changes when past ticks are rewritten (e.g. by a backfill)
+
+Both queries take an optional `coins` list and then read only those
+columns; a requested coin with no stored values may be missing from the frame.
+
+'dynamodb' is the production table (one item per tick, optionally read
+through compressed blocks). 'sqlite' is an embedded local file with the
+timestamp as primary key, for development and heavy analysis without AWS
+latency or cost. 'mmap' is a read-only, memory-mapped columnar copy shared
+by all dashboard workers and kept current by one refresher (mmapstore.py);
+its timestamps come back as UTC datetimes rather than ISO strings.
+'snapshot' reads an exported Parquet snapshot (snapshot.py), also
+read-only and with UTC datetimes. Pick one with CRYPTO_STORAGE_BACKEND;
+copy a range from one to the other (FX rows included) with
+
+    python src/storage.py copy --start 2025-10-13 --end 2025-10-20 --to sqlite
+"""
+import argparse
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime, UTC
+
+DEFAULT_BACKEND = os.getenv('CRYPTO_STORAGE_BACKEND', 'dynamodb')
+DEFAULT_SQLITE_PATH = os.getenv('CRYPTO_SQLITE_PATH',
+                                os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'prices.db'))
+# DynamoDB layout, the same settings the scraper and the dashboard read
+DEFAULT_STORAGE_FORMAT = os.getenv('CRYPTO_STORAGE_FORMAT', 'items')
+DEFAULT_BLOCK_SECONDS = int(os.getenv('CRYPTO_BLOCK_SECONDS', '3600'))
+PRICE_PARTITION = 'CRYPTO_PRICES'
+# Item holding the time of the last write into past ranges (see bump_version)
+META_PARTITION = 'STORE_META'
+VERSION_KEY = {'PK': META_PARTITION, 'timestamp': 'version'}
+
+
+def _frame(records, columns=None):
+    """DataFrame with float prices from a list of row dicts"""
+    import pandas as pd
+
+    df = pd.DataFrame.from_records(records, columns=columns)
+    coins = [c for c in df.columns if c != 'timestamp']
+    df[coins] = df[coins].astype(float)
+    return df
+
+
+class DynamoDBBackend:
+    """The crypto-prices DynamoDB table (items, or compressed blocks + items)"""
+
+    def __init__(self, table=None, table_name='crypto-prices', storage_format=DEFAULT_STORAGE_FORMAT,
+                 block_seconds=DEFAULT_BLOCK_SECONDS):
+        if table is None:
+            from crypto_scraper import get_table
+            table = get_table(table_name)
+        self.table = table
+        self.table_name = table_name
+        self.storage_format = storage_format
+        self.block_seconds = block_seconds
+
+    def _query_all(self, partition, time1, time2=None, exclusive=False, attributes=None):
+        from boto3.dynamodb.conditions import Key
+
+        if time2 is None:
+            sort_condition = Key('timestamp').gt(time1) if exclusive else Key('timestamp').gte(time1)
+        else:
+            sort_condition = Key('timestamp').between(time1, time2)
+        kwargs = {'KeyConditionExpression': Key('PK').eq(partition) & sort_condition}
+        if attributes is not None:
+            # Placeholders throughout: 'timestamp' and 'count' are reserved words, ids contain '-'
+            names = {f'#a{i}': name for i, name in enumerate(attributes)}
+            kwargs['ProjectionExpression'] = ', '.join(names)
+            kwargs['ExpressionAttributeNames'] = names
+        items = []
+        while True:
+            response = self.table.query(**kwargs)
+            items.extend(response['Items'])
+            if 'LastEvaluatedKey' not in response:
+                return items
+            kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    @staticmethod
+    def _items_frame(items):
+        return _frame([{k: v for k, v in item.items() if k not in ('PK', 'ttl')} for item in items])
+
+    @staticmethod
+    def _attributes(coins, *keys):
+        return None if coins is None else list(keys) + list(coins)
+
+    def write(self, rows):
+        from crypto_scraper import build_item, get_writer
+
+        writer = get_writer(self.table_name)
+        for row in rows:
+            writer.put(build_item(row))
+        return len(rows)
+
+    def flush(self):
+        from crypto_scraper import get_writer
+
+        writer = get_writer(self.table_name)
+        flushed = writer.flush()
+        return {**writer.metrics(), 'flushed': flushed}
+
+    def write_fx(self, rows):
+        from crypto_scraper import build_item, get_writer
+        from currencies import FX_PARTITION
+
+        writer = get_writer(self.table_name)
+        for row in rows:
+            writer.put(build_item(row, partition=FX_PARTITION))
+        return len(rows)
+
+    def query_fx(self, time1, time2):
+        from currencies import FX_PARTITION
+
+        items = self._query_all(FX_PARTITION, time1, time2)
+        return self._items_frame(items) if items else _frame([])
+
+    def version(self):
+        return self.table.get_item(Key=VERSION_KEY).get('Item', {}).get('updated')
+
+    def query(self, time1, time2, coins=None):
+        if self.storage_format == 'blocks':
+            return self._query_blocks(time1, time2, coins)
+        items = self._query_all(PRICE_PARTITION, time1, time2, attributes=self._attributes(coins, 'timestamp'))
+        return self._items_frame(items)
+
+    def query_since(self, since, coins=None):
+        items = self._query_all(PRICE_PARTITION, since, exclusive=True,
+                                attributes=self._attributes(coins, 'timestamp'))
+        return self._items_frame(items) if items else _frame([])
+
+    def _query_blocks(self, time1, time2, coins=None):
+        """Decode closed blocks; read raw items only for ranges no block covers"""
+        import pandas as pd
+        from tscodec import BLOCK_PARTITION, block_start, decode_block, from_micros, to_micros
+
+        # Coins are separate attributes of a block, so projection skips the others' bytes too
+        blocks = self._query_all(BLOCK_PARTITION, block_start(time1, self.block_seconds), time2,
+                                 attributes=self._attributes(coins, 'timestamp', 'count', 'ts'))
+
+        frames, covered = [], []
+        for item in blocks:
+            ts, series = decode_block(item)
+            frame = pd.DataFrame(series)
+            frame.insert(0, 'timestamp', [from_micros(t) for t in ts])
+            frames.append(frame)
+            start = to_micros(item['timestamp'])
+            covered.append((start, start + self.block_seconds * 1_000_000))
+
+        # Raw items for the parts of the range no block covers (open block, unpacked gaps)
+        t1, t2 = to_micros(time1), to_micros(time2)
+        cursor = t1
+        for start, end in covered + [(t2 + 1, t2 + 1)]:
+            if start > cursor:
+                items = self._query_all(PRICE_PARTITION, from_micros(cursor), from_micros(min(start, t2 + 1) - 1),
+                                        attributes=self._attributes(coins, 'timestamp'))
+                if items:
+                    frames.append(self._items_frame(items))
+            cursor = max(cursor, end)
+
+        if not frames:
+            return _frame([])
+        df = pd.concat(frames, ignore_index=True)
+        coins = [c for c in df.columns if c != 'timestamp']
+        df[coins] = df[coins].astype(float)
+        ts = df['timestamp'].map(to_micros)
+        return df[(ts >= t1) & (ts <= t2)].sort_values('timestamp').reset_index(drop=True)
+
+
+class SQLiteBackend:
+    """Embedded local store: one wide table keyed (and indexed) by timestamp"""
+
+    def __init__(self, path=DEFAULT_SQLITE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        for table in ('prices', 'fx_rates'):
+            self._connect().execute(
+                f'CREATE TABLE IF NOT EXISTS {table} (timestamp TEXT PRIMARY KEY) WITHOUT ROWID'
+            )
+        self._connect().execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+
+    def _connect(self):
+        """One connection per thread (Dash serves callbacks from a thread pool)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def columns(self, table='prices'):
+        rows = self._connect().execute(f'PRAGMA table_info({table})').fetchall()
+        return [row[1] for row in rows if row[1] != 'timestamp']
+
+    @staticmethod
+    def _quote(name):
+        if not re.fullmatch(r'[A-Za-z0-9_\-]+', name):
+            raise ValueError(f'Invalid coin id: {name!r}')
+        return f'"{name}"'
+
+    def write(self, rows, table='prices'):
+        if not rows:
+            return 0
+        conn = self._connect()
+        coins = sorted({k for row in rows for k in row if k != 'timestamp'})
+        with self._lock, conn:
+            # Rows at or before the newest stored tick rewrite the past: bump the version
+            last = conn.execute(f'SELECT max(timestamp) FROM {table}').fetchone()[0]
+            if table == 'prices' and last is not None and min(row['timestamp'] for row in rows) <= last:
+                conn.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)",
+                             (datetime.now(UTC).isoformat(),))
+            existing = set(self.columns(table))
+            for coin in coins:
+                if coin not in existing:
+                    conn.execute(f'ALTER TABLE {table} ADD COLUMN {self._quote(coin)} REAL')
+            names = ', '.join(['timestamp'] + [self._quote(c) for c in coins])
+            marks = ', '.join('?' * (len(coins) + 1))
+            conn.executemany(
+                f'INSERT OR REPLACE INTO {table} ({names}) VALUES ({marks})',
+                [[row['timestamp']] + [None if row.get(c) is None else float(row[c]) for c in coins]
+                 for row in rows]
+            )
+        return len(rows)
+
+    def flush(self):
+        return {'written': 'synchronous'}
+
+    def write_fx(self, rows):
+        return self.write(rows, table='fx_rates')
+
+    def _select(self, where, params, coins=None, table='prices'):
+        stored = self.columns(table)
+        coins = stored if coins is None else [c for c in coins if c in stored]
+        names = ', '.join(['timestamp'] + [self._quote(c) for c in coins])
+        cursor = self._connect().execute(
+            f'SELECT {names} FROM {table} WHERE {where} ORDER BY timestamp', params
+        )
+        return _frame(cursor.fetchall(), columns=['timestamp'] + coins)
+
+    def query(self, time1, time2, coins=None):
+        return self._select('timestamp BETWEEN ? AND ?', (time1, time2), coins)
+
+    def query_since(self, since, coins=None):
+        return self._select('timestamp > ?', (since,), coins)
+
+    def query_fx(self, time1, time2):
+        return self._select('timestamp BETWEEN ? AND ?', (time1, time2), table='fx_rates')
+
+    def version(self):
+        row = self._connect().execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        return row[0] if row else None
+
+
+def bump_version(table):
+    """Record that past ticks changed, so readers drop ranges they cached as final"""
+    table.put_item(Item={**VERSION_KEY, 'updated': datetime.now(UTC).isoformat()})
+
+
+def get_backend(kind=DEFAULT_BACKEND, **kwargs):
+    """Construct the configured backend ('dynamodb', 'sqlite', 'mmap' or 'snapshot')"""
+    if kind == 'dynamodb':
+        return DynamoDBBackend(**kwargs)
+    if kind == 'sqlite':
+        return SQLiteBackend(**kwargs)
+    if kind == 'mmap':
+        from mmapstore import MmapBackend
+        return MmapBackend(**kwargs)
+    if kind == 'snapshot':
+        from snapshot import SnapshotBackend
+        return SnapshotBackend(**kwargs)
+    raise ValueError(f'Unknown storage backend: {kind}')
+
+
+def copy_range(source, target, time1, time2):
+    """Copy every tick and FX row in [time1, time2] from one backend to another"""
+    df = source.query(time1, time2)
+    rows = df.to_dict('records')
+    target.write(rows)
+    target.write_fx(source.query_fx(time1, time2).to_dict('records'))
+    target.flush()
+    return len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='command', required=True)
+    copy = sub.add_parser('copy', help='Copy a time range between backends')
+    copy.add_argument('--start', required=True)
+    copy.add_argument('--end', required=True)
+    copy.add_argument('--from', dest='source', default='dynamodb', choices=['dynamodb', 'sqlite'])
+    copy.add_argument('--to', dest='target', default='sqlite', choices=['dynamodb', 'sqlite'])
+    copy.add_argument('--sqlite-path', default=DEFAULT_SQLITE_PATH)
+    args = parser.parse_args()
+
+    def open_backend(kind):
+        return SQLiteBackend(args.sqlite_path) if kind == 'sqlite' else DynamoDBBackend()
+
+    copied = copy_range(open_backend(args.source), open_backend(args.target), args.start, args.end)
+    print(f"Copied {copied} ticks from {args.source} to {args.target}")
+
+
+if __name__ == '__main__':
+    main()
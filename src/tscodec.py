@@ -0,0 +1,255 @@
+"""Gorilla-style compression for blocks of price ticks
+
+Timestamps (epoch microseconds) are stored as delta-of-deltas with
+variable-width buckets; prices are scaled to integers by their decimal
+precision and stored as the XOR of each double with the previous one,
+writing only the meaningful bits. An hour of one coin (20 ticks) packs
+into a few dozen bytes instead of 20 DynamoDB numbers.
+
+Block items live in the same table as the raw ticks, under their own
+partition key, with the block start as sort key:
+
+    {'PK': 'CRYPTO_BLOCKS', 'timestamp': <block start ISO>, 'count': n,
+     'ts': <bytes>, 'bitcoin': <bytes>, ...}
+"""
+import math
+import struct
+from datetime import datetime, timedelta, UTC
+
+BLOCK_PARTITION = 'CRYPTO_BLOCKS'
+
+# (prefix, prefix length, payload bits) for delta-of-delta buckets, in microseconds
+_DOD_BUCKETS = [
+    (0b10, 2, 7),
+    (0b110, 3, 9),
+    (0b1110, 4, 12),
+    (0b11110, 5, 32),
+    (0b11111, 5, 64),
+]
+
+
+class BitWriter:
+    def __init__(self):
+        self.out = bytearray()
+        self.acc = 0
+        self.nbits = 0
+
+    def write(self, value, nbits):
+        self.acc = (self.acc << nbits) | (value & ((1 << nbits) - 1))
+        self.nbits += nbits
+        while self.nbits >= 8:
+            self.nbits -= 8
+            self.out.append((self.acc >> self.nbits) & 0xFF)
+        self.acc &= (1 << self.nbits) - 1
+
+    def getvalue(self):
+        if self.nbits:
+            return bytes(self.out) + bytes([(self.acc << (8 - self.nbits)) & 0xFF])
+        return bytes(self.out)
+
+
+class BitReader:
+    def __init__(self, data):
+        self.data = data
+        self.pos = 0
+
+    def read(self, nbits):
+        if nbits == 0:
+            return 0
+        first, last = self.pos >> 3, (self.pos + nbits - 1) >> 3
+        chunk = int.from_bytes(self.data[first:last + 1], 'big')
+        shift = (last + 1) * 8 - (self.pos + nbits)
+        self.pos += nbits
+        return (chunk >> shift) & ((1 << nbits) - 1)
+
+    def read_bit(self):
+        byte = self.data[self.pos >> 3]
+        bit = (byte >> (7 - (self.pos & 7))) & 1
+        self.pos += 1
+        return bit
+
+
+def _signed(value, nbits):
+    return value - (1 << nbits) if value >= 1 << (nbits - 1) else value
+
+
+def encode_timestamps(timestamps):
+    """Delta-of-delta encode a sequence of integer timestamps"""
+    w = BitWriter()
+    if not timestamps:
+        return b''
+    w.write(timestamps[0], 64)
+    prev, prev_delta = timestamps[0], 0
+    for t in timestamps[1:]:
+        delta = t - prev
+        dod = delta - prev_delta
+        if dod == 0:
+            w.write(0, 1)
+        else:
+            for prefix, plen, bits in _DOD_BUCKETS:
+                if -(1 << (bits - 1)) <= dod < (1 << (bits - 1)):
+                    w.write(prefix, plen)
+                    w.write(dod, bits)
+                    break
+        prev, prev_delta = t, delta
+    return w.getvalue()
+
+
+def decode_timestamps(data, count):
+    if count == 0:
+        return []
+    r = BitReader(data)
+    t = r.read(64)
+    out = [t]
+    delta = 0
+    for _ in range(count - 1):
+        if r.read_bit() == 0:
+            dod = 0
+        else:
+            plen = 1
+            while plen < 5 and r.read_bit() == 1:
+                plen += 1
+            bits = {1: 7, 2: 9, 3: 12, 4: 32, 5: 64}[plen]
+            dod = _signed(r.read(bits), bits)
+        delta += dod
+        t += delta
+        out.append(t)
+    return out
+
+
+def _float_bits(value):
+    return struct.unpack('>Q', struct.pack('>d', value))[0]
+
+
+def _bits_float(bits):
+    return struct.unpack('>d', struct.pack('>Q', bits))[0]
+
+
+def decimal_scale(values, max_scale=12):
+    """Smallest d such that every finite value is an exact multiple of 10**-d, else None
+
+    Prices arrive as short decimals (CoinGecko quotes, stored as Decimal), so
+    scaling them to integers leaves long runs of trailing zero bits in the
+    doubles and XOR deltas shrink to a few meaningful bits.
+    """
+    finite = [v for v in values if math.isfinite(v)]
+    for d in range(max_scale + 1):
+        factor = 10 ** d
+        if all(abs(v * factor) < 2 ** 53 and round(v * factor) / factor == v for v in finite):
+            return d
+    return None
+
+
+def encode_prices(values):
+    """One scale byte (255 = raw doubles) followed by the XOR-encoded series"""
+    scale = decimal_scale(values)
+    if scale is None:
+        return bytes([255]) + encode_floats(values)
+    factor = 10 ** scale
+    return bytes([scale]) + encode_floats([float(round(v * factor)) if math.isfinite(v) else v for v in values])
+
+
+def decode_prices(data, count):
+    scale = data[0]
+    values = decode_floats(data[1:], count)
+    if scale == 255:
+        return values
+    factor = 10 ** scale
+    return [v / factor for v in values]
+
+
+def encode_floats(values):
+    """XOR-encode a sequence of doubles (NaN allowed for missing prices)"""
+    w = BitWriter()
+    if not values:
+        return b''
+    prev = _float_bits(values[0])
+    w.write(prev, 64)
+    prev_lead, prev_trail = 65, 0
+    for value in values[1:]:
+        bits = _float_bits(value)
+        xor = bits ^ prev
+        if xor == 0:
+            w.write(0, 1)
+        else:
+            lead = min(64 - xor.bit_length(), 31)
+            trail = (xor & -xor).bit_length() - 1
+            if lead >= prev_lead and trail >= prev_trail:
+                w.write(0b10, 2)
+                w.write(xor >> prev_trail, 64 - prev_lead - prev_trail)
+            else:
+                meaningful = 64 - lead - trail
+                w.write(0b11, 2)
+                w.write(lead, 5)
+                w.write(meaningful & 0x3F, 6)  # 64 is stored as 0
+                w.write(xor >> trail, meaningful)
+                prev_lead, prev_trail = lead, trail
+        prev = bits
+    return w.getvalue()
+
+
+def decode_floats(data, count):
+    if count == 0:
+        return []
+    r = BitReader(data)
+    prev = r.read(64)
+    out = [_bits_float(prev)]
+    lead, trail = 0, 0
+    for _ in range(count - 1):
+        if r.read_bit() == 1:
+            if r.read_bit() == 1:
+                lead = r.read(5)
+                meaningful = r.read(6) or 64
+                trail = 64 - lead - meaningful
+            prev ^= r.read(64 - lead - trail) << trail
+        out.append(_bits_float(prev))
+    return out
+
+
+def to_micros(iso):
+    ts = datetime.fromisoformat(iso)
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=UTC)
+    delta = ts - datetime(1970, 1, 1, tzinfo=UTC)
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def from_micros(micros):
+    return (datetime(1970, 1, 1, tzinfo=UTC) + timedelta(microseconds=micros)).isoformat()
+
+
+def block_start(iso, block_seconds):
+    """ISO start of the block containing a timestamp"""
+    micros = to_micros(iso)
+    span = block_seconds * 1_000_000
+    return from_micros(micros - micros % span)
+
+
+def encode_block(rows, start, ttl=None):
+    """Pack scraper rows ({'timestamp': iso, coin: price}) into one block item"""
+    rows = sorted(rows, key=lambda row: row['timestamp'])
+    coins = sorted({k for row in rows for k in row if k != 'timestamp'})
+    item = {
+        'PK': BLOCK_PARTITION,
+        'timestamp': start,
+        'count': len(rows),
+        'ts': encode_timestamps([to_micros(row['timestamp']) for row in rows]),
+    }
+    for coin in coins:
+        item[coin] = encode_prices([float(row.get(coin, float('nan'))) for row in rows])
+    if ttl is not None:
+        item['ttl'] = ttl
+    return item
+
+
+def decode_block(item):
+    """Inverse of encode_block: (timestamps in epoch microseconds, {coin: [prices]})"""
+    count = int(item['count'])
+    raw = lambda value: getattr(value, 'value', value)  # boto3 wraps bytes in Binary
+    timestamps = decode_timestamps(raw(item['ts']), count)
+    series = {}
+    for key, value in item.items():
+        if key in ('PK', 'timestamp', 'count', 'ts', 'ttl'):
+            continue
+        series[key] = decode_prices(raw(value), count)
+    return timestamps, series
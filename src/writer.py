@@ -0,0 +1,184 @@
+"""Buffered DynamoDB writer running on a background thread
+
+Items put on the writer are queued without blocking the caller, coalesced
+into BatchWriteItem calls of up to 25 puts, and retried with jittered
+exponential backoff when DynamoDB returns UnprocessedItems or throttles.
+"""
+import queue
+import random
+import threading
+import time
+
+from botocore.exceptions import ClientError
+
+MAX_BATCH = 25  # DynamoDB BatchWriteItem limit
+# Longest flush() waits by default (seconds), so a stuck write cannot hang the flow
+FLUSH_TIMEOUT = 300
+RETRYABLE_ERRORS = {
+    'ProvisionedThroughputExceededException',
+    'ThrottlingException',
+    'RequestLimitExceeded',
+    'InternalServerError',
+}
+
+
+class BufferedWriter:
+    """Queue items and write them in batches from a dedicated thread
+
+    `dynamodb` is a boto3 DynamoDB service resource (or anything exposing
+    `batch_write_item(RequestItems=...)` with resource-level types).
+    """
+
+    def __init__(self, dynamodb, table_name, key_names=('PK', 'timestamp'), flush_interval=0.5,
+                 max_queue=100_000, max_retries=8, backoff=0.05, max_backoff=5.0):
+        self.dynamodb = dynamodb
+        self.table_name = table_name
+        self.key_names = key_names
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._latencies = []
+        self._counters = {'queued': 0, 'written': 0, 'batches': 0, 'retries': 0, 'failed': 0, 'coalesced': 0}
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=f'writer-{table_name}', daemon=True)
+        self._thread.start()
+
+    def put(self, item):
+        """Enqueue an item; only blocks if the buffer is full"""
+        if self._closed:
+            raise RuntimeError('writer is closed')
+        self._queue.put(item)
+        with self._lock:
+            self._counters['queued'] += 1
+
+    def flush(self, timeout=FLUSH_TIMEOUT):
+        """Block until every queued item has been written (or given up on); False on timeout
+
+        Also False straight away when the writer thread is gone, instead of
+        waiting on an event nobody will set.
+        """
+        if not self._thread.is_alive():
+            print(f"Writer thread for {self.table_name} is not running; {self._queue.qsize()} entries unwritten")
+            return False
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self, timeout=FLUSH_TIMEOUT):
+        self.flush(timeout)
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def metrics(self):
+        """Counters plus flush latency percentiles in milliseconds"""
+        with self._lock:
+            latencies = sorted(self._latencies)
+            stats = dict(self._counters)
+        stats['queue_depth'] = self._queue.qsize()
+        if latencies:
+            pick = lambda q: round(latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000, 2)
+            stats.update({'flush_ms_p50': pick(0.5), 'flush_ms_p95': pick(0.95), 'flush_ms_max': pick(1.0)})
+        return stats
+
+    def _run(self):
+        pending = []
+        while True:
+            try:
+                entry = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                entry = False
+
+            # A close (None) or flush (Event) entry, handled right after the items queued before it
+            control = False
+            if entry is None or isinstance(entry, threading.Event):
+                control = entry
+            elif entry is not False:
+                pending.append(entry)
+                # Drain whatever else is already waiting without blocking
+                while len(pending) < MAX_BATCH * 40:
+                    try:
+                        nxt = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if nxt is None or isinstance(nxt, threading.Event):
+                        control = nxt
+                        break
+                    pending.append(nxt)
+
+            if control is not False:
+                self._write(pending)
+                pending = []
+                if control is None:
+                    return
+                control.set()
+            elif pending and (entry is False or len(pending) >= MAX_BATCH):
+                self._write(pending)
+                pending = []
+
+    def _coalesce(self, items):
+        """Keep the last item per key; BatchWriteItem rejects duplicate keys in one call"""
+        latest = {}
+        for item in items:
+            latest[tuple(item[k] for k in self.key_names)] = item
+        with self._lock:
+            self._counters['coalesced'] += len(items) - len(latest)
+        return list(latest.values())
+
+    def _write(self, items):
+        if not items:
+            return
+        try:
+            items = self._coalesce(items)
+        except Exception as e:
+            # e.g. an item missing a key attribute: count the lot as failed, keep the thread alive
+            print(f"Dropping {len(items)} items: {type(e).__name__}: {e}")
+            with self._lock:
+                self._counters['failed'] += len(items)
+            return
+        for i in range(0, len(items), MAX_BATCH):
+            self._write_batch(items[i:i + MAX_BATCH])
+
+    def _write_batch(self, batch):
+        """Write one batch; any error other than a retryable ClientError fails the batch, never the thread"""
+        start = time.perf_counter()
+        requests = [{'PutRequest': {'Item': item}} for item in batch]
+        dropped = 0
+        attempt = 0
+        while requests:
+            try:
+                response = self.dynamodb.batch_write_item(RequestItems={self.table_name: requests})
+                requests = response.get('UnprocessedItems', {}).get(self.table_name, [])
+            except ClientError as e:
+                code = e.response.get('Error', {}).get('Code')
+                if code not in RETRYABLE_ERRORS:
+                    print(f"Dropping {len(requests)} items: {code}: {e}")
+                    dropped, requests = len(requests), []
+                    break
+            except Exception as e:
+                print(f"Dropping {len(requests)} items: {type(e).__name__}: {e}")
+                dropped, requests = len(requests), []
+                break
+            if not requests:
+                break
+            if attempt >= self.max_retries:
+                print(f"Giving up on {len(requests)} items after {attempt} retries")
+                dropped, requests = len(requests), []
+                break
+            attempt += 1
+            with self._lock:
+                self._counters['retries'] += 1
+            # Full jitter: sleep uniformly up to the exponential cap
+            time.sleep(random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt)))
+
+        with self._lock:
+            self._counters['batches'] += 1
+            self._counters['failed'] += dropped
+            self._counters['written'] += len(batch) - dropped - len(requests)
+            self._latencies.append(time.perf_counter() - start)
+            if len(self._latencies) > 10_000:
+                del self._latencies[:5_000]
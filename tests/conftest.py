@@ -0,0 +1,7 @@
+"""Make the flat src/ modules and the benchmark fakes importable from the tests"""
+import os
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+for path in ('src', 'benchmarks'):
+    sys.path.insert(0, os.path.join(ROOT, path))
@@ -0,0 +1,189 @@
+"""Gap detection and CoinGecko backfill (src/backfill.py) against an in-memory table"""
+from datetime import datetime, timedelta, UTC
+
+import pytest
+
+pytest.importorskip('prefect')
+pytest.importorskip('boto3')
+
+import backfill
+from crypto_scraper import build_item
+from fakes import FakeTable
+from storage import VERSION_KEY
+
+START = datetime(2025, 10, 20, tzinfo=UTC)
+END = START + timedelta(hours=2)
+
+
+class StubResponse:
+    def __init__(self, status_code, payload=None, headers=None):
+        self.status_code = status_code
+        self.payload = payload
+        self.headers = headers or {}
+
+    def json(self):
+        return self.payload
+
+    def raise_for_status(self):
+        raise backfill.requests.exceptions.HTTPError(f'{self.status_code} error')
+
+
+class StubSession:
+    """Answers market_chart/range with one point every `spacing`, after `failures` 429s"""
+
+    def __init__(self, spacing=timedelta(minutes=5), failures=0, missing=()):
+        self.spacing = spacing
+        self.failures = failures
+        self.missing = set(missing)
+        self.calls = []
+
+    def get(self, url, params=None, timeout=None):
+        self.calls.append((url, params))
+        if self.failures:
+            self.failures -= 1
+            return StubResponse(429, headers={'Retry-After': '0'})
+        coin = url.split('/coins/')[1].split('/')[0]
+        if coin in self.missing:
+            return StubResponse(200, {'prices': []})
+        step = int(self.spacing.total_seconds())
+        first = params['from'] - params['from'] % step
+        prices = [[t * 1000, 100.0 + (t - first) / step] for t in range(first, params['to'] + 1, step)]
+        return StubResponse(200, {'prices': prices})
+
+
+@pytest.fixture(autouse=True)
+def no_waiting(monkeypatch):
+    monkeypatch.setattr(backfill, 'RETRY_BACKOFF', 0)
+    monkeypatch.setattr(backfill.time, 'sleep', lambda seconds: None)
+
+
+def stub_session(monkeypatch, **kwargs):
+    session = StubSession(**kwargs)
+    monkeypatch.setattr(backfill.requests, 'Session', lambda: session)
+    return session
+
+
+def table_with_ticks(times):
+    table = FakeTable()
+    table.load(build_item({'timestamp': t.isoformat(), 'bitcoin': 1.0}) for t in times)
+    return table
+
+
+def test_find_gaps_reports_missing_ticks_only():
+    times = [START + backfill.TICK * i for i in range(10) if i not in (4, 5)]
+    gaps = backfill.find_gaps(times, times[0], times[-1])
+    assert gaps == [(START + backfill.TICK * 3, START + backfill.TICK * 6)]
+    assert backfill.grid_points(*gaps[0]) == [START + backfill.TICK * 4, START + backfill.TICK * 5]
+
+
+def test_detect_gaps_reads_the_stored_ticks():
+    table = table_with_ticks([START, START + timedelta(hours=1), END])
+    gaps = backfill.detect_gaps.fn(table, START, END)
+    assert gaps == [(START, START + timedelta(hours=1)), (START + timedelta(hours=1), END)]
+
+
+def test_get_with_retry_honours_429(monkeypatch):
+    session = StubSession(failures=2)
+    limiter = backfill.TokenBucket(1000, capacity=10)
+    data = backfill.get_with_retry(session, 'https://api/coins/bitcoin/market_chart/range',
+                                   {'from': 0, 'to': 600}, limiter)
+    assert len(session.calls) == 3 and data['prices']
+
+
+def test_get_with_retry_gives_up():
+    session = StubSession(failures=10)
+    with pytest.raises(RuntimeError):
+        backfill.get_with_retry(session, 'https://api/coins/bitcoin/market_chart/range',
+                                {'from': 0, 'to': 600}, backfill.TokenBucket(1000, 10), retries=2)
+    assert len(session.calls) == 3
+
+
+def test_fetch_coin_history_splits_long_ranges():
+    session = StubSession()
+    history = backfill.fetch_coin_history(session, backfill.TokenBucket(1000, 10), 'bitcoin',
+                                          START, START + timedelta(days=2, hours=1))
+    assert len(session.calls) == 3
+    assert history == sorted(history)
+
+
+def test_rows_for_gap_uses_hourly_history_for_older_ranges():
+    ms = lambda t: int(t.timestamp() * 1000)
+    hourly = [(ms(START + timedelta(hours=h)), 100.0 + h) for h in range(3)]
+    rows = backfill.rows_for_gap({'bitcoin': hourly}, START, END)
+    assert len(rows) == len(backfill.grid_points(START, END))
+    assert rows[0]['bitcoin'] == 100.0 and rows[-1]['bitcoin'] == 102.0
+
+
+def test_rows_for_gap_ignores_daily_history():
+    ms = lambda t: int(t.timestamp() * 1000)
+    daily = [(ms(START + timedelta(days=d)), 100.0) for d in range(3)]
+    rows = backfill.rows_for_gap({'bitcoin': daily}, START, END)
+    assert all(datetime.fromisoformat(row['timestamp']) - START <= backfill.MAX_PRICE_AGE for row in rows)
+
+
+def test_rows_for_gap_keeps_partial_rows():
+    ms = lambda t: int(t.timestamp() * 1000)
+    history = [(ms(START + timedelta(minutes=5 * i)), 1.0) for i in range(25)]
+    rows = backfill.rows_for_gap({'bitcoin': history, 'ethereum': []}, START, END)
+    assert rows and all(set(row) == {'timestamp', 'bitcoin'} for row in rows)
+
+
+def test_backfill_fills_gaps_and_bumps_the_store_version(monkeypatch):
+    monkeypatch.setattr(backfill, 'STORAGE_FORMAT', 'items')
+    session = stub_session(monkeypatch, missing={'ethereum'})
+    table = table_with_ticks([START, END])
+
+    gaps = backfill.detect_gaps.fn(table, START, END)
+    rows = backfill.fetch_gap_rows.fn(gaps, ['bitcoin', 'ethereum'], workers=2, rate_per_minute=6000)
+    written = backfill.save_rows.fn(rows, table)
+
+    assert written == len(backfill.grid_points(START, END)) and session.calls
+    assert backfill.find_gaps(backfill.stored_timestamps(table, START, END), START, END) == []
+    assert 'ethereum' not in table.get_item(Key={'PK': 'CRYPTO_PRICES', 'timestamp': rows[0]['timestamp']})['Item']
+    assert 'Item' in table.get_item(Key=VERSION_KEY)
+
+
+def test_backfill_is_idempotent(monkeypatch):
+    monkeypatch.setattr(backfill, 'STORAGE_FORMAT', 'items')
+    stub_session(monkeypatch)
+    table = table_with_ticks([START, END])
+    gaps = backfill.detect_gaps.fn(table, START, END)
+    rows = backfill.fetch_gap_rows.fn(gaps, ['bitcoin'], rate_per_minute=6000)
+    backfill.save_rows.fn(rows, table)
+    backfill.save_rows.fn(rows, table)
+    assert len(backfill.stored_timestamps(table, START, END)) == len(rows) + 2
+
+
+def test_failed_coin_fetch_keeps_the_other_coins(monkeypatch):
+    session = stub_session(monkeypatch)
+    get = session.get
+
+    def failing_get(url, params=None, timeout=None):
+        if '/coins/ethereum/' in url:
+            return StubResponse(404)
+        return get(url, params, timeout)
+
+    session.get = failing_get
+    gaps = [(START, END)]
+    rows = backfill.fetch_gap_rows.fn(gaps, ['bitcoin', 'ethereum'], rate_per_minute=6000)
+    assert len(rows) == len(backfill.grid_points(START, END))
+    assert all(set(row) == {'timestamp', 'bitcoin'} for row in rows)
+
+
+def test_backfill_writes_through_a_sqlite_backend(monkeypatch, tmp_path):
+    from storage import SQLiteBackend
+
+    store = SQLiteBackend(str(tmp_path / 'prices.db'))
+    store.write([{'timestamp': t.isoformat(), 'bitcoin': 1.0} for t in (START, END)])
+    monkeypatch.setattr(backfill, 'DEFAULT_BACKEND', 'sqlite')
+    monkeypatch.setattr(backfill, 'get_storage', lambda table_name='crypto-prices': store)
+    stub_session(monkeypatch)
+    version = store.version()
+
+    gaps = backfill.detect_gaps.fn('crypto-prices', START, END)
+    rows = backfill.fetch_gap_rows.fn(gaps, ['bitcoin'], rate_per_minute=6000)
+    written = backfill.save_rows.fn(rows, 'crypto-prices')
+
+    assert gaps == [(START, END)] and written == len(rows)
+    assert len(store.query(START.isoformat(), END.isoformat())) == len(rows) + 2
+    assert store.version() != version
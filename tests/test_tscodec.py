@@ -0,0 +1,75 @@
+"""Round trips of the Gorilla block codec (src/tscodec.py)"""
+import math
+import struct
+
+import pytest
+
+from tscodec import (decode_block, decode_floats, decode_prices, decode_timestamps, encode_block,
+                     encode_floats, encode_prices, encode_timestamps, to_micros)
+
+
+def same(a, b):
+    """Bit-for-bit float equality, so NaN and -0.0 compare as stored"""
+    return struct.pack('>d', a) == struct.pack('>d', b)
+
+
+def test_empty_input():
+    assert encode_timestamps([]) == b''
+    assert decode_timestamps(b'', 0) == []
+    assert encode_floats([]) == b''
+    assert decode_floats(b'', 0) == []
+    assert decode_prices(encode_prices([]), 0) == []
+
+
+def test_single_point():
+    assert decode_timestamps(encode_timestamps([1_760_000_000_000_000]), 1) == [1_760_000_000_000_000]
+    assert decode_prices(encode_prices([67123.45]), 1) == [67123.45]
+
+
+@pytest.mark.parametrize('deltas', [
+    [180_000_000] * 20,                          # regular 3-minute ticks
+    [180_000_000, 180_000_050, 179_999_900],     # jitter within the 7-bit bucket
+    [180_000_000, 180_000_200, 180_001_500],     # 9- and 12-bit buckets
+    [180_000_000, 3_600_000_000, 180_000_000],   # an hour-long gap (32-bit bucket)
+    [180_000_000, 2 ** 40, 1],                   # beyond 32 bits (64-bit bucket)
+])
+def test_irregular_timestamps(deltas):
+    timestamps = [1_760_000_000_000_000]
+    for delta in deltas:
+        timestamps.append(timestamps[-1] + delta)
+    assert decode_timestamps(encode_timestamps(timestamps), len(timestamps)) == timestamps
+
+
+@pytest.mark.parametrize('values', [
+    [67123.45, 67123.45, 67125.1, float('nan'), 67120.0],
+    [float('nan'), 1.5, float('nan')],
+    [1e300, -1e300, 5e-324, 1.7976931348623157e308, 0.0, -0.0],
+    [float('inf'), 1.0, float('-inf')],
+    [0.1, 0.2, 0.30000000000000004],
+])
+def test_float_xor_round_trip(values):
+    decoded = decode_floats(encode_floats(values), len(values))
+    assert all(same(a, b) for a, b in zip(values, decoded))
+
+
+@pytest.mark.parametrize('values', [
+    [67123.45, 67123.46, 67000.0],
+    [0.00001234, 0.00001235, float('nan')],
+    [1e300, 2e300],                              # too large to scale: stored as raw doubles
+])
+def test_price_round_trip(values):
+    decoded = decode_prices(encode_prices(values), len(values))
+    assert all(a == b or (math.isnan(a) and math.isnan(b)) for a, b in zip(values, decoded))
+
+
+def test_block_round_trip_with_missing_coin():
+    rows = [
+        {'timestamp': '2025-10-20T00:03:00+00:00', 'bitcoin': 67000.5, 'ethereum': 2500.25},
+        {'timestamp': '2025-10-20T00:00:00+00:00', 'bitcoin': 66990.0},
+    ]
+    item = encode_block(rows, '2025-10-20T00:00:00+00:00', ttl=123)
+    timestamps, series = decode_block(item)
+    assert item['count'] == 2 and item['ttl'] == 123
+    assert timestamps == [to_micros(r['timestamp']) for r in reversed(rows)]
+    assert series['bitcoin'] == [66990.0, 67000.5]
+    assert math.isnan(series['ethereum'][0]) and series['ethereum'][1] == 2500.25
@@ -0,0 +1,109 @@
+"""Ordering, back-pressure and failure handling of the buffered DynamoDB writer (src/writer.py)"""
+import queue
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip('botocore')
+
+import writer as writer_module
+from fakes import FakeDynamoResource
+from writer import BufferedWriter
+
+
+def item(i):
+    return {'PK': 'CRYPTO_PRICES', 'timestamp': f'2025-10-20T00:{i // 60:02d}:{i % 60:02d}', 'bitcoin': i}
+
+
+def stored(dynamodb):
+    table = dynamodb.Table('prices')
+    return len(table._items)
+
+
+def test_flush_covers_every_item_put_before_it():
+    dynamodb = FakeDynamoResource()
+    writer = BufferedWriter(dynamodb, 'prices', flush_interval=10)
+    for i in range(60):
+        writer.put(item(i))
+    assert writer.flush(timeout=5)
+    assert stored(dynamodb) == 60
+    assert writer.metrics()['written'] == 60
+    writer.close(timeout=5)
+
+
+def test_close_writes_pending_items_and_stops_the_thread():
+    dynamodb = FakeDynamoResource()
+    writer = BufferedWriter(dynamodb, 'prices', flush_interval=10)
+    for i in range(30):
+        writer.put(item(i))
+    writer.close(timeout=5)
+    assert stored(dynamodb) == 30
+    assert not writer._thread.is_alive()
+    with pytest.raises(RuntimeError):
+        writer.put(item(0))
+    assert writer.flush(timeout=1) is False
+
+
+class SlowDrainQueue(queue.Queue):
+    """Queue whose non-blocking gets pause, so producers refill it while the writer drains"""
+
+    def get_nowait(self):
+        entry = super().get_nowait()
+        time.sleep(0.02)
+        return entry
+
+
+class GatedDynamoResource(FakeDynamoResource):
+    """Holds every batch write until `gate` is set"""
+
+    def __init__(self):
+        super().__init__()
+        self.gate = threading.Event()
+
+    def batch_write_item(self, RequestItems):
+        self.gate.wait()
+        return super().batch_write_item(RequestItems)
+
+
+def test_flush_with_a_full_queue_does_not_deadlock(monkeypatch):
+    monkeypatch.setattr(writer_module, 'queue', SimpleNamespace(Queue=SlowDrainQueue, Empty=queue.Empty))
+    dynamodb = GatedDynamoResource()
+    writer = BufferedWriter(dynamodb, 'prices', flush_interval=0.01, max_queue=2)
+    flushed = []
+
+    def produce(offset):
+        for i in range(20):
+            writer.put(item(offset + i))
+
+    # The writer blocks on its first batch while an item and a flush fill the queue behind it
+    writer.put(item(0))
+    time.sleep(0.1)
+    writer.put(item(1))
+    flusher = threading.Thread(target=lambda: flushed.append(writer.flush(timeout=5)), daemon=True)
+    producers = [threading.Thread(target=produce, args=(n * 100,), daemon=True) for n in range(1, 4)]
+    for thread in [flusher, *producers]:
+        thread.start()
+    time.sleep(0.1)
+    dynamodb.gate.set()
+    for thread in [flusher, *producers]:
+        thread.join(timeout=10)
+    assert not any(thread.is_alive() for thread in [flusher, *producers])
+    assert flushed == [True]
+    assert writer.flush(timeout=5)
+    assert stored(dynamodb) == 62
+    writer.close(timeout=5)
+
+
+def test_failed_batch_keeps_the_thread_alive():
+    dynamodb = FakeDynamoResource()
+    writer = BufferedWriter(dynamodb, 'prices', flush_interval=10)
+    writer.put({'PK': 'CRYPTO_PRICES'})  # no sort key: cannot be coalesced
+    assert writer.flush(timeout=5)
+    for i in range(5):
+        writer.put(item(i))
+    assert writer.flush(timeout=5)
+    metrics = writer.metrics()
+    assert metrics['failed'] == 1 and metrics['written'] == 5
+    writer.close(timeout=5)